@@ -0,0 +1,372 @@
+"""
+Memory-mapped snapshot of chunks_vector for in-process vector search (used by retriever.py)
+
+The corpus is small enough to sit in RAM, so instead of a network round trip per query the
+chatter can search a read-only copy of chunks_vector:
+
+    <ANN_SNAPSHOT_DIR>/v<corpus version>/
+        embeddings.npy      unit-length rows, float32 or float16 (ANN_SNAPSHOT_DTYPE)
+        ids.npy             chunk ids (int64)
+        source_codes.npy    index into meta.json "sources" (int32)
+        timestamps.npy      COALESCE(published_at, fetched_at) as UTC epoch seconds (NaN = none)
+        chunks.npy / chunks_offsets.npy            chunk text, UTF-8, concatenated
+        article_ids.npy / article_ids_offsets.npy  article ids, UTF-8, concatenated
+        meta.json           version, dtype, rows, dim, sources (written last)
+
+Every array is opened with np.load(mmap_mode="r"), so the uvicorn workers of a pod share
+one copy through the page cache. A snapshot is built (or picked up, if another worker
+already built it) whenever the corpus version changes (corpus_version.py), written to a
+temporary directory and renamed into place, then swapped in with a single assignment.
+Searches are exact (vectorized dot products + top-k) and return the same scores as
+pgvector's <=> (cosine distance).
+
+The snapshot only answers vector searches (no full-text leg) and only while its version
+is the current corpus version; otherwise retriever.py uses Postgres.
+
+CLASSES CONTAINED:
+
+class ChunkSnapshot:
+    One loaded snapshot; search() / multi_rows()
+
+FUNCTIONS CONTAINED:
+
+get_snapshot() -> Optional[ChunkSnapshot]
+    The loaded snapshot if it matches the current corpus version, else None
+
+write_snapshot(rows, directory, version, dtype) -> str
+    Write rows (id, article_id, chunk, source_type, ts, embedding) as a snapshot directory
+
+async refresh_snapshot(version) -> Optional[ChunkSnapshot]
+    Load or build the snapshot for a corpus version and swap it in
+
+async stop_snapshot_refresh()
+    Called from the app lifespan on shutdown
+
+snapshot_stats() -> Dict
+    Loaded version, size and search count (for /metrics)
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np  # installed with pgvector
+
+import corpus_version
+from async_utils import run_blocking
+
+ANN_SNAPSHOT_ENABLED = os.environ.get("ANN_SNAPSHOT_ENABLED", "true").lower() in ("1", "true", "yes")
+ANN_SNAPSHOT_DIR = os.environ.get("ANN_SNAPSHOT_DIR", "/tmp/chatter-ann-snapshot")
+ANN_SNAPSHOT_DTYPE = os.environ.get("ANN_SNAPSHOT_DTYPE", "float32")  # or "float16" (half the RAM)
+ANN_SNAPSHOT_KEEP = 2  # versions kept on disk (the previous one may still be mapped by a worker)
+# float16 rows are widened to float32 in blocks of this many rows (numpy has no fp16 BLAS)
+FLOAT16_BLOCK_ROWS = 8192
+
+SNAPSHOT_ROWS_SQL = """
+    SELECT id, article_id, chunk, source_type, COALESCE(published_at, fetched_at) AS ts, embedding
+    FROM {table}
+    WHERE embedding IS NOT NULL
+    ORDER BY id
+"""
+
+
+def _epoch(ts: Optional[datetime]) -> float:
+    # published_at / fetched_at are stored as naive UTC
+    if ts is None:
+        return float("nan")
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _save_strings(directory: str, name: str, values: Sequence[Optional[str]]) -> None:
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    np.save(os.path.join(directory, f"{name}.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+
+def write_snapshot(rows: Sequence[tuple], directory: str, version: int, dtype: str = "float32") -> str:
+    """
+    Write a snapshot for `version` under directory/v<version> (atomically, via rename).
+
+    Args:
+        rows: (id, article_id, chunk, source_type, ts, embedding) tuples
+        directory: Snapshot root (ANN_SNAPSHOT_DIR)
+        version: Corpus version the rows belong to
+        dtype: "float32" or "float16" storage for the embeddings
+
+    Returns:
+        Path of the snapshot directory (an existing one is kept if another worker won the race)
+    """
+    final = os.path.join(directory, f"v{version}")
+    if os.path.exists(os.path.join(final, "meta.json")):
+        return final
+    tmp = os.path.join(directory, f".tmp-v{version}-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    embeddings = np.asarray([np.asarray(r[5], dtype=np.float32) for r in rows], dtype=np.float32)
+    dim = embeddings.shape[1] if len(rows) else 0
+    if len(rows):
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1.0, norms)
+    sources = sorted({r[3] or "" for r in rows})
+    codes = {source: i for i, source in enumerate(sources)}
+
+    np.save(os.path.join(tmp, "embeddings.npy"), embeddings.reshape(len(rows), dim).astype(dtype))
+    np.save(os.path.join(tmp, "ids.npy"), np.asarray([r[0] for r in rows], dtype=np.int64))
+    np.save(os.path.join(tmp, "source_codes.npy"), np.asarray([codes[r[3] or ""] for r in rows], dtype=np.int32))
+    np.save(os.path.join(tmp, "timestamps.npy"), np.asarray([_epoch(r[4]) for r in rows], dtype=np.float64))
+    _save_strings(tmp, "chunks", [r[2] for r in rows])
+    _save_strings(tmp, "article_ids", [r[1] for r in rows])
+    meta = {"version": version, "dtype": dtype, "rows": len(rows), "dim": dim, "sources": sources}
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    try:
+        os.rename(tmp, final)
+    except OSError:
+        # another worker renamed its copy first; use that one
+        shutil.rmtree(tmp, ignore_errors=True)
+    return final
+
+
+class ChunkSnapshot:
+    """A loaded (memory-mapped, read-only) snapshot of chunks_vector."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.path = path
+        self.version: int = meta["version"]
+        self.dtype: str = meta["dtype"]
+        self.rows: int = meta["rows"]
+        self.dim: int = meta["dim"]
+        self.sources: List[str] = meta["sources"]
+        self._source_codes = {source: i for i, source in enumerate(self.sources)}
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.embeddings = load("embeddings")
+        self.ids = load("ids")
+        self.source_codes = load("source_codes")
+        self.timestamps = load("timestamps")
+        self._chunks, self._chunk_offsets = load("chunks"), load("chunks_offsets")
+        self._articles, self._article_offsets = load("article_ids"), load("article_ids_offsets")
+        self.searches = 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.embeddings.nbytes + self._chunks.nbytes + self._articles.nbytes)
+
+    @staticmethod
+    def _string(blob: np.ndarray, offsets: np.ndarray, i: int) -> str:
+        return bytes(blob[offsets[i] : offsets[i + 1]]).decode("utf-8")
+
+    def _scores(self, rows: Optional[np.ndarray], queries: np.ndarray) -> np.ndarray:
+        """Dot products of (a subset of) the rows with unit queries, shape (rows, queries)."""
+        matrix = self.embeddings if rows is None else self.embeddings[rows]
+        if matrix.dtype == np.float32:
+            return matrix @ queries.T
+        out = np.empty((matrix.shape[0], queries.shape[0]), dtype=np.float32)
+        for start in range(0, matrix.shape[0], FLOAT16_BLOCK_ROWS):
+            block = matrix[start : start + FLOAT16_BLOCK_ROWS].astype(np.float32)
+            out[start : start + block.shape[0]] = block @ queries.T
+        return out
+
+    def _candidates(self, sources: Optional[List[str]], since: Optional[datetime]) -> Optional[np.ndarray]:
+        """Row indices passing the filters (None = every row)."""
+        if sources is None and since is None:
+            return None
+        mask = np.ones(self.rows, dtype=bool)
+        if sources is not None:
+            codes = [self._source_codes[s] for s in sources if s in self._source_codes]
+            mask &= np.isin(self.source_codes, codes)
+        if since is not None:
+            mask &= self.timestamps >= _epoch(since)  # NaN (no date) never passes, as in SQL
+        return np.nonzero(mask)[0]
+
+    def _top_k(self, rows: Optional[np.ndarray], distances: np.ndarray, limit: int) -> List[Tuple[int, int, float]]:
+        """(row index, chunk id, distance) of the best `limit` rows, ordered by (distance, id DESC)."""
+        if distances.shape[0] == 0 or limit <= 0:
+            return []
+        if distances.shape[0] > limit:
+            keep = np.argpartition(distances, limit - 1)[:limit]
+        else:
+            keep = np.arange(distances.shape[0])
+        index = keep if rows is None else rows[keep]
+        ids = self.ids[index]
+        kept = distances[keep]
+        order = np.lexsort((-ids, kept))
+        return [(int(index[o]), int(ids[o]), float(kept[o])) for o in order]
+
+    def _unit_queries(self, vectors: Sequence[Sequence[float]]) -> np.ndarray:
+        queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.dim)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        return queries / np.where(norms == 0, 1.0, norms)
+
+    def multi_rows(self, vectors: Sequence[Sequence[float]], limit: int) -> List[tuple]:
+        """Top-k per vector as (query_idx, id, article_id, chunk, source_type, score) rows, like
+        retriever._multi_vector_sql (query_idx is 1-based)."""
+        self.searches += 1
+        if not self.rows or not vectors:
+            return []
+        distances = 1.0 - self._scores(None, self._unit_queries(vectors))
+        rows = []
+        for q in range(len(vectors)):
+            for index, chunk_id, score in self._top_k(None, distances[:, q], limit):
+                rows.append((q + 1, chunk_id, *self._row_fields(index), score))
+        return rows
+
+    def search(
+        self,
+        vector: Sequence[float],
+        limit: int,
+        sources: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        now: Optional[datetime] = None,
+        recency_weight: Optional[float] = None,
+        half_life_hours: Optional[float] = None,
+    ) -> List[Tuple[int, str, str, float]]:
+        """
+        Exact top-k with optional source / date filters, as (id, chunk, source_type, score).
+
+        With recency_weight, the score is blended with age exactly like
+        retriever._recent_preferences_sql(recency_decay=True).
+        """
+        self.searches += 1
+        rows = self._candidates(sources, since)
+        if not self.rows or (rows is not None and rows.shape[0] == 0):
+            return []
+        distances = 1.0 - self._scores(rows, self._unit_queries([vector]))[:, 0]
+        if recency_weight:
+            ts = self.timestamps if rows is None else self.timestamps[rows]
+            age_hours = np.maximum(_epoch(now or datetime.utcnow()) - ts, 0) / 3600.0
+            distances = (1 - recency_weight) * distances + recency_weight * (
+                1 - np.power(0.5, age_hours / half_life_hours)
+            )
+        return [
+            (chunk_id, *self._row_fields(index)[1:], score)
+            for index, chunk_id, score in self._top_k(rows, distances, limit)
+        ]
+
+    def _row_fields(self, index: int) -> Tuple[str, str, str]:
+        """(article_id, chunk, source_type) of one row."""
+        return (
+            self._string(self._articles, self._article_offsets, index),
+            self._string(self._chunks, self._chunk_offsets, index),
+            self.sources[self.source_codes[index]],
+        )
+
+
+_snapshot: Optional[ChunkSnapshot] = None
+_refresh_task: Optional[asyncio.Task] = None
+_loaded_at: Optional[float] = None
+
+
+def get_snapshot() -> Optional[ChunkSnapshot]:
+    """The loaded snapshot if it belongs to the current corpus version (else use Postgres)."""
+    snapshot = _snapshot  # one read: a concurrent swap never yields a half-updated view
+    if snapshot is None or snapshot.version != corpus_version.current_version():
+        return None
+    return snapshot
+
+
+def _remove_old_versions(directory: str, keep: int) -> None:
+    versions = sorted(
+        (int(name[1:]) for name in os.listdir(directory) if name.startswith("v") and name[1:].isdigit()),
+        reverse=True,
+    )
+    for version in versions[keep:]:
+        # workers still mapping these files keep their pages until they swap
+        shutil.rmtree(os.path.join(directory, f"v{version}"), ignore_errors=True)
+
+
+async def _fetch_rows() -> List[tuple]:
+    from psycopg import sql
+
+    from db_pool import async_connection
+    from retriever import VECTOR_TABLE_NAME
+
+    query = sql.SQL(SNAPSHOT_ROWS_SQL).format(table=sql.Identifier(VECTOR_TABLE_NAME))
+    async with async_connection() as conn, conn.cursor() as cur:
+        await cur.execute(query)
+        return await cur.fetchall()
+
+
+async def refresh_snapshot(version: Optional[int]) -> Optional[ChunkSnapshot]:
+    """Load the snapshot for `version` (building it from Postgres if no worker has yet) and swap it in."""
+    global _snapshot, _loaded_at
+    if not ANN_SNAPSHOT_ENABLED or version is None:
+        return None
+    try:
+        started = time.perf_counter()
+        path = os.path.join(ANN_SNAPSHOT_DIR, f"v{version}")
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            rows = await _fetch_rows()
+            os.makedirs(ANN_SNAPSHOT_DIR, exist_ok=True)
+            path = await run_blocking(write_snapshot, rows, ANN_SNAPSHOT_DIR, version, ANN_SNAPSHOT_DTYPE)
+            await run_blocking(_remove_old_versions, ANN_SNAPSHOT_DIR, ANN_SNAPSHOT_KEEP)
+        snapshot = await run_blocking(ChunkSnapshot, path)
+        _snapshot, _loaded_at = snapshot, time.time()
+        print(
+            f"[ann-snapshot] Loaded v{version}: {snapshot.rows} chunks, {snapshot.nbytes / 1e6:.1f} MB "
+            f"({snapshot.dtype}) in {time.perf_counter() - started:.2f}s"
+        )
+        return snapshot
+    except Exception as e:
+        print(f"[ann-snapshot-error] Could not load snapshot v{version}, using Postgres: {e}")
+        return None
+
+
+def _on_corpus_change(version: int) -> None:
+    global _refresh_task
+    if not ANN_SNAPSHOT_ENABLED:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # no event loop (scripts/tests): the snapshot is simply not refreshed
+    if _refresh_task is not None and not _refresh_task.done():
+        _refresh_task.cancel()
+    _refresh_task = loop.create_task(refresh_snapshot(version))
+
+
+corpus_version.on_corpus_change(_on_corpus_change)
+
+
+async def stop_snapshot_refresh() -> None:
+    """Cancel a snapshot build still in progress (app shutdown)."""
+    global _refresh_task
+    if _refresh_task is not None and not _refresh_task.done():
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+    _refresh_task = None
+
+
+def snapshot_stats() -> Dict[str, Any]:
+    """Loaded version, size and search count (for /metrics)."""
+    snapshot = _snapshot
+    if snapshot is None:
+        return {"enabled": ANN_SNAPSHOT_ENABLED, "loaded": False}
+    return {
+        "enabled": ANN_SNAPSHOT_ENABLED,
+        "loaded": True,
+        "current": snapshot.version == corpus_version.current_version(),
+        "version": snapshot.version,
+        "rows": snapshot.rows,
+        "dtype": snapshot.dtype,
+        "bytes": snapshot.nbytes,
+        "searches": snapshot.searches,
+        "loaded_at": _loaded_at,
+    }
@@ -0,0 +1,254 @@
+"""
+Semantic answer cache for /ws/chat (used by main.py)
+
+Many users ask the same question in different words on the same day. The answer cache keys
+each generated podcast on the embedding of the transcribed question plus the corpus version
+(corpus_version.py); a new question whose embedding is within ANSWER_CACHE_THRESHOLD cosine
+similarity of a cached one reuses its podcast_text, and its audio too when the voice
+matches. A hit costs one embedding and one in-memory lookup instead of query enhancement,
+retrieval, Gemini generation and TTS.
+
+Only general questions are cached: contextual questions are answered from the user's own
+daily brief. Nothing is cached while the corpus version is unknown, and a corpus change
+clears the cache. Clients can opt out per request with {"type": "complete",
+"answer_cache": false}.
+
+CLASSES CONTAINED:
+
+class SemanticAnswerCache:
+    Bounded LRU + TTL cache of answers, looked up by cosine similarity.
+    Audio is kept per voice under a separate byte budget.
+
+class AudioRecorder:
+    Wraps a websocket and keeps a copy of every audio frame sent through it.
+
+FUNCTIONS CONTAINED:
+
+get_answer_cache() -> SemanticAnswerCache
+    Process-wide cache instance
+
+async replay_audio(websocket, audio: bytes)
+    Stream cached audio in the same frame size as text_to_audio_stream
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np  # installed with pgvector
+
+import corpus_version
+
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "43200"))
+# A podcast WAV is a few MB, so audio gets its own budget; text outlives evicted audio
+ANSWER_CACHE_AUDIO_MAX_BYTES = int(os.environ.get("ANSWER_CACHE_AUDIO_MAX_BYTES", str(256 * 1024 * 1024)))
+AUDIO_FRAME_BYTES = 8192
+
+
+class SemanticAnswerCache:
+    """LRU + TTL cache of generated answers, matched by question-embedding similarity."""
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl_seconds: Optional[float] = 43200.0,
+        threshold: float = 0.95,
+        audio_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Args:
+            max_size: Maximum number of answers; the least recently used one is evicted first
+            ttl_seconds: Seconds an answer stays valid after it was stored (None = never expires)
+            threshold: Minimum cosine similarity between question embeddings for a hit
+            audio_max_bytes: Total audio kept across all answers (least recently used dropped first)
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.audio_max_bytes = audio_max_bytes
+        self._lock = threading.Lock()
+        # slot -> entry; the unit-length question vectors live in row `slot` of _matrix
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._free: List[int] = list(range(max_size - 1, -1, -1))
+        self._audio_bytes = 0
+        self._next_id = 0
+        self.hits = 0
+        self.audio_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _drop(self, slot: int) -> None:
+        entry = self._entries.pop(slot)
+        self._audio_bytes -= sum(len(audio) for audio in entry["audio"].values())
+        self._free.append(slot)
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry["stored_at"] > self.ttl_seconds
+
+    def lookup(self, embedding: List[float], version: Optional[int], voice: Optional[str] = None):
+        """Return the closest cached answer for this corpus version if similar enough, else None.
+
+        The returned entry is a dict with question, podcast_text, similarity and audio (the
+        cached WAV for `voice`, or None).
+        """
+        query = self._unit(embedding)
+        if version is None or query is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for slot in [s for s, e in self._entries.items() if e["version"] != version or self._expired(e, now)]:
+                self._drop(slot)
+            if not self._entries or self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+            slots = list(self._entries)
+            similarities = self._matrix[slots] @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            slot = slots[best]
+            self._entries.move_to_end(slot)
+            entry = self._entries[slot]
+            audio = entry["audio"].get(voice)
+            if audio is not None:
+                entry["audio"][voice] = entry["audio"].pop(voice)  # keep recently used audio last
+            self.hits += 1
+            self.audio_hits += audio is not None
+            return {
+                "handle": (slot, entry["id"]),
+                "question": entry["question"],
+                "podcast_text": entry["podcast_text"],
+                "similarity": similarity,
+                "audio": audio,
+            }
+
+    def store(self, embedding: List[float], version: Optional[int], question: str, podcast_text: str):
+        """Cache an answer; returns a handle for add_audio, or None if not cacheable."""
+        vector = self._unit(embedding)
+        if version is None or vector is None:
+            return None
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                for slot in list(self._entries):
+                    self._drop(slot)
+                self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+            if not self._free:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free.pop()
+            self._matrix[slot] = vector
+            self._next_id += 1
+            self._entries[slot] = {
+                "id": self._next_id,
+                "question": question,
+                "podcast_text": podcast_text,
+                "version": version,
+                "stored_at": time.monotonic(),
+                "audio": {},
+            }
+            return (slot, self._next_id)
+
+    def add_audio(self, handle: Optional[tuple], voice: Optional[str], audio: bytes) -> None:
+        """Attach synthesized audio for one voice to a cached answer (if it is still cached)."""
+        if handle is None or not audio or len(audio) > self.audio_max_bytes:
+            return
+        slot, entry_id = handle
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is None or entry["id"] != entry_id:  # evicted, slot reused meanwhile
+                return
+            self._audio_bytes += len(audio) - len(entry["audio"].pop(voice, b""))
+            entry["audio"][voice] = audio
+            # Drop audio of the least recently used other answers until back under budget
+            for other_slot, other in list(self._entries.items()):
+                if self._audio_bytes <= self.audio_max_bytes:
+                    break
+                if other_slot == slot:
+                    continue
+                for other_voice in list(other["audio"]):
+                    if self._audio_bytes <= self.audio_max_bytes:
+                        break
+                    self._audio_bytes -= len(other["audio"].pop(other_voice))
+
+    def clear(self) -> None:
+        """Drop every answer. Counters are kept."""
+        with self._lock:
+            for slot in list(self._entries):
+                self._drop(slot)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters as a plain dict (for /metrics and logs)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "threshold": self.threshold,
+                "audio_bytes": self._audio_bytes,
+                "hits": self.hits,
+                "audio_hits": self.audio_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class AudioRecorder:
+    """Forwards everything to the wrapped websocket and keeps a copy of the bytes sent."""
+
+    def __init__(self, websocket):
+        self._websocket = websocket
+        self._frames: List[bytes] = []
+
+    async def send_bytes(self, data: bytes) -> None:
+        self._frames.append(bytes(data))
+        await self._websocket.send_bytes(data)
+
+    def __getattr__(self, name):
+        return getattr(self._websocket, name)
+
+    @property
+    def audio(self) -> bytes:
+        return b"".join(self._frames)
+
+
+async def replay_audio(websocket, audio: bytes) -> None:
+    """Send cached audio in the same frame size text_to_audio_stream uses."""
+    for i in range(0, len(audio), AUDIO_FRAME_BYTES):
+        await websocket.send_bytes(audio[i : i + AUDIO_FRAME_BYTES])
+
+
+_answer_cache = SemanticAnswerCache(
+    max_size=ANSWER_CACHE_SIZE,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    threshold=ANSWER_CACHE_THRESHOLD,
+    audio_max_bytes=ANSWER_CACHE_AUDIO_MAX_BYTES,
+)
+corpus_version.on_corpus_change(lambda version: _answer_cache.clear())
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Process-wide answer cache (each uvicorn worker has its own)."""
+    return _answer_cache
@@ -0,0 +1,59 @@
+"""
+Bounded thread pool for blocking calls made from async code (used by main.py, gcs_storage.py,
+firebase_auth.py)
+
+Everything that has a native asyncio client (psycopg, genai, Vertex GenerativeModel,
+Text-to-Speech, Speech-to-Text) is awaited directly. SDKs without one (google-cloud-storage,
+firebase-admin) run here so they never block the event loop that serves every websocket
+on the worker.
+
+FUNCTIONS CONTAINED:
+
+async def run_blocking(func, *args, **kwargs):
+    Run a blocking function on the shared executor and await its result
+
+def shutdown_executor():
+    Called on app shutdown
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+BLOCKING_EXECUTOR_WORKERS = int(os.environ.get("BLOCKING_EXECUTOR_WORKERS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Create the executor on first use (and again after a shutdown, e.g. between test apps)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="chatter-blocking")
+        return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run func(*args, **kwargs) on the bounded executor without blocking the event loop.
+
+    At most BLOCKING_EXECUTOR_WORKERS calls run at once; further calls queue up.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor() -> None:
+    """Stop accepting work and wait for running calls to finish."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,162 @@
+"""
+Bounded buffer for the audio of one spoken question (used by main.py /ws/chat)
+
+The websocket used to append every frame to an unbounded bytearray and copy it with
+bytes(audio_buffer) before transcription. AudioIngestBuffer instead:
+1. caps a recording by duration (AUDIO_INGEST_MAX_SECONDS, once the capture format is known)
+   and by size (AUDIO_INGEST_MAX_BYTES); frames past the cap are dropped and reported once
+2. keeps at most AUDIO_INGEST_MEMORY_BYTES in memory per session; a longer recording spills
+   to an anonymous temp file, so worker memory is bounded by sessions x that limit
+3. hands the audio to STT as a memoryview (of the bytearray, or of an mmap of the spill file)
+   instead of a copy
+
+It also decides when the frame ack is due (AUDIO_ACK_INTERVAL_SECONDS), so the client gets one
+{"status": "chunk_received"} per interval instead of one JSON message per frame.
+
+CLASSES CONTAINED:
+
+class AudioIngestBuffer:
+    append(chunk) -> bool, view() (context manager yielding a memoryview), clear(), ack_due()
+"""
+
+import mmap
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+AUDIO_INGEST_MAX_SECONDS = float(os.environ.get("AUDIO_INGEST_MAX_SECONDS", "60"))
+AUDIO_INGEST_MAX_BYTES = int(os.environ.get("AUDIO_INGEST_MAX_BYTES", str(16 * 1024 * 1024)))
+AUDIO_INGEST_MEMORY_BYTES = int(os.environ.get("AUDIO_INGEST_MEMORY_BYTES", str(1024 * 1024)))
+AUDIO_ACK_INTERVAL_SECONDS = float(os.environ.get("AUDIO_ACK_INTERVAL_SECONDS", "0.25"))
+
+# Bytes per sample for the encodings whose duration can be computed from the byte count
+_BYTES_PER_SAMPLE = {"LINEAR16": 2, "MULAW": 1}
+
+
+class AudioIngestBuffer:
+    """Size- and duration-capped audio buffer that spills to disk past a memory threshold."""
+
+    def __init__(
+        self,
+        max_bytes: int = AUDIO_INGEST_MAX_BYTES,
+        max_seconds: float = AUDIO_INGEST_MAX_SECONDS,
+        memory_bytes: int = AUDIO_INGEST_MEMORY_BYTES,
+        ack_interval: float = AUDIO_ACK_INTERVAL_SECONDS,
+    ):
+        """
+        Args:
+            max_bytes: Hard cap on one recording, whatever the format
+            max_seconds: Duration cap, applied once set_format() gives the byte rate
+            memory_bytes: Bytes kept in memory before spilling to a temp file
+            ack_interval: Minimum seconds between two frame acks
+        """
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.memory_bytes = memory_bytes
+        self.ack_interval = ack_interval
+        self._limit = max_bytes
+        self._memory = bytearray()
+        self._file = None
+        self._size = 0
+        self._frames = 0
+        self._last_ack = 0.0
+        self.truncated = False
+        self.spills = 0
+
+    def set_format(self, audio_format: Optional[Dict]) -> None:
+        """Apply the duration cap for this capture format (unknown formats keep the byte cap only)."""
+        self._limit = self.max_bytes
+        if audio_format and audio_format.get("encoding") in _BYTES_PER_SAMPLE:
+            byte_rate = (
+                audio_format["sample_rate"]
+                * audio_format.get("channels", 1)
+                * _BYTES_PER_SAMPLE[audio_format["encoding"]]
+            )
+            self._limit = min(self.max_bytes, int(byte_rate * self.max_seconds))
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def append(self, chunk: bytes) -> bool:
+        """
+        Add one frame.
+
+        Returns:
+            False if the frame was dropped because the recording hit its cap
+        """
+        if self._size + len(chunk) > self._limit:
+            self.truncated = True
+            return False
+        if self._file is None and self._size + len(chunk) > self.memory_bytes:
+            self._file = tempfile.TemporaryFile(prefix="audio-ingest-")
+            self._file.write(self._memory)
+            self._memory = bytearray()
+            self.spills += 1
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._memory += chunk
+        self._size += len(chunk)
+        self._frames += 1
+        return True
+
+    def ack_due(self) -> bool:
+        """True at most once per ack_interval (the caller then sends one ack for all frames since)."""
+        now = time.monotonic()
+        if now - self._last_ack < self.ack_interval:
+            return False
+        self._last_ack = now
+        return True
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """
+        The whole recording as a read-only memoryview, without copying it.
+
+        Use as `with buffer.view() as audio:`; the view must not be used after the block
+        (the buffer can only grow or be cleared again once it is released).
+        """
+        if self._file is None:
+            base = memoryview(self._memory)
+            try:
+                with base.toreadonly() as audio:
+                    yield audio
+            finally:
+                base.release()
+            return
+        self._file.flush()
+        if self._size == 0:
+            yield memoryview(b"")
+            return
+        mapped = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        try:
+            with memoryview(mapped) as audio:
+                yield audio
+        finally:
+            mapped.close()
+
+    def clear(self) -> None:
+        """Drop the recording (and its spill file) for the next question."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._memory = bytearray()
+        self._size = 0
+        self._frames = 0
+        self.truncated = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and spill state as a plain dict (for logs)."""
+        return {
+            "bytes": self._size,
+            "frames": self._frames,
+            "limit_bytes": self._limit,
+            "spilled": self.spilled,
+            "truncated": self.truncated,
+        }
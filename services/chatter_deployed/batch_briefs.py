@@ -0,0 +1,366 @@
+"""
+Overnight pre-generation of daily briefs (used by main.py, or run as a script)
+
+Briefs are otherwise generated when the user opens the podcast page, which makes the first
+visit of the morning the slowest request in the system. The loader's chunk_embed_load bumps
+the corpus version and sends NOTIFY corpus_updated when it has loaded new articles
+(corpus_version.py); on that signal one chatter replica (the one holding a Postgres advisory
+lock) generates the brief of every active user, so /api/daily-brief/status already reports
+generated_today when they open the app.
+
+- Same code path as the button: each brief runs _generate_daily_brief through a
+  BriefJobManager (brief_jobs.py), so it is saved with save_audio_history, sets
+  last_daily_brief_generated, and is single flight with a click on any replica
+- Bounded: at most BATCH_BRIEFS_CONCURRENCY briefs at once, started no faster than
+  BATCH_BRIEFS_PER_MINUTE (Gemini / TTS quota), on a manager of its own so the batch never
+  takes the workers of interactive brief requests
+- Active users: topics and sources set, and audio history in the last BATCH_BRIEFS_ACTIVE_DAYS
+  days (0 = every user with preferences). Users whose brief is already up to date today are
+  skipped
+- Resumable: the checkpoint file (BATCH_BRIEFS_CHECKPOINT_PATH) records every finished user
+  of the day's run; a restarted run skips them (and the ones that failed, unless
+  retry_failed)
+- Report: users generated / skipped / failed, briefs per minute and p50/p95 brief seconds,
+  printed, kept in the checkpoint and shown in /metrics
+
+Manual run (e.g. a day the loader found nothing new, or to resume):
+
+    python batch_briefs.py [--users a,b] [--concurrency N] [--per-minute N] [--retry-failed]
+
+CLASSES CONTAINED:
+
+class RateLimiter:
+    acquire() spaces calls 60/per_minute seconds apart
+
+FUNCTIONS CONTAINED:
+
+needs_brief(user, today) -> bool
+    False if the user's brief was generated today and preferences have not changed since
+
+async run_batch(generate, users=None, ...) -> Dict
+    Pre-generate the briefs and return the run report
+
+async run_batch_exclusive(generate) -> Optional[Dict]
+    run_batch under the advisory lock (None if another replica is running it)
+
+schedule_batch_on_corpus_change(generate)
+    Start run_batch_exclusive whenever the loader publishes a new corpus version (main.py)
+
+async stop_batch()
+    Cancel a batch still running (app shutdown)
+
+batch_stats() -> Dict
+    Whether a batch is running and the last run report (for /metrics)
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import psycopg
+
+import corpus_version
+from brief_jobs import DAILY_BRIEF_JOB_TIMEOUT_SECONDS, DAILY_BRIEF_JOBS_PERSIST, BriefJobManager, RunJob
+from db_pool import DB_URL
+from user_db import get_daily_brief_users_async
+
+BATCH_BRIEFS_ON_LOAD = os.environ.get("BATCH_BRIEFS_ON_LOAD", "true").lower() in ("1", "true", "yes")
+BATCH_BRIEFS_CONCURRENCY = int(os.environ.get("BATCH_BRIEFS_CONCURRENCY", "2"))
+BATCH_BRIEFS_PER_MINUTE = float(os.environ.get("BATCH_BRIEFS_PER_MINUTE", "20"))
+BATCH_BRIEFS_ACTIVE_DAYS = int(os.environ.get("BATCH_BRIEFS_ACTIVE_DAYS", "14"))
+BATCH_BRIEFS_CHECKPOINT_PATH = os.environ.get("BATCH_BRIEFS_CHECKPOINT_PATH", "/tmp/batch_briefs_checkpoint.json")
+# Any constant shared by the replicas; pg_try_advisory_lock elects the one that runs the batch
+BATCH_BRIEFS_LOCK_ID = 7242024
+
+_batch_task: Optional[asyncio.Task] = None
+_seen_version: Optional[int] = None
+_last_report: Optional[Dict[str, Any]] = None
+
+
+class RateLimiter:
+    """Spaces acquire() calls at least 60/per_minute seconds apart (per_minute <= 0: no limit)."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _parse_utc(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+    # user_preferences.updated_at is a TIMESTAMP written with NOW() in UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def needs_brief(user: Dict[str, Any], today: date) -> bool:
+    """Same rule as /api/daily-brief/status: a brief from today is current unless topics/sources changed since."""
+    last_generated = _parse_utc(user.get("last_daily_brief_generated"))
+    if last_generated is None or last_generated.date() != today:
+        return True
+    preferences_updated = _parse_utc(user.get("preferences_updated"))
+    return preferences_updated is not None and preferences_updated > last_generated
+
+
+def _load_checkpoint(path: str, run_date: str) -> Dict[str, Any]:
+    """The checkpoint of today's run, or a fresh one (a checkpoint from another day is ignored)."""
+    checkpoint = {"run_date": run_date, "done": {}, "failed": {}, "report": None}
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+        if saved.get("run_date") == run_date:
+            checkpoint.update(done=saved.get("done", {}), failed=saved.get("failed", {}))
+            print(
+                f"[batch-briefs] Resuming run of {run_date}: {len(checkpoint['done'])} done, "
+                f"{len(checkpoint['failed'])} failed"
+            )
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[batch-briefs-warning] Ignoring unreadable checkpoint {path}: {e}")
+    return checkpoint
+
+
+def _save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """Write the checkpoint atomically (temp file + rename), so a crash never leaves half a file."""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"[batch-briefs-error] Failed to write checkpoint {path}: {e}")
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+
+async def run_batch(
+    generate: RunJob,
+    users: Optional[List[Dict[str, Any]]] = None,
+    concurrency: int = BATCH_BRIEFS_CONCURRENCY,
+    per_minute: float = BATCH_BRIEFS_PER_MINUTE,
+    active_days: int = BATCH_BRIEFS_ACTIVE_DAYS,
+    checkpoint_path: str = BATCH_BRIEFS_CHECKPOINT_PATH,
+    retry_failed: bool = False,
+    persist: bool = DAILY_BRIEF_JOBS_PERSIST,
+) -> Dict[str, Any]:
+    """
+    Pre-generate the daily brief of every user that needs one.
+
+    Args:
+        generate: async generate(user_id, progress) -> result (main._generate_daily_brief)
+        users: [{"user_id", "last_daily_brief_generated", "preferences_updated"}]; default is
+            every active user (user_db.get_daily_brief_users_async)
+        concurrency: Briefs generated at once
+        per_minute: Briefs started per minute at most (<= 0: no limit)
+        active_days: Activity window for the default user list (0 = every user)
+        checkpoint_path: JSON checkpoint of the day's run
+        retry_failed: Retry users that failed earlier in the day's run
+        persist: Record the jobs in daily_brief_jobs (single flight with the other replicas)
+
+    Returns:
+        The run report (also stored in the checkpoint under "report")
+    """
+    global _last_report
+    started = time.perf_counter()
+    today = datetime.now(timezone.utc).date()
+    if users is None:
+        users = await get_daily_brief_users_async(active_days)
+    checkpoint = _load_checkpoint(checkpoint_path, today.isoformat())
+
+    todo = []
+    skipped_checkpoint = skipped_current = 0
+    for user in users:
+        user_id = user["user_id"]
+        if user_id in checkpoint["done"] or (user_id in checkpoint["failed"] and not retry_failed):
+            skipped_checkpoint += 1
+        elif not needs_brief(user, today):
+            skipped_current += 1
+        else:
+            todo.append(user_id)
+    print(
+        f"[batch-briefs] {len(users)} users: {len(todo)} to generate, {skipped_current} already current, "
+        f"{skipped_checkpoint} in checkpoint (concurrency {concurrency}, {per_minute:g}/min)"
+    )
+
+    manager = BriefJobManager(generate, workers=concurrency, queue_max=max(concurrency, 1), persist=persist)
+    slots = asyncio.Semaphore(max(concurrency, 1))
+    limiter = RateLimiter(per_minute)
+    durations: List[float] = []
+    counts = {"generated": 0, "attached": 0, "failed": 0}
+
+    async def generate_one(user_id: str) -> None:
+        async with slots:
+            await limiter.acquire()
+            brief_start = time.perf_counter()
+            try:
+                job, created = await manager.submit(user_id)
+                job = await manager.wait_until_done(job["job_id"], timeout=DAILY_BRIEF_JOB_TIMEOUT_SECONDS)
+                status = job["status"] if job else "missing"
+                error = (job or {}).get("error") or f"job {status}"
+            except Exception as e:
+                status, created, error = "failed", True, str(e)
+            seconds = time.perf_counter() - brief_start
+            if status == "succeeded":
+                counts["generated" if created else "attached"] += 1
+                durations.append(seconds)
+                checkpoint["done"][user_id] = round(seconds, 2)
+                checkpoint["failed"].pop(user_id, None)
+            else:
+                counts["failed"] += 1
+                checkpoint["failed"][user_id] = error
+                print(f"[batch-briefs-error] Brief for {user_id} failed: {error}")
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+    try:
+        await asyncio.gather(*(generate_one(user_id) for user_id in todo))
+    finally:
+        await manager.stop()
+
+    elapsed = time.perf_counter() - started
+    finished = counts["generated"] + counts["attached"]
+    report = {
+        "run_date": today.isoformat(),
+        "corpus_version": corpus_version.current_version(),
+        "users": len(users),
+        "generated": counts["generated"],
+        "attached": counts["attached"],
+        "failed": counts["failed"],
+        "skipped_current": skipped_current,
+        "skipped_checkpoint": skipped_checkpoint,
+        "elapsed_seconds": round(elapsed, 2),
+        "briefs_per_minute": round(finished / elapsed * 60, 2) if elapsed > 0 else None,
+        "p50_seconds": _percentile(durations, 0.5),
+        "p95_seconds": _percentile(durations, 0.95),
+        "concurrency": concurrency,
+        "per_minute": per_minute,
+    }
+    checkpoint["report"] = report
+    _save_checkpoint(checkpoint_path, checkpoint)
+    _last_report = report
+    print(f"[batch-briefs] Run report: {json.dumps(report)}")
+    return report
+
+
+async def run_batch_exclusive(generate: RunJob, **kwargs) -> Optional[Dict[str, Any]]:
+    """run_batch on one replica only: returns None at once if another holds the advisory lock."""
+    try:
+        conn = await psycopg.AsyncConnection.connect(DB_URL, autocommit=True)
+    except Exception as e:
+        print(f"[batch-briefs-error] Could not connect for the batch lock: {e}")
+        return None
+    try:
+        cur = await conn.execute("SELECT pg_try_advisory_lock(%s)", (BATCH_BRIEFS_LOCK_ID,))
+        if not (await cur.fetchone())[0]:
+            print("[batch-briefs] Another replica is running the batch, skipping")
+            return None
+        try:
+            return await run_batch(generate, **kwargs)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(%s)", (BATCH_BRIEFS_LOCK_ID,))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[batch-briefs-error] Batch failed: {e}")
+        return None
+    finally:
+        await conn.close()
+
+
+def schedule_batch_on_corpus_change(generate: RunJob) -> None:
+    """Run the batch (in the background) each time the loader publishes a new corpus version."""
+
+    def on_change(version: int) -> None:
+        global _batch_task, _seen_version
+        first, _seen_version = _seen_version is None, version
+        if first or not BATCH_BRIEFS_ON_LOAD:
+            return  # the version read at startup is not a new load
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (scripts/tests)
+        if _batch_task is not None and not _batch_task.done():
+            print(f"[batch-briefs] Corpus v{version} loaded while a batch is still running, not starting another")
+            return
+        print(f"[batch-briefs] Corpus v{version} loaded, pre-generating daily briefs")
+        _batch_task = loop.create_task(run_batch_exclusive(generate))
+
+    corpus_version.on_corpus_change(on_change)
+
+
+async def stop_batch() -> None:
+    """Cancel a batch still running (app shutdown); the checkpoint lets the next run resume."""
+    global _batch_task
+    if _batch_task is not None and not _batch_task.done():
+        _batch_task.cancel()
+        try:
+            await _batch_task
+        except asyncio.CancelledError:
+            pass
+    _batch_task = None
+
+
+def batch_stats() -> Dict[str, Any]:
+    """Whether a batch is running on this replica and its last run report (for /metrics)."""
+    return {
+        "enabled": BATCH_BRIEFS_ON_LOAD,
+        "running": _batch_task is not None and not _batch_task.done(),
+        "last_report": _last_report,
+    }
+
+
+async def _main(args) -> None:
+    from db_pool import close_async_pool
+    from main import _generate_daily_brief
+
+    users = None
+    if args.users:
+        users = [{"user_id": user_id.strip()} for user_id in args.users.split(",") if user_id.strip()]
+    try:
+        await run_batch(
+            _generate_daily_brief,
+            users=users,
+            concurrency=args.concurrency,
+            per_minute=args.per_minute,
+            active_days=args.active_days,
+            checkpoint_path=args.checkpoint,
+            retry_failed=args.retry_failed,
+        )
+    finally:
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", help="Comma-separated user ids (default: every active user)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_BRIEFS_CONCURRENCY)
+    parser.add_argument("--per-minute", type=float, default=BATCH_BRIEFS_PER_MINUTE)
+    parser.add_argument("--active-days", type=int, default=BATCH_BRIEFS_ACTIVE_DAYS)
+    parser.add_argument("--checkpoint", default=BATCH_BRIEFS_CHECKPOINT_PATH)
+    parser.add_argument("--retry-failed", action="store_true")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Benchmark: recall@k vs latency of HNSW and ivfflat against exact search (synthetic 768-d data).
+
+Builds a throwaway table of clustered random unit vectors (roughly how news chunk embeddings
+group by story), computes exact top-k with index scans disabled, then sweeps hnsw.ef_search
+and ivfflat.probes. The defaults in retriever.py (HNSW_EF_SEARCH, IVFFLAT_PROBES) should be
+the smallest values that reach the recall target.
+
+Usage (from services/chatter_deployed; needs a database with the vector extension):
+    DATABASE_URL=postgresql://... python benchmarks/bench_ann_recall.py --rows 50000 --queries 200 --k 10
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+import psycopg
+from pgvector.psycopg import Vector, register_vector
+
+TABLE = "bench_ann_vectors"
+DIM = 768
+
+
+def clustered_vectors(n, clusters, dim, spread, seed):
+    rng = random.Random(seed)
+    centroids = [[rng.gauss(0.0, 1.0) for _ in range(dim)] for _ in range(clusters)]
+    for _ in range(n):
+        c = rng.choice(centroids)
+        v = [x + rng.gauss(0.0, spread) for x in c]
+        norm = sum(x * x for x in v) ** 0.5
+        yield [x / norm for x in v]
+
+
+def top_k(cur, q, k):
+    cur.execute(f"SELECT id FROM {TABLE} ORDER BY embedding <=> %s LIMIT %s", (q, k))
+    return [row[0] for row in cur.fetchall()]
+
+
+def sweep(cur, queries, exact, k, setting, values):
+    print(f"\n{setting:>16} | recall@{k} | mean ms | p95 ms")
+    for value in values:
+        cur.execute("SELECT set_config(%s, %s, false)", (setting, str(value)))
+        recalls, timings = [], []
+        for q, truth in zip(queries, exact):
+            start = time.perf_counter()
+            found = top_k(cur, q, k)
+            timings.append(time.perf_counter() - start)
+            recalls.append(len(set(found) & set(truth)) / k)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(
+            f"{value:>16} | {statistics.mean(recalls):9.3f} | "
+            f"{statistics.mean(timings) * 1000:7.2f} | {p95 * 1000:6.2f}"
+        )
+
+
+def main(args):
+    with psycopg.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+        register_vector(conn)
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, embedding vector({DIM}))")
+        print(f"Loading {args.rows} synthetic vectors...")
+        with cur.copy(f"COPY {TABLE} (embedding) FROM STDIN") as copy:
+            for v in clustered_vectors(args.rows, args.clusters, DIM, args.spread, seed=1):
+                copy.write_row([Vector(v).to_text()])
+
+        queries = [Vector(v) for v in clustered_vectors(args.queries, args.clusters, DIM, args.spread, seed=2)]
+
+        print("Computing exact top-k (sequential scan)...")
+        cur.execute(f"ANALYZE {TABLE}")
+        start = time.perf_counter()
+        exact = [top_k(cur, q, args.k) for q in queries]
+        print(f"exact search: {(time.perf_counter() - start) / len(queries) * 1000:.2f} ms/query")
+
+        cur.execute("SET maintenance_work_mem = '1GB'")
+        start = time.perf_counter()
+        cur.execute(
+            f"CREATE INDEX ON {TABLE} USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
+        print(f"\nHNSW build (m=16, ef_construction=64): {time.perf_counter() - start:.1f} s")
+        sweep(cur, queries, exact, args.k, "hnsw.ef_search", [10, 20, 40, 64, 100, 200])
+        cur.execute(f"DROP INDEX {TABLE}_embedding_idx")
+
+        lists = max(1, int(args.rows**0.5))
+        start = time.perf_counter()
+        cur.execute(f"CREATE INDEX ON {TABLE} USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})")
+        print(f"\nivfflat build (lists={lists}): {time.perf_counter() - start:.1f} s")
+        sweep(cur, queries, exact, args.k, "ivfflat.probes", [1, 5, 10, 20, 40])
+
+        if not args.keep:
+            cur.execute(f"DROP TABLE {TABLE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=0.05)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark table afterwards")
+    main(parser.parse_args())
@@ -0,0 +1,89 @@
+"""
+Benchmark: query latency of the in-process ANN snapshot (ann_snapshot.py) on synthetic 768-d data.
+
+Writes a snapshot of clustered random unit vectors to a temporary directory, memory-maps it
+like the chatter does, and times single-vector top-k (plain, source-filtered, recency window)
+and a 3-vector multi search, for float32 and float16 storage. Recall is 1.0 by construction
+(the snapshot search is exact); float16 is compared against float32 for top-k agreement.
+
+Usage (from services/chatter_deployed; no database needed):
+    DATABASE_URL=postgresql://unused python benchmarks/bench_ann_snapshot.py --rows 20000 --queries 200 --k 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_snapshot import ChunkSnapshot, write_snapshot  # noqa: E402
+
+DIM = 768
+SOURCES = ["Harvard Gazette", "Harvard Crimson", "Harvard Law Today", "HBS Working Knowledge"]
+
+
+def clustered_vectors(n, clusters, dim, spread, rng):
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, n)] + spread * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed(fn, queries):
+    timings, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.mean(timings) * 1000, timings[max(0, int(len(timings) * 0.95) - 1)] * 1000, results
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.rows, args.clusters, DIM, args.spread, rng)
+    now = datetime.utcnow()
+    rows = [
+        (i, f"art-{i // 8}", f"chunk {i} " + "x" * 300, SOURCES[i % len(SOURCES)], now - timedelta(hours=i % 720), v)
+        for i, v in enumerate(vectors)
+    ]
+    queries = clustered_vectors(args.queries, args.clusters, DIM, args.spread, rng)
+
+    top_ids = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for version, dtype in enumerate(["float32", "float16"], 1):
+            snapshot = ChunkSnapshot(write_snapshot(rows, directory, version, dtype))
+            print(f"\n{dtype}: {snapshot.rows} rows, {snapshot.embeddings.nbytes / 1e6:.1f} MB of embeddings")
+            print(f"{'search':>24} | mean ms | p95 ms")
+            cases = {
+                "top-k": lambda q: snapshot.search(q, args.k),
+                "top-k, 1 source": lambda q: snapshot.search(q, args.k, sources=SOURCES[:1]),
+                "top-k, last 2 days": lambda q: snapshot.search(q, args.k, since=now - timedelta(days=2)),
+                "3 vectors (multi)": lambda q: snapshot.multi_rows([q, q[::-1], -q], args.k),
+            }
+            for name, fn in cases.items():
+                mean, p95, results = timed(fn, queries)
+                print(f"{name:>24} | {mean:7.3f} | {p95:6.3f}")
+                if name == "top-k":
+                    top_ids[dtype] = [[r[0] for r in found] for found in results]
+
+    agreement = statistics.mean(
+        len(set(a) & set(b)) / args.k for a, b in zip(top_ids["float32"], top_ids["float16"])
+    )
+    print(f"\nfloat16 vs float32 top-{args.k} agreement: {agreement:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
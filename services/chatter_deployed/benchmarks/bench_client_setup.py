@@ -0,0 +1,85 @@
+"""
+Benchmark: per-request Google client setup vs the shared registry (google_clients.py).
+
+Times N "requests" two ways: building a fresh client each time (what text_to_audio_stream,
+text_to_audio_bytes, _transcribe_with_google_speech and upload_audio_to_gcs used to do) and
+taking the client from the registry. By default only client construction is measured
+(credential discovery + channel creation). With --rpc each request also makes one cheap call
+(TTS list_voices), which adds the TLS handshake a fresh channel pays and a reused one does not;
+that needs real credentials (ADC).
+
+Usage (from services/chatter_deployed):
+    DATABASE_URL=postgresql://unused python benchmarks/bench_client_setup.py --requests 50
+    DATABASE_URL=postgresql://unused python benchmarks/bench_client_setup.py --requests 20 --rpc
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.auth.credentials import AnonymousCredentials  # noqa: E402
+from google.cloud import speech, storage, texttospeech  # noqa: E402
+
+import google_clients  # noqa: E402
+
+
+def report(label, timings):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[int(0.95 * (len(timings_ms) - 1))]
+    print(
+        f"{label:<38} mean {statistics.mean(timings_ms):8.2f}ms  p50 {statistics.median(timings_ms):8.2f}ms  "
+        f"p95 {p95:8.2f}ms  total {sum(timings_ms):9.1f}ms"
+    )
+
+
+async def time_requests(get_client, requests, rpc):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client = get_client()
+        if rpc:
+            await client.list_voices(language_code="en-US")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def main(args):
+    if args.anonymous:
+        # No ADC here: build with anonymous credentials (construction cost only, no discovery)
+        factories = {
+            "tts_async": lambda: texttospeech.TextToSpeechAsyncClient(credentials=AnonymousCredentials()),
+            "speech_async": lambda: speech.SpeechAsyncClient(credentials=AnonymousCredentials()),
+            "storage": lambda: storage.Client(project="bench", credentials=AnonymousCredentials()),
+        }
+    else:
+        factories = {
+            "tts_async": texttospeech.TextToSpeechAsyncClient,
+            "speech_async": speech.SpeechAsyncClient,
+            "storage": storage.Client,
+        }
+    shared = {
+        "tts_async": lambda: google_clients._get("tts_async", factories["tts_async"], loop_bound=True),
+        "speech_async": lambda: google_clients._get("speech_async", factories["speech_async"], loop_bound=True),
+        "storage": lambda: google_clients._get("storage", factories["storage"]),
+    }
+
+    print(f"{args.requests} requests per client, rpc={'on' if args.rpc else 'off'}")
+    for name, factory in factories.items():
+        rpc = args.rpc and name == "tts_async"
+        report(f"{name} fresh client per request", await time_requests(factory, args.requests, rpc))
+        shared[name]()  # warmup, as the lifespan does
+        report(f"{name} shared client", await time_requests(shared[name], args.requests, rpc))
+    await google_clients.close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--rpc", action="store_true", help="also call TTS list_voices per request (needs ADC)")
+    parser.add_argument("--anonymous", action="store_true", help="use anonymous credentials (no ADC needed)")
+    asyncio.run(main(parser.parse_args()))
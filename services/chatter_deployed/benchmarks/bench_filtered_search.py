@@ -0,0 +1,78 @@
+"""
+Benchmark: source-filtered retrieval strategies for rare vs common sources.
+
+For the rarest and the most common source_type in chunks_vector, runs the whole-corpus
+preference search (days_back=None) with each filter strategy forced, and reports latency,
+rows returned (must be limit) and recall@limit against the exact strategy. Query vectors
+are random unit vectors, so no Vertex AI calls are made.
+
+Usage (from services/chatter_deployed):
+    DATABASE_URL=postgresql://... python benchmarks/bench_filtered_search.py --limit 30 --runs 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pgvector.psycopg import Vector  # noqa: E402
+
+import retriever  # noqa: E402
+from db_pool import async_connection, close_async_pool  # noqa: E402
+
+STRATEGIES = ["exact", "iterative", "overfetch"]
+
+
+def random_unit_vector(dim):
+    v = [random.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = sum(x * x for x in v) ** 0.5
+    return Vector([x / norm for x in v])
+
+
+async def main(args):
+    async with async_connection() as conn, conn.cursor() as cur:
+        counts, iterative_supported = await retriever._source_counts_async(cur)
+        if not counts:
+            print("chunks_vector is empty")
+            return
+        ordered = sorted(counts, key=counts.get)
+        cases = {"rare": ordered[0], "common": ordered[-1]}
+        strategies = [s for s in STRATEGIES if s != "iterative" or iterative_supported]
+        print(f"{sum(counts.values())} chunks; iterative scans supported: {iterative_supported}")
+
+        for label, source in cases.items():
+            chosen = retriever.choose_filter_strategy([source], counts, iterative_supported)[0]
+            print(f"\n{label} source '{source}' ({counts[source]} chunks), auto strategy: {chosen}")
+            print(f"{'strategy':>10} | mean ms | p95 ms | min rows | recall@{args.limit}")
+            vectors = [random_unit_vector(retriever.EMBEDDING_DIM) for _ in range(args.runs)]
+            exact = [
+                await retriever._filtered_search_async(conn, cur, v, [source], args.limit, "exact") for v in vectors
+            ]
+            for strategy in strategies:
+                timings, sizes, recalls = [], [], []
+                for v, truth in zip(vectors, exact):
+                    start = time.perf_counter()
+                    rows = await retriever._filtered_search_async(conn, cur, v, [source], args.limit, strategy)
+                    timings.append(time.perf_counter() - start)
+                    sizes.append(len(rows))
+                    truth_ids = {r[0] for r in truth}
+                    recalls.append(len({r[0] for r in rows} & truth_ids) / max(len(truth_ids), 1))
+                timings.sort()
+                p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+                print(
+                    f"{strategy:>10} | {statistics.mean(timings) * 1000:7.1f} | {p95 * 1000:6.1f} | "
+                    f"{min(sizes):8d} | {statistics.mean(recalls):.3f}"
+                )
+    await close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""
+Benchmark: two-stage (Matryoshka) retrieval vs the full 768-d HNSW index on the real corpus.
+
+Copies chunks_vector.embedding (all rows, or --rows) into a throwaway table together with
+its 256-d prefix renormalized (what migration 007 stores in embedding_256), so indexes can
+be built and dropped without touching production. Synthetic vectors would not do here: the
+recall of a prefix depends on the model putting most information in the first dimensions.
+
+Queries are stored chunk embeddings plus a little gaussian noise (--noise), standing in for
+question embeddings; the query chunk itself is excluded from every result list. For each
+RERANK_FACTOR the 256-d index returns factor * k candidates which are re-ranked by the full
+cosine distance (the statement retriever.py runs for VECTOR_STORAGE=matryoshka). Recall@k is
+measured against exact top-k over the 768-d vectors.
+
+Usage (from services/chatter_deployed; needs pgvector >= 0.7):
+    DATABASE_URL=postgresql://... python benchmarks/bench_matryoshka_recall.py --queries 200 --k 10
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+import psycopg
+from pgvector.psycopg import Vector, register_vector
+
+TABLE = "bench_matryoshka_vectors"
+SMALL_DIM = 256
+
+FULL_SQL = f"SELECT id FROM {TABLE} ORDER BY embedding <=> %(q)s LIMIT %(k)s"
+TWO_STAGE_SQL = f"""
+    SELECT id FROM (
+        SELECT id, embedding FROM {TABLE}
+        ORDER BY embedding_256 <=> l2_normalize(subvector((%(q)s)::vector, 1, {SMALL_DIM}))::vector({SMALL_DIM})
+        LIMIT %(candidates)s
+    ) c
+    ORDER BY embedding <=> %(q)s, id
+    LIMIT %(k)s
+"""
+
+
+def search(cur, statement, q, query_id, k, candidates=0):
+    # One extra row so the query chunk can be dropped from the results
+    cur.execute(statement, {"q": q, "k": k + 1, "candidates": candidates + 1})
+    return [row[0] for row in cur.fetchall() if row[0] != query_id][:k]
+
+
+def measure(cur, statement, queries, exact, k, candidates=0):
+    recalls, timings = [], []
+    for (query_id, q), truth in zip(queries, exact):
+        start = time.perf_counter()
+        found = search(cur, statement, q, query_id, k, candidates)
+        timings.append(time.perf_counter() - start)
+        recalls.append(len(set(found) & set(truth)) / k)
+    timings.sort()
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    return statistics.mean(recalls), statistics.mean(timings) * 1000, p95 * 1000
+
+
+def index_mb(cur, name):
+    cur.execute("SELECT pg_relation_size(%s::regclass)", (name,))
+    return cur.fetchone()[0] / 1024 / 1024
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    with psycopg.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+        register_vector(conn)
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        limit = f"ORDER BY id DESC LIMIT {int(args.rows)}" if args.rows else ""
+        cur.execute(
+            f"""CREATE TABLE {TABLE} AS
+                SELECT id, embedding, l2_normalize(subvector(embedding, 1, {SMALL_DIM}))::vector({SMALL_DIM}) AS embedding_256
+                FROM chunks_vector WHERE embedding IS NOT NULL {limit}"""
+        )
+        cur.execute(f"ANALYZE {TABLE}")
+        cur.execute(f"SELECT count(*) FROM {TABLE}")
+        rows = cur.fetchone()[0]
+        print(f"Copied {rows} chunk embeddings")
+
+        cur.execute(f"SELECT id, embedding FROM {TABLE} ORDER BY random() LIMIT %s", (args.queries,))
+        queries = []
+        for query_id, embedding in cur.fetchall():
+            v = [float(x) + rng.gauss(0.0, args.noise) for x in embedding.to_list()]
+            norm = sum(x * x for x in v) ** 0.5
+            queries.append((query_id, Vector([x / norm for x in v])))
+
+        print("Computing exact top-k (sequential scan)...")
+        start = time.perf_counter()
+        exact = [search(cur, FULL_SQL, q, query_id, args.k) for query_id, q in queries]
+        print(f"exact search: {(time.perf_counter() - start) / len(queries) * 1000:.2f} ms/query")
+
+        cur.execute("SET maintenance_work_mem = '1GB'")
+        cur.execute(
+            f"CREATE INDEX bench_full_idx ON {TABLE} USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
+        cur.execute(
+            f"CREATE INDEX bench_small_idx ON {TABLE} USING hnsw (embedding_256 vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
+        print(
+            f"\nindex size: 768-d {index_mb(cur, 'bench_full_idx'):.1f} MB, 256-d {index_mb(cur, 'bench_small_idx'):.1f} MB"
+        )
+
+        print(f"\n{'search':>18} | recall@{args.k} | mean ms | p95 ms")
+        cur.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(args.ef_search),))
+        recall, mean_ms, p95_ms = measure(cur, FULL_SQL, queries, exact, args.k)
+        print(f"{'768-d HNSW':>18} | {recall:9.3f} | {mean_ms:7.2f} | {p95_ms:6.2f}")
+        for factor in args.rerank_factors:
+            candidates = args.k * factor
+            ef_search = max(args.ef_search, candidates + 1)  # HNSW returns at most ef_search rows
+            cur.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(ef_search),))
+            recall, mean_ms, p95_ms = measure(cur, TWO_STAGE_SQL, queries, exact, args.k, candidates)
+            print(f"{f'256-d x{factor} rerank':>18} | {recall:9.3f} | {mean_ms:7.2f} | {p95_ms:6.2f}")
+
+        if not args.keep:
+            cur.execute(f"DROP TABLE {TABLE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=0, help="copy only the newest N chunks (0 = all)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-factors", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--noise", type=float, default=0.01, help="gaussian noise added to each query dimension")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark table afterwards")
+    main(parser.parse_args())
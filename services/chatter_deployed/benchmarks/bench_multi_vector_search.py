@@ -0,0 +1,87 @@
+"""
+Benchmark: N sub-query searches as N statements (old loop) vs one unnest + LATERAL statement.
+
+Uses random unit vectors (no Vertex AI calls) against the real chunks_vector table.
+
+Usage (from services/chatter_deployed):
+    DATABASE_URL=postgresql://... python benchmarks/bench_multi_vector_search.py --queries 4 --limit 10 --runs 30
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pgvector.psycopg import Vector  # noqa: E402
+
+import retriever  # noqa: E402
+from db_pool import async_connection, close_async_pool  # noqa: E402
+
+
+def random_unit_vector(dim: int):
+    v = [random.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = sum(x * x for x in v) ** 0.5
+    return [x / norm for x in v]
+
+
+async def loop_search(vectors, limit):
+    """The pre-multi-vector path: one ORDER BY embedding <=> %s LIMIT %s per vector."""
+    results = []
+    async with async_connection() as conn, conn.cursor() as cur:
+        for v in vectors:
+            q = Vector(v)
+            await cur.execute(retriever._similarity_sql(), (q, q, limit))
+            results.append(await cur.fetchall())
+    return results
+
+
+async def multi_search(vectors, limit):
+    return (await retriever.search_vectors_multi_async(vectors, limit=limit))["per_query"]
+
+
+def summarize(name, timings):
+    timings = sorted(timings)
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(f"{name:>8}: mean {statistics.mean(timings) * 1000:7.1f} ms  "
+          f"p50 {statistics.median(timings) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms")
+
+
+async def main(args):
+    timings = {"loop": [], "multi": []}
+    mismatches = 0
+    for run in range(args.runs + 1):
+        vectors = [random_unit_vector(retriever.EMBEDDING_DIM) for _ in range(args.queries)]
+        start = time.perf_counter()
+        looped = await loop_search(vectors, args.limit)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single = await multi_search(vectors, args.limit)
+        multi_time = time.perf_counter() - start
+
+        if run == 0:
+            continue  # warm-up (pool connections, prepared statements)
+        timings["loop"].append(loop_time)
+        timings["multi"].append(multi_time)
+        mismatches += sum(
+            [r[0] for r in a] != [r[0] for r in b] for a, b in zip(looped, single)
+        )
+
+    print(f"{args.queries} sub-queries x top-{args.limit}, {args.runs} runs")
+    for name, values in timings.items():
+        summarize(name, values)
+    print(f"result lists that differ between the two paths: {mismatches}")
+    await close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=30)
+    asyncio.run(main(parser.parse_args()))
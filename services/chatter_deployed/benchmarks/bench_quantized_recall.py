@@ -0,0 +1,115 @@
+"""
+Benchmark: index size and recall@k of float32, halfvec and binary-quantized HNSW indexes
+(candidates re-ranked by the exact float32 distance) on synthetic 768-d data.
+
+Uses the same statements retriever.py runs for VECTOR_STORAGE=full|halfvec|binary: the
+compact index returns rerank_factor * k candidates and they are re-sorted by
+embedding <=> q. Recall is measured against exact top-k (index scans disabled). The
+compact modes should keep recall@10 of the full index while the index is >= 2x smaller.
+
+Usage (from services/chatter_deployed; needs a database with pgvector >= 0.7):
+    DATABASE_URL=postgresql://... python benchmarks/bench_quantized_recall.py --rows 50000 --queries 200 --k 10
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+import psycopg
+from pgvector.psycopg import Vector, register_vector
+
+TABLE = "bench_quantized_vectors"
+DIM = 768
+
+INDEXES = {
+    "full": "USING hnsw (embedding vector_cosine_ops)",
+    "halfvec": f"USING hnsw ((embedding::halfvec({DIM})) halfvec_cosine_ops)",
+    "binary": f"USING hnsw ((binary_quantize(embedding)::bit({DIM})) bit_hamming_ops)",
+}
+ORDER = {
+    "full": "embedding <=> %(q)s",
+    "halfvec": f"embedding::halfvec({DIM}) <=> (%(q)s)::halfvec({DIM})",
+    "binary": f"binary_quantize(embedding)::bit({DIM}) <~> binary_quantize(%(q)s)",
+}
+
+
+def clustered_vectors(n, clusters, dim, spread, seed):
+    rng = random.Random(seed)
+    centroids = [[rng.gauss(0.0, 1.0) for _ in range(dim)] for _ in range(clusters)]
+    for _ in range(n):
+        c = rng.choice(centroids)
+        v = [x + rng.gauss(0.0, spread) for x in c]
+        norm = sum(x * x for x in v) ** 0.5
+        yield [x / norm for x in v]
+
+
+def search(cur, mode, q, k, rerank_factor):
+    if mode == "full":
+        cur.execute(f"SELECT id FROM {TABLE} ORDER BY {ORDER[mode]} LIMIT %(k)s", {"q": q, "k": k})
+    else:
+        cur.execute(
+            f"""SELECT id FROM (SELECT id, embedding FROM {TABLE} ORDER BY {ORDER[mode]} LIMIT %(candidates)s) c
+                ORDER BY embedding <=> %(q)s, id LIMIT %(k)s""",
+            {"q": q, "k": k, "candidates": k * rerank_factor},
+        )
+    return [row[0] for row in cur.fetchall()]
+
+
+def main(args):
+    with psycopg.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+        register_vector(conn)
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(f"CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, embedding vector({DIM}))")
+        print(f"Loading {args.rows} synthetic vectors...")
+        with cur.copy(f"COPY {TABLE} (embedding) FROM STDIN") as copy:
+            for v in clustered_vectors(args.rows, args.clusters, DIM, args.spread, seed=1):
+                copy.write_row([Vector(v).to_text()])
+        cur.execute(f"ANALYZE {TABLE}")
+        queries = [Vector(v) for v in clustered_vectors(args.queries, args.clusters, DIM, args.spread, seed=2)]
+
+        print("Computing exact top-k (sequential scan)...")
+        exact = [search(cur, "full", q, args.k, 1) for q in queries]
+
+        cur.execute("SET maintenance_work_mem = '1GB'")
+        ef_search = max(args.ef_search, args.k * args.rerank_factor)
+        cur.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(ef_search),))
+        print(f"\n{'mode':>8} | index MB | build s | recall@{args.k} | mean ms | p95 ms")
+        for mode, using in INDEXES.items():
+            start = time.perf_counter()
+            cur.execute(f"CREATE INDEX bench_idx ON {TABLE} {using} WITH (m = 16, ef_construction = 64)")
+            build = time.perf_counter() - start
+            cur.execute("SELECT pg_relation_size('bench_idx')")
+            size_mb = cur.fetchone()[0] / 1024 / 1024
+
+            recalls, timings = [], []
+            for q, truth in zip(queries, exact):
+                start = time.perf_counter()
+                found = search(cur, mode, q, args.k, args.rerank_factor)
+                timings.append(time.perf_counter() - start)
+                recalls.append(len(set(found) & set(truth)) / args.k)
+            timings.sort()
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            print(
+                f"{mode:>8} | {size_mb:8.1f} | {build:7.1f} | {statistics.mean(recalls):9.3f} | "
+                f"{statistics.mean(timings) * 1000:7.2f} | {p95 * 1000:6.2f}"
+            )
+            cur.execute("DROP INDEX bench_idx")
+
+        if not args.keep:
+            cur.execute(f"DROP TABLE {TABLE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=0.05)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark table afterwards")
+    main(parser.parse_args())
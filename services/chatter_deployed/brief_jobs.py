@@ -0,0 +1,382 @@
+"""
+Background job engine for daily brief generation (used by main.py /api/daily-brief)
+
+A brief is retrieval, a 500-750 word Gemini generation, multi-chunk TTS and a GCS upload;
+holding the HTTP request open for all of that made clients time out. POST /api/daily-brief
+now enqueues a job and returns its id at once; the client polls
+GET /api/daily-brief/jobs/{job_id} (optionally long-polling with ?wait=seconds).
+
+- Bounded pool: DAILY_BRIEF_WORKERS worker tasks take jobs from a queue of at most
+  DAILY_BRIEF_QUEUE_MAX, so briefs never take more than that share of the worker away from
+  interactive Q&A on /ws/chat (which is not queued at all)
+- Single flight: a user has at most one queued/running brief; repeated clicks get the id of
+  the job already running instead of starting another
+- Job rows live in daily_brief_jobs (migration 008), so status polling works on any replica
+  and single flight holds across replicas (partial unique index on active jobs per user).
+  A row left active by a pod that died is treated as abandoned after
+  DAILY_BRIEF_JOB_TIMEOUT_SECONDS without progress. Without the table, jobs are tracked in
+  this worker only.
+
+CLASSES CONTAINED:
+
+class BriefJobManager:
+    submit(user_id), get(job_id), wait(job_id, timeout), wait_until_done(job_id), stop(), stats()
+
+class JobQueueFull(Exception):
+    Raised by submit when DAILY_BRIEF_QUEUE_MAX jobs are already waiting
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import psycopg
+
+from db_pool import async_connection
+
+DAILY_BRIEF_WORKERS = int(os.environ.get("DAILY_BRIEF_WORKERS", "2"))
+DAILY_BRIEF_QUEUE_MAX = int(os.environ.get("DAILY_BRIEF_QUEUE_MAX", "100"))
+DAILY_BRIEF_JOB_TIMEOUT_SECONDS = int(os.environ.get("DAILY_BRIEF_JOB_TIMEOUT_SECONDS", "600"))
+# Finished jobs are kept in memory this long for status polls (the table keeps them for good)
+DAILY_BRIEF_JOB_TTL_SECONDS = float(os.environ.get("DAILY_BRIEF_JOB_TTL_SECONDS", "3600"))
+DAILY_BRIEF_JOBS_PERSIST = os.environ.get("DAILY_BRIEF_JOBS_PERSIST", "true").lower() in ("1", "true", "yes")
+# Upper bound on one long poll of GET /api/daily-brief/jobs/{job_id}?wait=N
+DAILY_BRIEF_MAX_WAIT_SECONDS = float(os.environ.get("DAILY_BRIEF_MAX_WAIT_SECONDS", "25"))
+# How often wait() re-reads a job that runs on another replica
+REMOTE_POLL_SECONDS = 1.0
+
+ACTIVE_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+ABANDON_STALE_JOBS_SQL = """UPDATE daily_brief_jobs
+                       SET status = 'failed', error = 'abandoned', error_status = 500, updated_at = NOW()
+                       WHERE user_id = %s AND status IN ('queued', 'running')
+                       AND updated_at < NOW() - make_interval(secs => %s)"""
+INSERT_JOB_SQL = """INSERT INTO daily_brief_jobs (job_id, user_id, status, stage)
+                       VALUES (%s, %s, 'queued', 'queued')
+                       ON CONFLICT (user_id) WHERE status IN ('queued', 'running') DO NOTHING
+                       RETURNING job_id"""
+UPDATE_JOB_SQL = """UPDATE daily_brief_jobs
+                       SET status = %s, stage = %s, result = %s, error = %s, error_status = %s, updated_at = NOW()
+                       WHERE job_id = %s"""
+JOB_COLUMNS = "job_id, user_id, status, stage, result, error, error_status, created_at, updated_at"
+GET_JOB_SQL = f"SELECT {JOB_COLUMNS} FROM daily_brief_jobs WHERE job_id = %s"
+GET_ACTIVE_JOB_SQL = (
+    f"SELECT {JOB_COLUMNS} FROM daily_brief_jobs WHERE user_id = %s AND status IN ('queued', 'running')"
+)
+
+RunJob = Callable[[str, Callable[[str], None]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFull(Exception):
+    """Too many briefs waiting; the client should retry later."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _row_to_job(row) -> Dict[str, Any]:
+    result = row[4]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return {
+        "job_id": row[0],
+        "user_id": row[1],
+        "status": row[2],
+        "stage": row[3],
+        "result": result,
+        "error": row[5],
+        "error_status": row[6],
+        "created_at": row[7].isoformat() if row[7] else None,
+        "updated_at": row[8].isoformat() if row[8] else None,
+    }
+
+
+class BriefJobManager:
+    """Queue + bounded worker pool + single flight per user for daily brief jobs."""
+
+    def __init__(
+        self,
+        run_job: RunJob,
+        workers: int = DAILY_BRIEF_WORKERS,
+        queue_max: int = DAILY_BRIEF_QUEUE_MAX,
+        persist: bool = DAILY_BRIEF_JOBS_PERSIST,
+    ):
+        """
+        Args:
+            run_job: async run_job(user_id, progress) -> result dict; progress(stage) reports
+                the current step. Exceptions with status_code/detail (HTTPException) keep them.
+            workers: Briefs generated concurrently by this process
+            queue_max: Jobs allowed to wait for a worker
+            persist: Write job rows to daily_brief_jobs (migration 008)
+        """
+        self.run_job = run_job
+        self.workers = workers
+        self.queue_max = queue_max
+        self.persist = persist
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active_by_user: Dict[str, str] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._last_write: Dict[str, asyncio.Future] = {}
+        self.submitted = 0
+        self.deduplicated = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    # ---- persistence (best effort: errors are logged and the job carries on in memory) ----
+
+    def _disable_persistence(self, e: Exception) -> None:
+        print(f"[brief-jobs-warning] daily_brief_jobs table missing (migration 008), tracking jobs in memory: {e}")
+        self.persist = False
+
+    async def _claim_in_db(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Insert the job row; returns the active job of another replica instead, if there is one."""
+        if not self.persist:
+            return None
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(ABANDON_STALE_JOBS_SQL, (user_id, DAILY_BRIEF_JOB_TIMEOUT_SECONDS))
+                    await cur.execute(INSERT_JOB_SQL, (job_id, user_id))
+                    if await cur.fetchone():
+                        return None
+                    await cur.execute(GET_ACTIVE_JOB_SQL, (user_id,))
+                    row = await cur.fetchone()
+                    return _row_to_job(row) if row else None
+        except psycopg.errors.UndefinedTable as e:
+            self._disable_persistence(e)
+        except Exception as e:
+            print(f"[brief-jobs-error] Failed to record job {job_id}: {e}")
+        return None
+
+    async def _write(self, job: Dict[str, Any]) -> None:
+        if not self.persist:
+            return
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        UPDATE_JOB_SQL,
+                        (
+                            job["status"],
+                            job["stage"],
+                            json.dumps(job["result"]) if job["result"] is not None else None,
+                            job["error"],
+                            job["error_status"],
+                            job["job_id"],
+                        ),
+                    )
+        except psycopg.errors.UndefinedTable as e:
+            self._disable_persistence(e)
+        except Exception as e:
+            print(f"[brief-jobs-error] Failed to update job {job['job_id']}: {e}")
+
+    async def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not self.persist:
+            return None
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(GET_JOB_SQL, (job_id,))
+                    row = await cur.fetchone()
+                    return _row_to_job(row) if row else None
+        except psycopg.errors.UndefinedTable as e:
+            self._disable_persistence(e)
+        except Exception as e:
+            print(f"[brief-jobs-error] Failed to read job {job_id}: {e}")
+        return None
+
+    # ---- job state ----
+
+    def _update(self, job: Dict[str, Any], **changes) -> None:
+        """Apply changes, wake long-polls and write the row in the background (in update order)."""
+        job.update(changes, updated_at=_now())
+        event = self._changed.pop(job["job_id"], None)
+        if event is not None:
+            event.set()
+        if not self.persist:
+            return
+        previous = self._last_write.get(job["job_id"])
+        snapshot = dict(job)
+
+        async def write_after_previous():
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            await self._write(snapshot)
+
+        self._last_write[job["job_id"]] = asyncio.ensure_future(write_after_previous())
+
+    def _prune(self) -> None:
+        cutoff = time.time() - DAILY_BRIEF_JOB_TTL_SECONDS
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] in TERMINAL_STATUSES and job["_finished"] < cutoff:
+                del self._jobs[job_id]
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.ensure_future(self._worker(len(self._worker_tasks))))
+
+    async def submit(self, user_id: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Start a brief for user_id, or attach to the one already queued/running.
+
+        Returns:
+            (public job dict, created); created is False when an active job was reused
+
+        Raises:
+            JobQueueFull: If DAILY_BRIEF_QUEUE_MAX jobs are already waiting
+        """
+        self._prune()
+        active_id = self._active_by_user.get(user_id)
+        if active_id is not None:
+            self.deduplicated += 1
+            print(f"[brief-jobs] Attaching user {user_id} to running job {active_id}")
+            return self.public(self._jobs[active_id]), False
+
+        self._ensure_workers()
+        if self._queue.full():
+            raise JobQueueFull(f"{self.queue_max} daily briefs already waiting")
+
+        job_id = uuid.uuid4().hex
+        remote = await self._claim_in_db(job_id, user_id)
+        if remote is not None:
+            self.deduplicated += 1
+            print(f"[brief-jobs] Attaching user {user_id} to job {remote['job_id']} on another replica")
+            return self.public(remote), False
+        if user_id in self._active_by_user:  # another request won the race while we were in the DB
+            self.deduplicated += 1
+            return self.public(self._jobs[self._active_by_user[user_id]]), False
+
+        now = _now()
+        job = {
+            "job_id": job_id,
+            "user_id": user_id,
+            "status": "queued",
+            "stage": "queued",
+            "result": None,
+            "error": None,
+            "error_status": None,
+            "created_at": now,
+            "updated_at": now,
+            "_finished": None,
+        }
+        self._jobs[job_id] = job
+        self._active_by_user[user_id] = job_id
+        self._queue.put_nowait(job_id)
+        self.submitted += 1
+        print(f"[brief-jobs] Queued job {job_id} for user {user_id} (queue depth {self._queue.qsize()})")
+        return self.public(job), True
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(self._jobs[job_id])
+            except Exception as e:  # _run handles job errors; this is a bug in the engine itself
+                print(f"[brief-jobs-error] Worker {index} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        self._update(job, status="running", stage="starting")
+        try:
+            result = await self.run_job(job["user_id"], lambda stage: self._update(job, stage=stage))
+            self._update(job, status="succeeded", stage="complete", result=result)
+            self.succeeded += 1
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            status_code = getattr(e, "status_code", 500)
+            print(f"[brief-jobs-error] Job {job['job_id']} failed ({status_code}): {detail}")
+            self._update(job, status="failed", error=detail, error_status=status_code)
+            self.failed += 1
+        finally:
+            job["_finished"] = time.time()
+            self._active_by_user.pop(job["user_id"], None)
+        last_write = self._last_write.pop(job["job_id"], None)
+        if last_write is not None:
+            await asyncio.gather(last_write, return_exceptions=True)
+        print(f"[brief-jobs] Job {job['job_id']} {job['status']} in {time.perf_counter() - start:.1f}s")
+
+    # ---- status ----
+
+    @staticmethod
+    def public(job: Dict[str, Any]) -> Dict[str, Any]:
+        """The job as returned to clients (no internal fields)."""
+        return {key: value for key, value in job.items() if not key.startswith("_")}
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job from this worker's memory, else from daily_brief_jobs (a job run by another replica)."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return self.public(job)
+        return await self._read(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Long poll: return the job once it changes (or at once if it has finished), or after timeout.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return await self._wait_remote(job_id, timeout)
+        if job["status"] in TERMINAL_STATUSES or timeout <= 0:
+            return self.public(job)
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.public(job)
+
+    async def _wait_remote(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        job = await self._read(job_id)
+        deadline = time.monotonic() + timeout
+        while job is not None and job["status"] in ACTIVE_STATUSES and time.monotonic() < deadline:
+            await asyncio.sleep(min(REMOTE_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+            latest = await self._read(job_id)
+            if latest is None or (latest["status"], latest["stage"]) != (job["status"], job["stage"]):
+                return latest
+            job = latest
+        return job
+
+    async def wait_until_done(self, job_id: str, timeout: float = DAILY_BRIEF_JOB_TIMEOUT_SECONDS) -> Dict[str, Any]:
+        """Block until the job succeeds or fails (or timeout, returning it still active)."""
+        deadline = time.monotonic() + timeout
+        job = await self.get(job_id)
+        while job is not None and job["status"] in ACTIVE_STATUSES and time.monotonic() < deadline:
+            job = await self.wait(job_id, deadline - time.monotonic())
+        return job
+
+    async def stop(self) -> None:
+        """Cancel the workers (called on shutdown; queued jobs are abandoned)."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+        if self._last_write:
+            await asyncio.gather(*self._last_write.values(), return_exceptions=True)
+            self._last_write.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and job counters as a plain dict (for /metrics and logs)."""
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for job in self._jobs.values() if job["status"] == "running"),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "persist": self.persist,
+        }
@@ -0,0 +1,147 @@
+"""
+Token-budgeted context packer for the Gemini prompts (used by helpers.py and main.py)
+
+Q&A prompts get up to 10 chunks per sub-query and the daily brief 30, and many of them are
+near-duplicates from the same article. When the chunks do not fit the token budget this
+stage picks which ones go into the prompt:
+
+1. Order candidates by MMR (maximal marginal relevance) over their stored embeddings, so a
+   chunk that repeats one already picked loses to a slightly less relevant new one
+2. Keep at most CONTEXT_MAX_PER_ARTICLE chunks per article_id
+3. Add chunks in that order while they fit the budget
+
+The picked chunks keep their original (relevance) order. When everything fits, the input
+is returned unchanged, so prompts only differ when the budget is binding.
+
+Tokens are estimated as characters / CHARS_PER_TOKEN (no tokenizer round trip).
+
+FUNCTIONS CONTAINED:
+
+estimate_tokens(text: str) -> int
+    Approximate token count of a prompt fragment
+
+pack_context(chunks, token_budget, metadata=None, max_per_article=None, mmr_lambda=None) -> List[tuple]
+    Select the chunks that go into the prompt (metadata: chunk id -> (article_id, embedding))
+
+async pack_context_for_prompt_async(chunks, token_budget=None) -> List[tuple]
+    Same, loading article ids and embeddings from chunks_vector only when the budget is binding
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np  # installed with pgvector
+
+# Q&A prompt budget (context only; the instructions around it are fixed size)
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "2000"))
+DAILY_BRIEF_TOKEN_BUDGET = int(os.environ.get("DAILY_BRIEF_TOKEN_BUDGET", "3000"))
+CONTEXT_MAX_PER_ARTICLE = int(os.environ.get("CONTEXT_MAX_PER_ARTICLE", "3"))
+# 1.0 = pure relevance, 0.0 = pure diversity
+CONTEXT_MMR_LAMBDA = float(os.environ.get("CONTEXT_MMR_LAMBDA", "0.7"))
+CHARS_PER_TOKEN = 4
+
+Chunk = Tuple[int, str, str, float]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (Gemini averages ~4 characters per English token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _chunk_tokens(chunk: Chunk) -> int:
+    # Same formatting as the prompt builders, plus the blank line between chunks
+    _, text, source_type, _ = chunk
+    return estimate_tokens(f"Article Title: {source_type}\n{text}\n\n")
+
+
+def _mmr_order(chunks: List[Chunk], embeddings: Dict[int, np.ndarray], mmr_lambda: float) -> List[int]:
+    """Indices of chunks in MMR order; relevance is 1 - cosine distance (the retriever score).
+
+    Chunks without an embedding cannot be compared and are only ranked by relevance.
+    """
+    relevance = np.array([1.0 - float(chunk[3]) for chunk in chunks])
+    vectors = {}
+    for i, chunk in enumerate(chunks):
+        vector = embeddings.get(chunk[0])
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            if norm:
+                vectors[i] = vector / norm
+
+    remaining = list(range(len(chunks)))
+    max_similarity = np.zeros(len(chunks))
+    order = []
+    while remaining:
+        scores = [mmr_lambda * relevance[i] - (1 - mmr_lambda) * max_similarity[i] for i in remaining]
+        best = remaining.pop(int(np.argmax(scores)))
+        order.append(best)
+        if best in vectors:
+            for i in remaining:
+                if i in vectors:
+                    max_similarity[i] = max(max_similarity[i], float(vectors[i] @ vectors[best]))
+    return order
+
+
+def _needs_packing(chunks: List[Chunk], token_budget: int) -> bool:
+    return token_budget > 0 and sum(_chunk_tokens(c) for c in chunks) > token_budget
+
+
+def pack_context(
+    chunks: List[Chunk],
+    token_budget: int,
+    metadata: Optional[Dict[int, Tuple[str, Any]]] = None,
+    max_per_article: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+) -> List[Chunk]:
+    """
+    Select the chunks that go into a prompt of at most token_budget context tokens.
+
+    Args:
+        chunks: (id, chunk, source_type, score) tuples in relevance order
+        token_budget: Context token budget (<= 0 disables packing)
+        metadata: chunk id -> (article_id, embedding); missing ids are neither capped nor diversified
+        max_per_article: Chunks kept per article_id (<= 0 = no cap), default CONTEXT_MAX_PER_ARTICLE
+        mmr_lambda: Relevance/diversity trade-off, default CONTEXT_MMR_LAMBDA
+
+    Returns:
+        The selected chunks in their original order (the input itself if it already fits)
+    """
+    if not _needs_packing(chunks, token_budget):
+        return list(chunks)
+
+    metadata = metadata or {}
+    max_per_article = CONTEXT_MAX_PER_ARTICLE if max_per_article is None else max_per_article
+    mmr_lambda = CONTEXT_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    embeddings = {chunk_id: embedding for chunk_id, (_, embedding) in metadata.items() if embedding is not None}
+
+    picked = set()
+    per_article: Dict[str, int] = {}
+    used = 0
+    for i in _mmr_order(chunks, embeddings, mmr_lambda):
+        chunk_id = chunks[i][0]
+        article_id = metadata.get(chunk_id, (None, None))[0]
+        if article_id is not None and 0 < max_per_article <= per_article.get(article_id, 0):
+            continue
+        tokens = _chunk_tokens(chunks[i])
+        if used + tokens > token_budget:
+            continue  # a shorter chunk further down may still fit
+        picked.add(i)
+        used += tokens
+        if article_id is not None:
+            per_article[article_id] = per_article.get(article_id, 0) + 1
+
+    packed = [chunk for i, chunk in enumerate(chunks) if i in picked]
+    print(f"[context-packer] Packed {len(packed)}/{len(chunks)} chunks into ~{used}/{token_budget} tokens")
+    return packed
+
+
+async def pack_context_for_prompt_async(chunks: List[Chunk], token_budget: Optional[int] = None) -> List[Chunk]:
+    """pack_context with article ids and embeddings loaded from chunks_vector (one query, only if needed)."""
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    if not chunks or not _needs_packing(chunks, token_budget):
+        return list(chunks or [])
+    from retriever import chunk_metadata_async
+
+    return pack_context(chunks, token_budget, metadata=await chunk_metadata_async([c[0] for c in chunks]))
@@ -0,0 +1,120 @@
+"""
+Corpus version stamp (used by retriever.py and main.py)
+
+The loader bumps corpus_version.version and sends NOTIFY corpus_updated after every run
+that inserted chunks (migration 005). This module keeps the current version in memory via
+a LISTEN connection, so caches can key on it without a query per request. The version is
+also re-read every CORPUS_VERSION_POLL_SECONDS in case a notification was missed.
+
+While the version is unknown (listener not started, table missing) current_version()
+returns None and callers must not cache.
+
+FUNCTIONS CONTAINED:
+
+current_version() -> Optional[int]
+    Last known corpus version
+
+on_corpus_change(callback)
+    Register callback(new_version), called when the version changes (e.g. cache.clear)
+
+async start_corpus_listener() / async stop_corpus_listener()
+    Called from the app lifespan
+"""
+
+import asyncio
+import os
+from contextlib import aclosing
+from typing import Callable, List, Optional
+
+import psycopg
+
+from db_pool import DB_URL
+
+CORPUS_UPDATED_CHANNEL = "corpus_updated"
+CORPUS_VERSION_POLL_SECONDS = float(os.environ.get("CORPUS_VERSION_POLL_SECONDS", "300"))
+CORPUS_VERSION_SQL = "SELECT version FROM corpus_version WHERE id = 1"
+
+_version: Optional[int] = None
+_callbacks: List[Callable[[int], None]] = []
+_listener_task: Optional[asyncio.Task] = None
+
+
+def current_version() -> Optional[int]:
+    """Last known corpus version (None = unknown, do not cache)."""
+    return _version
+
+
+def on_corpus_change(callback: Callable[[int], None]) -> None:
+    """Call callback(new_version) whenever the corpus version changes."""
+    _callbacks.append(callback)
+
+
+def _set_version(version: Optional[int]) -> None:
+    global _version
+    if version is None or version == _version:
+        return
+    previous, _version = _version, version
+    print(f"[corpus-version] {previous} -> {version}")
+    for callback in _callbacks:
+        try:
+            callback(version)
+        except Exception as e:
+            print(f"[corpus-version-error] Callback failed: {e}")
+
+
+async def _read_version(conn: psycopg.AsyncConnection) -> Optional[int]:
+    try:
+        cur = await conn.execute(CORPUS_VERSION_SQL)
+        row = await cur.fetchone()
+        return row[0] if row else 0
+    except psycopg.errors.UndefinedTable:
+        print("[corpus-version-warning] corpus_version table missing (migration 005), caching disabled")
+        return None
+
+
+async def _listen_forever() -> None:
+    """Keep a dedicated LISTEN connection open; reconnect with backoff if it drops."""
+    backoff = 1.0
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(DB_URL, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {CORPUS_UPDATED_CHANNEL}")
+                _set_version(await _read_version(conn))
+                backoff = 1.0
+                while True:
+                    # Wakes up on every NOTIFY, and at least every poll interval. notifies() holds
+                    # the connection lock while it waits, so no query can run inside the loop: a
+                    # payload that is not a version ends it (closing the generator releases the
+                    # lock) and the version is re-read below.
+                    async with aclosing(conn.notifies(timeout=CORPUS_VERSION_POLL_SECONDS)) as notifies:
+                        async for notify in notifies:
+                            try:
+                                _set_version(int(notify.payload))
+                            except ValueError:
+                                break
+                    _set_version(await _read_version(conn))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[corpus-version-error] Listener failed: {e}, retrying in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+
+async def start_corpus_listener() -> None:
+    """Start the background LISTEN task (app startup)."""
+    global _listener_task
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen_forever())
+
+
+async def stop_corpus_listener() -> None:
+    """Cancel the LISTEN task (app shutdown)."""
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
@@ -0,0 +1,174 @@
+"""
+Shared PostgreSQL connection pools (used by retriever.py, user_db.py and helpers.py)
+
+Opening a connection to Cloud SQL (TLS + auth through the proxy) costs more than most of
+our queries, so every module borrows connections from one pool per process instead of
+calling psycopg.connect() per operation.
+
+FUNCTIONS CONTAINED:
+
+get_pool() -> ConnectionPool
+    Process-wide synchronous pool (opened lazily on first use)
+
+async get_async_pool() -> AsyncConnectionPool
+    Process-wide asyncio pool (opened lazily inside the running event loop)
+
+connection()
+    Context manager: borrow a pooled sync connection (autocommit, pgvector registered)
+
+async_connection()
+    Async context manager: borrow a pooled async connection
+
+pool_stats() -> Dict
+    Pool size / availability / waiting requests and a saturation ratio for /metrics
+
+close_pools() / async close_async_pool()
+    Called on app shutdown
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+import psycopg
+from pgvector.psycopg import register_vector, register_vector_async
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+DB_URL = os.environ.get("DATABASE_URL")
+if not DB_URL:
+    raise RuntimeError("DATABASE_URL environment variable not set")
+
+# Pool configuration (per process; each uvicorn worker has its own pools)
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+DB_POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", "300"))  # close idle connections after this
+# Hot queries are executed with prepare=True so Postgres plans them once per connection
+PREPARE_HOT_QUERIES = os.environ.get("DB_PREPARE_STATEMENTS", "true").lower() == "true"
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_async_pool: Optional[AsyncConnectionPool] = None
+_async_pool_lock: Optional[asyncio.Lock] = None
+
+
+def _configure(conn: psycopg.Connection) -> None:
+    """Run once per new pooled connection: register the pgvector type adapters."""
+    try:
+        register_vector(conn)
+    except psycopg.ProgrammingError as e:
+        # vector extension missing (e.g. a fresh test database); user queries still work
+        print(f"[db-pool-warning] pgvector not registered: {e}")
+
+
+async def _configure_async(conn: psycopg.AsyncConnection) -> None:
+    """Async twin of _configure()."""
+    try:
+        await register_vector_async(conn)
+    except psycopg.ProgrammingError as e:
+        print(f"[db-pool-warning] pgvector not registered: {e}")
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide sync pool, creating and opening it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool(
+                    DB_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    kwargs={"autocommit": True},
+                    configure=_configure,
+                    name="chatter-sync",
+                    open=False,
+                )
+                pool.open(wait=False)
+                _pool = pool
+                print(f"[db-pool] Opened sync pool (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})")
+    return _pool
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """Return the process-wide async pool, creating and opening it on first use."""
+    global _async_pool, _async_pool_lock
+    if _async_pool is not None:
+        return _async_pool
+    if _async_pool_lock is None:
+        _async_pool_lock = asyncio.Lock()
+    async with _async_pool_lock:
+        if _async_pool is None:
+            pool = AsyncConnectionPool(
+                DB_URL,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                timeout=DB_POOL_TIMEOUT,
+                max_idle=DB_POOL_MAX_IDLE,
+                kwargs={"autocommit": True},
+                configure=_configure_async,
+                name="chatter-async",
+                open=False,
+            )
+            await pool.open(wait=False)
+            _async_pool = pool
+            print(f"[db-pool] Opened async pool (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})")
+    return _async_pool
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; it goes back to the pool when the block exits."""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def async_connection():
+    """Borrow a pooled async connection; it goes back to the pool when the block exits."""
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        yield conn
+
+
+def _describe(pool: Optional[Any]) -> Optional[Dict[str, Any]]:
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    stats["connections_in_use"] = in_use
+    stats["saturation"] = round(in_use / pool.max_size, 4) if pool.max_size else 0.0
+    return stats
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Snapshot of both pools for /metrics.
+
+    saturation = connections in use / max_size; requests_waiting > 0 means callers are
+    queueing for a connection and DB_POOL_MAX_SIZE is too small for the load.
+    """
+    return {"sync": _describe(_pool), "async": _describe(_async_pool)}
+
+
+def close_pools() -> None:
+    """Close the sync pool (app shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+            print("[db-pool] Closed sync pool")
+
+
+async def close_async_pool() -> None:
+    """Close the async pool (app shutdown)."""
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+        print("[db-pool] Closed async pool")
@@ -3,6 +3,8 @@ from firebase_admin import auth, credentials
 from typing import Dict
 import os
 
+from async_utils import run_blocking
+
 """Firebase Admin SDK initialization and token verification."""
 
 """
@@ -10,6 +12,7 @@ FUNCTIONS CONTAINED:
 
 initialize_firebase_admin()   ---- called by main.py
 verify_token(token: str) -> Dict --- called by main.py
+async verify_token_async(token: str) -> Dict --- called by main.py (auth middleware)
 
 """
 
@@ -60,3 +63,13 @@ def verify_token(token: str) -> Dict:
     except Exception as e:
         print(f"[firebase-admin-error] Token verification failed: {e}")
         raise
+
+
+async def verify_token_async(token: str) -> Dict:
+    """
+    Same as verify_token, run on the bounded executor.
+
+    verify_id_token may fetch Google's public certificates over HTTP, which must not
+    block the event loop.
+    """
+    return await run_blocking(verify_token, token)
@@ -1,10 +1,12 @@
 """Google Cloud Storage helper for uploading audio files."""
 import os
-from google.cloud import storage
 from typing import Optional
 import uuid
 from datetime import datetime
 
+from async_utils import run_blocking
+from google_clients import get_storage_client
+
 
 def upload_audio_to_gcs(audio_bytes: bytes, user_id: str, filename_prefix: str = "daily-brief") -> Optional[str]:
     """
@@ -25,9 +27,9 @@ def upload_audio_to_gcs(audio_bytes: bytes, user_id: str, filename_prefix: str =
         
         print(f"[gcs] Uploading to bucket: {bucket_name}, prefix: {gcs_prefix}")
         
-        # Use default credentials (Workload Identity in GKE, ADC elsewhere)
-        client = storage.Client()
-        print("[gcs] Using default credentials")
+        # Shared client (google_clients.py): default credentials (Workload Identity in GKE,
+        # ADC elsewhere), discovered once per worker
+        client = get_storage_client()
         
         bucket = client.bucket(bucket_name)
         
@@ -57,4 +59,15 @@ def upload_audio_to_gcs(audio_bytes: bytes, user_id: str, filename_prefix: str =
         import traceback
         traceback.print_exc()
         return None
-        
\ No newline at end of file
+        
+
+async def upload_audio_to_gcs_async(
+    audio_bytes: bytes, user_id: str, filename_prefix: str = "daily-brief"
+) -> Optional[str]:
+    """
+    Async wrapper around upload_audio_to_gcs.
+
+    google-cloud-storage has no asyncio client, so the upload runs on the bounded
+    executor in async_utils instead of blocking the event loop.
+    """
+    return await run_blocking(upload_audio_to_gcs, audio_bytes, user_id, filename_prefix)
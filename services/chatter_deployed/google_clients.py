@@ -0,0 +1,179 @@
+"""
+Process-wide Google Cloud clients (used by text_to_speech_client.py, speech_to_text_client.py,
+gcs_storage.py, tts_cache.py and main.py)
+
+Building a client pays for credential discovery (ADC / Workload Identity metadata lookup),
+gRPC channel creation and, on the first call, the TLS handshake. Doing that per request adds
+tens to hundreds of milliseconds to every synthesis, transcription and upload, so each client
+is built once per worker and its channel is reused by every request after that.
+
+warmup_clients() is awaited in the FastAPI lifespan before the app starts serving, so the
+health checks only answer once the clients exist and their channels are connected.
+close_clients() closes the channels on shutdown.
+
+Asyncio clients are bound to the event loop they were created on; if they are requested from
+a different loop (tests, scripts calling asyncio.run twice) they are rebuilt for that loop.
+
+FUNCTIONS CONTAINED:
+
+get_tts_client() / get_tts_async_client()
+    Shared Text-to-Speech clients (blocking and asyncio)
+
+get_speech_async_client()
+    Shared Speech-to-Text asyncio client
+
+get_storage_client()
+    Shared google-cloud-storage client (HTTP session reused across uploads)
+
+async warmup_clients()
+    Build every client, connect the gRPC channels and initialize Firebase Admin (startup)
+
+async close_clients()
+    Close the channels and drop the clients (shutdown)
+
+reset_clients()
+    Drop the clients without closing them (tests)
+
+client_stats() -> Dict[str, Any]
+    Which clients exist, how long each took to build and how often each was reused
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from google.cloud import speech, storage, texttospeech
+
+from async_utils import run_blocking
+from firebase_auth import initialize_firebase_admin
+
+GOOGLE_CLIENT_WARMUP = os.environ.get("GOOGLE_CLIENT_WARMUP", "true").lower() in ("1", "true", "yes")
+GOOGLE_CLIENT_WARMUP_TIMEOUT_SECONDS = float(os.environ.get("GOOGLE_CLIENT_WARMUP_TIMEOUT_SECONDS", "10"))
+
+_clients: Dict[str, Any] = {}
+_client_loops: Dict[str, Optional[asyncio.AbstractEventLoop]] = {}
+_build_ms: Dict[str, float] = {}
+_uses: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _get(name: str, factory: Callable[[], Any], loop_bound: bool = False) -> Any:
+    """Return the cached client for name, building it with factory on first use."""
+    loop = _running_loop() if loop_bound else None
+    client = _clients.get(name)
+    if client is None or (loop_bound and _client_loops.get(name) is not loop):
+        with _lock:
+            client = _clients.get(name)
+            if client is None or (loop_bound and _client_loops.get(name) is not loop):
+                start = time.perf_counter()
+                client = factory()
+                _build_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+                print(f"[google-clients] Built {name} client in {_build_ms[name]}ms")
+                _clients[name] = client
+                _client_loops[name] = loop
+    _uses[name] = _uses.get(name, 0) + 1
+    return client
+
+
+def get_tts_client() -> texttospeech.TextToSpeechClient:
+    """Shared blocking Text-to-Speech client (thread-safe, used from the chunk thread pool)."""
+    return _get("tts", lambda: texttospeech.TextToSpeechClient())
+
+
+def get_tts_async_client() -> texttospeech.TextToSpeechAsyncClient:
+    """Shared asyncio Text-to-Speech client for the current event loop."""
+    return _get("tts_async", lambda: texttospeech.TextToSpeechAsyncClient(), loop_bound=True)
+
+
+def get_speech_async_client() -> speech.SpeechAsyncClient:
+    """Shared asyncio Speech-to-Text client for the current event loop."""
+    return _get("speech_async", lambda: speech.SpeechAsyncClient(), loop_bound=True)
+
+
+def get_storage_client() -> storage.Client:
+    """Shared google-cloud-storage client (uses default credentials: Workload Identity in GKE, ADC elsewhere)."""
+    return _get("storage", lambda: storage.Client())
+
+
+async def _channel_ready(name: str, client: Any) -> None:
+    """Connect an asyncio client's gRPC channel so the first request skips the TLS handshake."""
+    try:
+        channel = client.transport.grpc_channel
+        await asyncio.wait_for(channel.channel_ready(), timeout=GOOGLE_CLIENT_WARMUP_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"[google-clients-warning] {name} channel not connected during warmup: {e}")
+
+
+async def warmup_clients() -> None:
+    """
+    Build the clients and connect their channels (called by the lifespan before serving).
+
+    Failures are logged, not raised: a client that could not be built here is retried on
+    first use, as before.
+    """
+    if not GOOGLE_CLIENT_WARMUP:
+        print("[google-clients] Warmup disabled (GOOGLE_CLIENT_WARMUP=false)")
+        return
+    start = time.perf_counter()
+    for name, getter in (("tts_async", get_tts_async_client), ("speech_async", get_speech_async_client)):
+        try:
+            await _channel_ready(name, getter())
+        except Exception as e:
+            print(f"[google-clients-warning] Could not build {name} client: {e}")
+    for name, getter in (("tts", get_tts_client), ("storage", get_storage_client)):
+        try:
+            await run_blocking(getter)
+        except Exception as e:
+            print(f"[google-clients-warning] Could not build {name} client: {e}")
+    try:
+        await run_blocking(initialize_firebase_admin)
+    except Exception as e:
+        print(f"[google-clients-warning] Firebase Admin not initialized: {e}")
+    print(f"[google-clients] Warmup finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+async def close_clients() -> None:
+    """Close every client's channel / HTTP session and drop the registry (called on shutdown)."""
+    with _lock:
+        clients = dict(_clients)
+        _clients.clear()
+        _client_loops.clear()
+    for name, client in clients.items():
+        try:
+            if name == "storage":
+                client.close()
+            else:
+                result = client.transport.close()
+                if asyncio.iscoroutine(result):
+                    await result
+        except Exception as e:
+            print(f"[google-clients-warning] Failed to close {name} client: {e}")
+    if clients:
+        print(f"[google-clients] Closed {', '.join(sorted(clients))}")
+
+
+def reset_clients() -> None:
+    """Drop every client without closing it (tests swap the client classes between cases)."""
+    with _lock:
+        _clients.clear()
+        _client_loops.clear()
+        _build_ms.clear()
+        _uses.clear()
+
+
+def client_stats() -> Dict[str, Any]:
+    """Return per-client build time and reuse count as a plain dict (for /metrics and logs)."""
+    with _lock:
+        return {
+            name: {"built": name in _clients, "build_ms": _build_ms.get(name), "uses": _uses.get(name, 0)}
+            for name in sorted(set(_build_ms) | set(_uses))
+        }
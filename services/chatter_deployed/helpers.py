@@ -1,21 +1,33 @@
 """
 HELPER FUNCTIONS (called by main.py in chatter_deployed)
 THE HELPER FUNCTIONS USED CURRENTLY ARE
+(all async, so the websocket handler never blocks the event loop)
 
-1. call_retriever_service(query: str) -> List[Tuple[int, str, str, float]]:
+1. call_retriever_service_multi_async(queries: List[str], limit: int = 10):
 ===================================================================
-Call the retriever service to get relevant articles.
-Input: query
-Returns: List of tuples: (id, chunk, source_type, score) for each matching article
+Retrieve chunks for all enhanced sub-queries at once (batched embedding, one SQL statement).
+Input: sub-queries
+Returns: (per-query lists, fused list) of tuples (id, chunk, source_type, score)
+call_retriever_service_async(query) does the same for a single query.
 
 
-2. call_gemini_api(question: str, context_articles: List[Tuple[int, str, str, float]] = None) ->
+2. call_gemini_api_async(question: str, context_articles: List[Tuple[int, str, str, float]] = None) ->
 tuple[Optional[str], Optional[str]]:
 ===================================================================================================
 Call Google Gemini LLM API with the question and context articles to generate a podcast-style
 response.
 Input: question text + tuple of relevant chunks (with id, chunk text, source_type, and similarity score)
 Output: tuple of response text + error message
+The chunks are packed into CONTEXT_TOKEN_BUDGET first (context_packer.py; no-op when they fit).
+
+stream_gemini_api_async(question, context_articles, model) -> AsyncIterator[str]
+Same prompt as call_gemini_api_async, yields the response text as Gemini generates it
+(used by the streaming /ws/chat mode; raises instead of returning an error message)
+
+
+3. Context-aware Q&A: get_daily_brief_context_async(user_id), classify_question_context_async(question,
+brief_transcript, model)
+===================================================================
 
 THE HELPER FUNCTIONS NOT YET USED ARE
 check_llm_conversations_table()
@@ -31,32 +43,24 @@ NOT YET USED
 
 """
 
-from typing import List, Tuple, Optional, Dict, Any
-import psycopg
+from typing import AsyncIterator, List, Tuple, Optional, Dict, Any
 import json
-import os
 from datetime import datetime, timezone
 
 # from vertexai.generative_models import GenerativeModel
 
-
-# NEW should work for production and local
-DB_URL = os.getenv("DATABASE_URL")
-if not DB_URL:
-    raise RuntimeError("DATABASE_URL environment variable not set")
+# NEW should work for production and local (DATABASE_URL is read by db_pool)
+from db_pool import connection
+from context_packer import pack_context_for_prompt_async
 
 
-def call_retriever_service(query: str, limit: int = 10) -> List[Tuple[int, str, str, float]]:
-    """Call the retriever service to get relevant articles."""
+async def call_retriever_service_async(query: str, limit: int = 10) -> List[Tuple[int, str, str, float]]:
+    """Call the retriever to get relevant articles (awaits retriever.search_articles_async)."""
     try:
-        # Import the retriever function directly since we're in the same environment
-        import sys
-
-        sys.path.append("/app/retriever")
-        from retriever import search_articles
+        from retriever import search_articles_async
 
         print(f"[retriever] Searching for: '{query[:50]}...'")
-        articles = search_articles(query, limit=limit)
+        articles = await search_articles_async(query, limit=limit)
         print(f"[retriever] Found {len(articles)} relevant chunks")
         return articles
     except Exception as e:
@@ -64,45 +68,59 @@ def call_retriever_service(query: str, limit: int = 10) -> List[Tuple[int, str,
         return []
 
 
-def call_gemini_api(
-    question: str, context_articles: List[Tuple[int, str, str, float]] = None, model=None
-) -> tuple[Optional[str], Optional[str]]:
-    """Call Google Gemini API with the question and context articles to generate a podcast-style
-    response."""
-    if not model:
-        return None, "Gemini API not configured"
+async def call_retriever_service_multi_async(
+    queries: List[str], limit: int = 10
+) -> Tuple[List[List[Tuple[int, str, str, float]]], List[Tuple[int, str, str, float]]]:
+    """
+    Retrieve chunks for all enhanced sub-queries at once (batched embedding, one SQL statement).
 
+    Returns:
+        (per-query result lists in query order, fused list with one row per chunk id)
+    """
     try:
-        # Debug logging to track the bug
-        print(f"[gemini-debug] Received context_articles: {context_articles is not None}")
-        if context_articles is not None:
-            print(f"[gemini-debug] Type: {type(context_articles)}")
-            print(f"[gemini-debug] Length: {len(context_articles)}")
-            if len(context_articles) > 0:
-                print(f"[gemini-debug] First chunk structure: {context_articles[0]}")
-                print(f"[gemini-debug] First chunk types: {[type(x) for x in context_articles[0]]}")
-        else:
-            print(f"[gemini-debug] context_articles is None!")
+        from retriever import search_articles_multi_async
 
-        # Build the prompt with context if articles are provided
-        if context_articles:
-            print(f"[gemini-debug] Using WITH-CONTEXT prompt (if block)")
-            context_text = "\n\n".join(
-                [
-                    f"Article Title: {source_type}\n{chunk}"
-                    for _, chunk, source_type, score in context_articles
-                ]
-            )
-
-            print(f"[gemini-debug] Built context_text with {len(context_text)} characters")
-            print(f"[gemini-debug] First 200 chars of context: {context_text[:200]}")
-
-            # FAILSAFE: Check if context_text is actually empty despite having articles
-            if not context_text.strip():
-                print(f"[gemini-error] context_text is empty despite having {len(context_articles)} articles!")
-                print(f"[gemini-error] Sample chunks: {context_articles[:3]}")
-                # Fall through to no-context prompt
-                prompt = f"""You are NewsJuice, the AI host of a news podcast about Harvard University.
+        print(f"[retriever] Searching for {len(queries)} sub-queries in one round trip")
+        results = await search_articles_multi_async(queries, limit=limit)
+        print(f"[retriever] Found {len(results['fused'])} unique relevant chunks")
+        return results["per_query"], results["fused"]
+    except Exception as e:
+        print(f"[retriever-error] Error calling retriever service: {e}")
+        return [[] for _ in queries], []
+
+
+def _build_gemini_prompt(question: str, context_articles: List[Tuple[int, str, str, float]] = None) -> str:
+    """Build the podcast prompt for call_gemini_api_async / stream_gemini_api_async (with or without context)."""
+    # Debug logging to track the bug
+    print(f"[gemini-debug] Received context_articles: {context_articles is not None}")
+    if context_articles is not None:
+        print(f"[gemini-debug] Type: {type(context_articles)}")
+        print(f"[gemini-debug] Length: {len(context_articles)}")
+        if len(context_articles) > 0:
+            print(f"[gemini-debug] First chunk structure: {context_articles[0]}")
+            print(f"[gemini-debug] First chunk types: {[type(x) for x in context_articles[0]]}")
+    else:
+        print(f"[gemini-debug] context_articles is None!")
+
+    # Build the prompt with context if articles are provided
+    if context_articles:
+        print(f"[gemini-debug] Using WITH-CONTEXT prompt (if block)")
+        context_text = "\n\n".join(
+            [
+                f"Article Title: {source_type}\n{chunk}"
+                for _, chunk, source_type, score in context_articles
+            ]
+        )
+
+        print(f"[gemini-debug] Built context_text with {len(context_text)} characters")
+        print(f"[gemini-debug] First 200 chars of context: {context_text[:200]}")
+
+        # FAILSAFE: Check if context_text is actually empty despite having articles
+        if not context_text.strip():
+            print(f"[gemini-error] context_text is empty despite having {len(context_articles)} articles!")
+            print(f"[gemini-error] Sample chunks: {context_articles[:3]}")
+            # Fall through to no-context prompt
+            prompt = f"""You are NewsJuice, the AI host of a news podcast about Harvard University.
 
 LISTENER'S QUESTION: {question}
 
@@ -127,8 +145,8 @@ EXAMPLE RESPONSE:
 "I don't currently have recent Harvard news covering that specific topic in my database. My coverage focuses on Harvard's academic programs, administrative developments, research initiatives, campus news, and university policy changes. For information on this topic, you may want to check the Harvard Gazette or Crimson directly."
 
 Now generate your response:"""
-            else:
-                prompt = f"""You are NewsJuice, the AI host of a news podcast about Harvard University. Your role is to deliver factual, informative summaries based on news article chunks.
+        else:
+            prompt = f"""You are NewsJuice, the AI host of a news podcast about Harvard University. Your role is to deliver factual, informative summaries based on news article chunks.
 
 LISTENER'S QUESTION: {question}
 
@@ -164,9 +182,9 @@ EXAMPLE STRUCTURE:
 "Harvard is facing significant budget challenges this year. According to recent reports, the university posted a $113 million operating deficit in fiscal year 2025 - its first since 2020. This deficit stems from multiple factors, including the Trump administration's temporary termination of nearly all federal research grants in spring 2025, which removed approximately $116 million in sponsored funds overnight. To address these shortfalls, Harvard has implemented several cost-cutting measures: freezing salaries for non-union staff, leaving positions unfilled, and conducting targeted workforce reductions including 38 IT workers in November. The situation is compounded by a scheduled 400 percent increase in the federal endowment tax taking effect in 2027. Despite these challenges, Harvard's endowment grew 11.9 percent to $56.9 billion in fiscal 2025, which financial officers credit as central to navigating this uncertain period."
 
 Now generate your podcast segment answering the listener's question:"""
-        else:
-            print(f"[gemini-debug] Using NO-CONTEXT prompt (else block)")
-            prompt = f"""You are NewsJuice, the AI host of a news podcast about Harvard University.
+    else:
+        print(f"[gemini-debug] Using NO-CONTEXT prompt (else block)")
+        prompt = f"""You are NewsJuice, the AI host of a news podcast about Harvard University.
 
 LISTENER'S QUESTION: {question}
 
@@ -192,20 +210,58 @@ EXAMPLE RESPONSE:
 
 Now generate your response:"""
 
-        response = model.generate_content(prompt)
+    return prompt
+
+
+async def call_gemini_api_async(
+    question: str, context_articles: List[Tuple[int, str, str, float]] = None, model=None
+) -> tuple[Optional[str], Optional[str]]:
+    """Call Google Gemini API with the question and context articles to generate a podcast-style
+    response (uses the model's native generate_content_async)."""
+    if not model:
+        return None, "Gemini API not configured"
+
+    try:
+        if context_articles:
+            context_articles = await pack_context_for_prompt_async(context_articles)
+        prompt = _build_gemini_prompt(question, context_articles)
+        response = await model.generate_content_async(prompt)
         return response.text, None
     except Exception as e:
         return None, str(e)
 
 
 
+async def stream_gemini_api_async(
+    question: str, context_articles: List[Tuple[int, str, str, float]] = None, model=None
+) -> AsyncIterator[str]:
+    """Streaming twin of call_gemini_api_async: yields text deltas as they are generated.
+
+    Errors are raised (the caller may already have sent part of the answer).
+    """
+    if not model:
+        raise RuntimeError("Gemini API not configured")
+
+    if context_articles:
+        context_articles = await pack_context_for_prompt_async(context_articles)
+    prompt = _build_gemini_prompt(question, context_articles)
+    responses = await model.generate_content_async(prompt, stream=True)
+    async for response in responses:
+        try:
+            text = response.text
+        except ValueError:  # chunk without text parts (e.g. only finish metadata)
+            continue
+        if text:
+            yield text
+
+
 def check_llm_conversations_table():  # [Z] check_llm_convos is not used by our current workflow.
     # its use case is to first check if there is previous context already present to pull from for
     # our podcast generation.
 
     """Check if the llm_conversations table exists."""
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -242,7 +298,7 @@ def log_conversation(
             "error": error_message,
         }
 
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -259,7 +315,44 @@ def log_conversation(
 
 # [NEW] Context-Aware Q&A Helper Functions
 
-def get_daily_brief_context(user_id: str) -> Optional[Dict[str, Any]]:
+def _find_todays_brief(history: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Pick today's "Daily Brief" entry out of a user's audio history (see get_daily_brief_context_async)."""
+    # Find today's daily brief
+    today = datetime.now(timezone.utc).date()
+    for entry in history:
+        if entry.get("question_text") == "Daily Brief":
+            created_at = entry.get("created_at")
+            if isinstance(created_at, str):
+                created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+
+            if created_at.date() == today:
+                # Found today's brief
+                source_chunks = entry.get("source_chunks")
+                # Handle both dict (JSONB from DB) and string (JSON string) formats
+                if isinstance(source_chunks, dict):
+                    chunks_data = source_chunks
+                elif isinstance(source_chunks, str):
+                    chunks_data = json.loads(source_chunks)
+                else:
+                    chunks_data = {"chunks": []}
+
+                # Debug logging for chunk format verification
+                print(f"[brief-debug] chunks_data type: {type(chunks_data)}")
+                print(f"[brief-debug] chunks_data keys: {chunks_data.keys() if isinstance(chunks_data, dict) else 'not a dict'}")
+                if chunks_data.get("chunks"):
+                    print(f"[brief-debug] Number of chunks in chunks_data: {len(chunks_data['chunks'])}")
+                    print(f"[brief-debug] First chunk from DB: {chunks_data['chunks'][0]}")
+
+                return {
+                    "id": entry.get("id"),
+                    "transcript": entry.get("podcast_text", ""),
+                    "chunks": chunks_data.get("chunks", [])
+                }
+
+    return None
+
+
+async def get_daily_brief_context_async(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Fetch today's daily brief context (transcript + chunks) for context-aware Q&A.
 
@@ -279,44 +372,10 @@ def get_daily_brief_context(user_id: str) -> Optional[Dict[str, Any]]:
         Returns None if no daily brief found for today
     """
     try:
-        from user_db import get_audio_history
-
-        # Get recent history
-        history = get_audio_history(user_id, limit=10)
-
-        # Find today's daily brief
-        today = datetime.now(timezone.utc).date()
-        for entry in history:
-            if entry.get("question_text") == "Daily Brief":
-                created_at = entry.get("created_at")
-                if isinstance(created_at, str):
-                    created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-
-                if created_at.date() == today:
-                    # Found today's brief
-                    source_chunks = entry.get("source_chunks")
-                    # Handle both dict (JSONB from DB) and string (JSON string) formats
-                    if isinstance(source_chunks, dict):
-                        chunks_data = source_chunks
-                    elif isinstance(source_chunks, str):
-                        chunks_data = json.loads(source_chunks)
-                    else:
-                        chunks_data = {"chunks": []}
-
-                    # Debug logging for chunk format verification
-                    print(f"[brief-debug] chunks_data type: {type(chunks_data)}")
-                    print(f"[brief-debug] chunks_data keys: {chunks_data.keys() if isinstance(chunks_data, dict) else 'not a dict'}")
-                    if chunks_data.get("chunks"):
-                        print(f"[brief-debug] Number of chunks in chunks_data: {len(chunks_data['chunks'])}")
-                        print(f"[brief-debug] First chunk from DB: {chunks_data['chunks'][0]}")
-
-                    return {
-                        "id": entry.get("id"),
-                        "transcript": entry.get("podcast_text", ""),
-                        "chunks": chunks_data.get("chunks", [])
-                    }
+        from user_db import get_audio_history_async
 
-        return None
+        history = await get_audio_history_async(user_id, limit=10)
+        return _find_todays_brief(history)
     except Exception as e:
         print(f"[brief-context-error] {e}")
         import traceback
@@ -324,26 +383,14 @@ def get_daily_brief_context(user_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def classify_question_context(question: str, brief_transcript: str, model) -> str:
-    """
-    Classify if a question is about the daily brief content or a general question.
-
-    Args:
-        question: User's question
-        brief_transcript: The daily brief podcast text
-        model: Gemini model instance
-
-    Returns:
-        "CONTEXTUAL" - question is about the daily brief
-        "GENERAL" - question is unrelated to daily brief
-    """
-    try:
-        # Use more of the transcript for better matching (up to 2000 chars)
-        brief_summary = brief_transcript[:2000] if len(brief_transcript) > 2000 else brief_transcript
-        #perhaps pass the entire brief or the chunks themselves instead of brief 
+def _build_classification_prompt(question: str, brief_transcript: str) -> str:
+    """Prompt that asks Gemini whether the question is about the daily brief."""
+    # Use more of the transcript for better matching (up to 2000 chars)
+    brief_summary = brief_transcript[:2000] if len(brief_transcript) > 2000 else brief_transcript
+    #perhaps pass the entire brief or the chunks themselves instead of brief 
 
-        # Create classification prompt with emphasis on name/entity matching
-        prompt = f"""You are analyzing a user's question to determine if it relates to a daily news briefing they just heard.
+    # Create classification prompt with emphasis on name/entity matching
+    prompt = f"""You are analyzing a user's question to determine if it relates to a daily news briefing they just heard.
 
 DAILY BRIEF CONTENT:
 {brief_summary}
@@ -374,21 +421,43 @@ Examples of GENERAL questions (NOT contextual):
 - "How's the weather?" (unrelated topic never mentioned)
 
 Respond with ONLY ONE word - either "CONTEXTUAL" or "GENERAL":"""
+    return prompt
 
-        response = model.generate_content(prompt)
-        classification = response.text.strip().upper()
 
-        # Validate response
-        if "CONTEXTUAL" in classification:
-            print(f"[classification] ✓ Question is CONTEXTUAL to daily brief")
-            return "CONTEXTUAL"
-        elif "GENERAL" in classification:
-            print(f"[classification] ✗ Question is GENERAL (not related to brief)")
-            return "GENERAL"
-        else:
-            # Default to general if unclear
-            print(f"[classification-warning] Unclear response: '{classification}', defaulting to GENERAL")
-            return "GENERAL"
+def _parse_classification(response_text: str) -> str:
+    """Map Gemini's one-word answer to "CONTEXTUAL" / "GENERAL" (GENERAL when unclear)."""
+    classification = response_text.strip().upper()
+
+    # Validate response
+    if "CONTEXTUAL" in classification:
+        print(f"[classification] ✓ Question is CONTEXTUAL to daily brief")
+        return "CONTEXTUAL"
+    elif "GENERAL" in classification:
+        print(f"[classification] ✗ Question is GENERAL (not related to brief)")
+        return "GENERAL"
+    else:
+        # Default to general if unclear
+        print(f"[classification-warning] Unclear response: '{classification}', defaulting to GENERAL")
+        return "GENERAL"
+
+
+async def classify_question_context_async(question: str, brief_transcript: str, model) -> str:
+    """
+    Classify if a question is about the daily brief content or a general question.
+
+    Args:
+        question: User's question
+        brief_transcript: The daily brief podcast text
+        model: Gemini model instance
+
+    Returns:
+        "CONTEXTUAL" - question is about the daily brief
+        "GENERAL" - question is unrelated to daily brief
+    """
+    try:
+        prompt = _build_classification_prompt(question, brief_transcript)
+        response = await model.generate_content_async(prompt)
+        return _parse_classification(response.text)
 
     except Exception as e:
         print(f"[classification-error] {e}, defaulting to GENERAL")
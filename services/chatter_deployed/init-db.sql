@@ -64,15 +64,74 @@ CREATE TABLE IF NOT EXISTS chunks_vector (
     chunk TEXT,
     chunk_index INTEGER,
     embedding vector(768),
+    -- First 256 dimensions of embedding, renormalized (two-stage retrieval, migrations/007)
+    embedding_256 vector(256),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Full-text search over title + chunk for hybrid retrieval (migrations/003)
+    search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(chunk, '')), 'B')
+    ) STORED,
     FOREIGN KEY (article_id) REFERENCES articles(article_id) ON DELETE CASCADE
 );
 
+-- Bumped by the loader after each run (NOTIFY corpus_updated); see migrations/005
+CREATE TABLE IF NOT EXISTS corpus_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO corpus_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Background daily brief jobs (brief_jobs.py); see migrations/008
+CREATE TABLE IF NOT EXISTS daily_brief_jobs (
+    job_id VARCHAR(64) PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    stage VARCHAR(32),
+    result JSONB,
+    error TEXT,
+    error_status INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Daily briefs shared by users with the same preferences (shared_briefs.py); see migrations/009
+CREATE TABLE IF NOT EXISTS shared_briefs (
+    brief_key VARCHAR(64) PRIMARY KEY,
+    topics JSONB NOT NULL,
+    sources JSONB NOT NULL,
+    brief_date DATE NOT NULL,
+    corpus_version BIGINT NOT NULL,
+    podcast_text TEXT NOT NULL,
+    source_chunks JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS shared_brief_audio (
+    brief_key VARCHAR(64) NOT NULL REFERENCES shared_briefs(brief_key) ON DELETE CASCADE,
+    voice VARCHAR(100) NOT NULL,
+    audio_url TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (brief_key, voice)
+);
+
+ALTER TABLE audio_history ADD COLUMN IF NOT EXISTS brief_key VARCHAR(64) REFERENCES shared_briefs(brief_key);
+
 -- Create indexes for performance
 CREATE INDEX IF NOT EXISTS idx_user_preferences_user_id ON user_preferences(user_id);
 CREATE INDEX IF NOT EXISTS idx_audio_history_user_id ON audio_history(user_id);
+CREATE INDEX IF NOT EXISTS idx_audio_history_brief_key ON audio_history (brief_key) WHERE brief_key IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_brief_jobs_active_user ON daily_brief_jobs (user_id) WHERE status IN ('queued', 'running');
 CREATE INDEX IF NOT EXISTS idx_articles_vflag ON articles(vflag);
-CREATE INDEX IF NOT EXISTS idx_chunks_embedding ON chunks_vector USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+CREATE INDEX IF NOT EXISTS idx_chunks_search_tsv ON chunks_vector USING gin (search_tsv);
+CREATE INDEX IF NOT EXISTS idx_chunks_recency ON chunks_vector ((COALESCE(published_at, fetched_at)));
+CREATE INDEX IF NOT EXISTS idx_chunks_source_type ON chunks_vector (source_type);
+-- HNSW needs no training data (an ivfflat index built here would be trained on an empty table).
+-- Existing databases: see migrations/002_hnsw_embedding_index.sql
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_hnsw ON chunks_vector USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_256_hnsw ON chunks_vector USING hnsw (embedding_256 vector_cosine_ops) WITH (m = 16, ef_construction = 64);
 
 -- Grant permissions (if needed)
 -- GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO postgres;
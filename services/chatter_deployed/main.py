@@ -21,6 +21,12 @@ Main chatter endpoint: calls the chatter() function.
 
 @app.get("/api/user/history")
 
+@app.post("/api/daily-brief")
+Queue a daily brief job (GET /api/daily-brief/jobs/{job_id} for its status)
+
+@app.get("/metrics")
+DB pool saturation, cache counters and Google client reuse (public, like the health checks)
+
 class FirebaseAuthMiddleware(BaseHTTPMiddleware):
 
 
@@ -31,8 +37,9 @@ class FirebaseAuthMiddleware(BaseHTTPMiddleware):
 from dotenv import load_dotenv
 import os
 import logging
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime, timezone
+from contextlib import asynccontextmanager
 
 # uploadfile handels audio file auploads from frontend
 from fastapi import (
@@ -42,33 +49,72 @@ from fastapi import (
     WebSocket,
     WebSocketDisconnect,
 )
+from fastapi.responses import JSONResponse
 
 # from fastapi.responses import StreamingResponse
 # streaming response stream audio chunks back to frontend
-from speech_to_text_client import audio_to_text  # Speech-to-Text function
-from text_to_speech_client import text_to_audio_stream, text_to_audio_bytes  # Google Cloud Text-to-Speech streaming and non-streaming
-from gcs_storage import upload_audio_to_gcs  # GCS storage for audio files
+from speech_to_text_client import (  # Speech-to-Text functions
+    audio_format_from_message,
+    audio_to_text,
+    start_streaming_transcriber,
+)
+from text_to_speech_client import (  # Google Cloud Text-to-Speech streaming and non-streaming
+    text_to_audio_stream,
+    text_to_audio_bytes_async,
+    sentence_stream_to_audio,
+)
+from gcs_storage import upload_audio_to_gcs_async  # GCS storage for audio files
 from fastapi.middleware.cors import CORSMiddleware
 import json
 import base64
-from firebase_auth import initialize_firebase_admin, verify_token
+from firebase_auth import initialize_firebase_admin, verify_token_async
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request
+# Handlers only use the *_async variants so DB waits never block the event loop
 from user_db import (
-    create_user,
-    get_user_preferences,
-    save_user_preferences,
-    save_audio_history,
-    get_audio_history,
-    get_preferences_last_updated,
-    get_voice_preference_last_updated,
+    create_user_async,
+    get_user_preferences_async,
+    save_user_preferences_async,
+    save_audio_history_async,
+    get_audio_history_async,
+    get_preferences_last_updated_async,
+    get_voice_preference_last_updated_async,
 )
 
 # importing helper functions
 # from chatter_handler import chatter [Z] we do not need the chatter_handler.py script
-from helpers import call_retriever_service, call_gemini_api
-from query_enhancement import enhance_query_with_gemini
-from retriever import search_articles_by_preferences
+from helpers import (
+    call_retriever_service_multi_async,
+    call_gemini_api_async,
+    stream_gemini_api_async,
+    classify_question_context_async,
+    get_daily_brief_context_async,
+)
+from query_enhancement import enhance_query_with_gemini_async
+from retriever import (
+    search_articles_by_preferences_async,
+    embed_query_cached_async,
+    embedding_cache_stats,
+    retrieval_cache_stats,
+)
+from corpus_version import start_corpus_listener, stop_corpus_listener, current_version
+from answer_cache import ANSWER_CACHE_ENABLED, AudioRecorder, get_answer_cache, replay_audio
+from context_packer import DAILY_BRIEF_TOKEN_BUDGET, pack_context_for_prompt_async
+from ann_snapshot import snapshot_stats, stop_snapshot_refresh
+from tts_cache import get_tts_cache
+from google_clients import client_stats, close_clients, warmup_clients
+from audio_ingest import AudioIngestBuffer
+from brief_jobs import DAILY_BRIEF_MAX_WAIT_SECONDS, BriefJobManager, JobQueueFull
+from batch_briefs import schedule_batch_on_corpus_change, stop_batch, batch_stats
+from shared_briefs import (
+    brief_spec,
+    canonical_preferences,
+    get_or_create_audio,
+    get_or_create_transcript,
+    shared_brief_stats,
+)
+from db_pool import get_pool, get_async_pool, close_pools, close_async_pool, pool_stats
+from async_utils import shutdown_executor
 
 # from chatter_handler import model
 # from openai import OpenAI [Z] we do not use OpenAI
@@ -96,7 +142,31 @@ GOOGLE_CLOUD_REGION = os.environ.get("GOOGLE_CLOUD_REGION", "us-central1")
 # --------------------------
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the DB pools at startup (so the first request doesn't pay for connection setup)
+    and close them on shutdown. Also follows the loader's corpus version for the result caches
+    and the in-process ANN snapshot (built/loaded on each new version), and pre-generates the
+    daily briefs after each load (batch_briefs.py). The Google clients
+    (TTS, STT, GCS, Firebase) are built and connected before the first request too."""
+    get_pool()
+    await get_async_pool()
+    await start_corpus_listener()
+    await warmup_clients()
+    yield
+    await stop_corpus_listener()
+    await stop_batch()
+    # before the pools close: stop() waits for the jobs' last status writes
+    await daily_brief_jobs.stop()
+    await stop_snapshot_refresh()
+    await close_async_pool()
+    close_pools()
+    await close_clients()
+    shutdown_executor()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ORIGINS,
@@ -162,6 +232,22 @@ async def healthz_root() -> Dict[str, bool]:
 async def health_check() -> Dict[str, bool]:
     return {"ok": True}
 
+@app.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """Connection pool saturation and cache hit rates for this worker."""
+    return {
+        "db_pool": pool_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "retrieval_cache": retrieval_cache_stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "ann_snapshot": snapshot_stats(),
+        "tts_cache": get_tts_cache().stats(),
+        "google_clients": client_stats(),
+        "daily_brief_jobs": daily_brief_jobs.stats(),
+        "batch_briefs": batch_stats(),
+        "shared_briefs": shared_brief_stats(),
+    }
+
 # --------------------------
 # Helper Functions
 # --------------------------
@@ -175,6 +261,8 @@ async def _retrieve_and_generate_podcast(
     model: GenerativeModel,
     use_brief_context: bool = False,  # NEW: Whether to use daily brief context
     brief_context: Optional[Dict] = None,  # NEW: Daily brief context if available
+    question_embedding: Optional[List[float]] = None,  # set when the answer may be cached
+    stream_audio: bool = False,  # synthesize sentence by sentence while Gemini is generating
 ):
     """Retrieve chunks and generate podcast for normal flow and query enhancement."""
 
@@ -241,28 +329,17 @@ async def _retrieve_and_generate_podcast(
         await websocket.send_json({"status": "retrieving"})
         all_chunks = []
 
-        # [Z] assume each sub query runs cosine similarity against the DB to pull chunks
-        for query_key in query_keys:
-            sub_query = enhanced_queries[query_key]
-            print(f"[retriever] Running retrieval for sub-query: {sub_query[:50]}...")
-            chunks = call_retriever_service(sub_query)
+        # [Z] each sub query runs cosine similarity against the DB to pull chunks; the
+        # sub-queries are embedded in one batch and searched concurrently, then merged by
+        # chunk id keeping the best score
+        sub_queries = [enhanced_queries[k] for k in query_keys]
+        per_query_chunks, all_chunks = await call_retriever_service_multi_async(sub_queries)
+        for query_key, chunks in zip(query_keys, per_query_chunks):
             if chunks:
                 # Print each chunk with its similarity score
                 print(f"[retriever] Found {len(chunks)} chunks for '{query_key}':")
                 for i, (chunk_id, chunk_text, source_type, score) in enumerate(chunks):
                     print(f"  Chunk {i+1} (ID: {chunk_id}, Source: {source_type}, Score: {score:.4f}): {chunk_text[:100]}...")
-                all_chunks.extend(chunks)
-
-        # Remove duplicates based on chunk ID (keep first occurrence)
-        seen_ids = set()
-        unique_chunks = []
-        for chunk in all_chunks:
-            chunk_id = chunk[0]  # First element is the ID
-            if chunk_id not in seen_ids:
-                seen_ids.add(chunk_id)
-                unique_chunks.append(chunk)
-        # makes sense to only have the unique chunks for all enhanced queries
-        all_chunks = unique_chunks
 
     # Print summary of final unique chunks
     print(f"[retriever] After deduplication: {len(all_chunks)} unique chunks")
@@ -279,7 +356,12 @@ async def _retrieve_and_generate_podcast(
     combined_enhanced_query = "\n".join([enhanced_queries[k] for k in query_keys])
     print(f"This is the enhanced query {combined_enhanced_query}")
 
-    podcast_text, error = call_gemini_api(combined_enhanced_query, all_chunks, model)
+    if stream_audio:
+        return await _generate_and_stream_podcast(
+            websocket, combined_enhanced_query, all_chunks, original_query, user_id, model, question_embedding
+        )
+
+    podcast_text, error = await call_gemini_api_async(combined_enhanced_query, all_chunks, model)
     print(f"Here is the Podcast Text {podcast_text}")
 
     if error or not podcast_text:
@@ -288,18 +370,112 @@ async def _retrieve_and_generate_podcast(
 
     await websocket.send_json({"status": "podcast_generated", "text": podcast_text})
 
-    # step4: convert podcast text to audio
+    cache_handle = None
+    if question_embedding is not None:
+        cache_handle = get_answer_cache().store(question_embedding, current_version(), original_query, podcast_text)
+
+    return await _stream_podcast_audio(websocket, podcast_text, original_query, user_id, cache_handle=cache_handle)
+
+
+async def _voice_preference(user_id: Optional[str]) -> Optional[str]:
+    """User's voice preference if authenticated (None = TTS default voice)."""
+    if not user_id:
+        return None
+    preferences = await get_user_preferences_async(user_id)
+    voice_preference = preferences.get("voice_preference", "en-US-Studio-O")
+    print(f"[websocket] Using voice preference: {voice_preference}")
+    return voice_preference
+
+
+async def _save_answer_history(user_id: Optional[str], original_query: str, podcast_text: str) -> None:
+    """Save the Q&A history entry if the user is authenticated."""
+    # [Z] For Q&A we don't save audio to GCS (just the text)
+    if user_id:
+        await save_audio_history_async(
+            user_id=user_id,
+            question_text=original_query,
+            podcast_text=podcast_text,
+            audio_url=None,
+        )
+        print(f"[websocket] Audio history saved for user: {user_id}")
+
+
+async def _generate_and_stream_podcast(
+    websocket: WebSocket,
+    combined_enhanced_query: str,
+    all_chunks: List[tuple],
+    original_query: str,
+    user_id: Optional[str],
+    model: GenerativeModel,
+    question_embedding: Optional[List[float]] = None,
+) -> bool:
+    """Streaming variant of steps 3-4: Gemini streams the answer and every completed sentence
+    is synthesized and sent as its own WAV (after an "audio_segment" message) while the rest
+    is still generating. podcast_generated carries the full text once generation is done.
+    """
+    voice_preference = await _voice_preference(user_id)
+    await websocket.send_json({"status": "converting_to_audio"})
+    await websocket.send_json({"status": "streaming_audio"})
+    podcast_text, audio = await sentence_stream_to_audio(
+        stream_gemini_api_async(combined_enhanced_query, all_chunks, model), websocket, voice_name=voice_preference
+    )
+    print(f"Here is the Podcast Text {podcast_text}")
+
+    if not podcast_text:
+        await websocket.send_json({"error": "LLM error: streaming generation failed"})
+        return False
+    await websocket.send_json({"status": "podcast_generated", "text": podcast_text})
+    if audio is None:
+        await websocket.send_json({"error": "Failed to generate audio stream"})
+        return False
+
+    if question_embedding is not None:
+        cache_handle = get_answer_cache().store(question_embedding, current_version(), original_query, podcast_text)
+        get_answer_cache().add_audio(cache_handle, voice_preference, audio)
+
+    await websocket.send_json({"status": "complete"})
+    try:
+        await _save_answer_history(user_id, original_query, podcast_text)
+    except Exception as e:
+        print(f"[websocket-error] Could not save audio history: {e}")
+    return True
+
+
+async def _stream_podcast_audio(
+    websocket: WebSocket,
+    podcast_text: str,
+    original_query: str,
+    user_id: Optional[str],
+    cache_handle: Optional[tuple] = None,
+    voice_preference: Optional[str] = None,
+    cached_audio: Optional[bytes] = None,
+    stream_audio: bool = False,
+) -> bool:
+    """Step 4 of the Q&A flow: stream the podcast audio, then save the history entry.
+
+    With cached_audio the audio is replayed instead of synthesized; with cache_handle the
+    synthesized audio is attached to that answer cache entry. stream_audio clients get the
+    WAV as a single "audio_segment".
+    """
     await websocket.send_json({"status": "converting_to_audio"})
     try:
         # Get user's voice preference if authenticated
-        voice_preference = None
-        if user_id:
-            preferences = get_user_preferences(user_id)
-            voice_preference = preferences.get("voice_preference", "en-US-Studio-O")
-            print(f"[websocket] Using voice preference: {voice_preference}")
-        
+        if voice_preference is None:
+            voice_preference = await _voice_preference(user_id)
+
         await websocket.send_json({"status": "streaming_audio"})
-        result = await text_to_audio_stream(podcast_text, websocket, voice_name=voice_preference)
+        if stream_audio:
+            await websocket.send_json({"status": "audio_segment", "index": 0, "text": podcast_text})
+        if cached_audio is not None:
+            await replay_audio(websocket, cached_audio)
+            result = "success"
+        elif cache_handle is not None:
+            recorder = AudioRecorder(websocket)
+            result = await text_to_audio_stream(podcast_text, recorder, voice_name=voice_preference)
+            if result:
+                get_answer_cache().add_audio(cache_handle, voice_preference, recorder.audio)
+        else:
+            result = await text_to_audio_stream(podcast_text, websocket, voice_name=voice_preference)
 
         if not result:
             await websocket.send_json({"error": "Failed to generate audio stream"})
@@ -308,16 +484,7 @@ async def _retrieve_and_generate_podcast(
         await websocket.send_json({"status": "complete"})
 
         # Save audio history if user is authenticated
-        # [Z] For Q&A we don't save audio to GCS (just the text)
-
-        if user_id:
-            save_audio_history(
-                user_id=user_id,
-                question_text=original_query,
-                podcast_text=podcast_text,
-                audio_url=None,
-            )
-            print(f"[websocket] Audio history saved for user: {user_id}")
+        await _save_answer_history(user_id, original_query, podcast_text)
 
     except Exception as e:
         await websocket.send_json({"error": f"TTS failed: {str(e)}"})
@@ -326,6 +493,37 @@ async def _retrieve_and_generate_podcast(
     return True
 
 
+async def _answer_from_cache(
+    websocket: WebSocket,
+    question_embedding: List[float],
+    original_query: str,
+    user_id: Optional[str],
+    stream_audio: bool = False,
+) -> Optional[bool]:
+    """Serve a near-duplicate question from the answer cache.
+
+    Returns None on a miss, otherwise whether the cached answer was delivered.
+    """
+    voice_preference = await _voice_preference(user_id)
+    hit = get_answer_cache().lookup(question_embedding, current_version(), voice=voice_preference)
+    if hit is None:
+        return None
+
+    print(f"[answer-cache] Hit (similarity {hit['similarity']:.4f}) for '{original_query[:50]}', "
+          f"cached question: '{hit['question'][:50]}', audio cached: {hit['audio'] is not None}")
+    await websocket.send_json({"status": "podcast_generated", "text": hit["podcast_text"], "cached": True})
+    return await _stream_podcast_audio(
+        websocket,
+        hit["podcast_text"],
+        original_query,
+        user_id,
+        cache_handle=hit["handle"],
+        voice_preference=voice_preference,
+        cached_audio=hit["audio"],
+        stream_audio=stream_audio,
+    )
+
+
 # ------------
 # Websocket Audio Endpoint
 # ------------
@@ -336,8 +534,20 @@ async def websocket_chatter(websocket: WebSocket):
     """WebSocket endpoint for real-time audio streaming.
 
     Protocol:
+    - Frontend sends {"type": "audio_format", "encoding": "LINEAR16", "sample_rate": 48000, "channels": 1}
+      before the audio (kept for the connection), so the question is transcribed with one STT
+      call; without it the format is read from a WAV/FLAC/Ogg/WebM header, or probed in parallel.
+      With a known format the audio is also recognized while it streams in (add "streaming": false
+      to turn that off): the backend sends {"status": "interim_transcript", "text": ...} as the
+      transcript grows, and "complete" only waits for the last phrase to be finalized
     - Frontend sends audio chunks as bytes OR JSON with base64 audio
     - Frontend sends {"type": "complete"} when audio is done
+      (add "answer_cache": false to skip the semantic answer cache for that question, and
+      "stream_audio": true to get the answer as one WAV per sentence group, each preceded by
+      {"status": "audio_segment", "index": i, "text": ...}, while Gemini is still generating)
+    - Backend acks audio with {"status": "chunk_received", "size": n} at most every
+      AUDIO_ACK_INTERVAL_SECONDS, and sends {"status": "audio_limit_reached"} once if the
+      recording passes AUDIO_INGEST_MAX_SECONDS (the rest of that recording is dropped)
     - Backend sends status updates as JSON
     - Backend streams audio response as bytes
     """
@@ -349,7 +559,7 @@ async def websocket_chatter(websocket: WebSocket):
 
     if token:
         try:
-            decoded_token = verify_token(token)
+            decoded_token = await verify_token_async(token)
             user_id = decoded_token["uid"]
             print(f"[websocket] Authenticated user: {user_id}")
         except Exception as e:
@@ -368,10 +578,14 @@ async def websocket_chatter(websocket: WebSocket):
     # - Save audio history with user_id
     # - Load user preferences with user_id
 
-    audio_buffer = bytearray()  # bytearray data structure is what will hold our audio chunks
+    # bounded buffer (audio_ingest.py) that holds our audio chunks; long recordings spill to disk
+    audio_buffer = AudioIngestBuffer()
     # tts_client = OpenAI()  # Initialize once, reuse in loop
     is_processing = False  # what this is checking is that the backend is already
     # transcribing/generating a response
+    audio_format = None  # capture format announced by the frontend (speech_to_text_client.py)
+    streaming_stt = True  # recognize while the user talks when the format is known
+    transcriber = None  # StreamingTranscriber for the question being recorded
 
     try:
         while True:
@@ -392,15 +606,27 @@ async def websocket_chatter(websocket: WebSocket):
                     if is_processing:
                         print("[websocket] Ignoring audio chunk - still processing previous request")
                         continue
-                    chunk_size = len(message["bytes"])
-                    audio_buffer.extend(
-                        message["bytes"]
-                    )  # each audio chunk is appended to this audio_buffer byte array
-                    print(
-                        "[websocket] Received audio chunk:"
-                        f" {chunk_size} bytes, total buffer: {len(audio_buffer)} bytes"
-                    )
-                    await websocket.send_json({"status": "chunk_received", "size": len(audio_buffer)})
+                    # each audio chunk is appended to audio_buffer (kept even while streaming,
+                    # as the fallback if the streaming session fails)
+                    was_truncated = audio_buffer.truncated
+                    if not audio_buffer.append(message["bytes"]):
+                        # past AUDIO_INGEST_MAX_SECONDS / AUDIO_INGEST_MAX_BYTES: the question is
+                        # transcribed from what we have, the rest of the recording is dropped
+                        if not was_truncated:
+                            print(f"[websocket] Recording limit reached: {audio_buffer.stats()}")
+                            await websocket.send_json({"status": "audio_limit_reached", "size": len(audio_buffer)})
+                        continue
+                    if transcriber is None and streaming_stt:
+                        transcriber = start_streaming_transcriber(audio_format)
+                    if transcriber is not None:
+                        transcriber.feed(message["bytes"])
+                    # one ack (and interim transcript) per AUDIO_ACK_INTERVAL_SECONDS, not per frame
+                    if audio_buffer.ack_due():
+                        print(f"[websocket] Receiving audio: {audio_buffer.stats()}")
+                        await websocket.send_json({"status": "chunk_received", "size": len(audio_buffer)})
+                        interim = transcriber.pop_interim() if transcriber is not None else None
+                        if interim:
+                            await websocket.send_json({"status": "interim_transcript", "text": interim})
 
                 # Handle JSON control messages
                 elif "text" in message:
@@ -408,7 +634,13 @@ async def websocket_chatter(websocket: WebSocket):
                         data = json.loads(message["text"])
                         print(f"[websocket] Received JSON message: {data}")
 
-                        if data.get("type") == "complete":
+                        if data.get("type") == "audio_format":
+                            audio_format = audio_format_from_message(data)
+                            streaming_stt = bool(data.get("streaming", True))
+                            audio_buffer.set_format(audio_format)
+                            await websocket.send_json({"status": "audio_format", "format": audio_format})
+
+                        elif data.get("type") == "complete":
                             # Check if we're already processing
                             if is_processing:
                                 print("[websocket] Already processing a request, " "ignoring new complete signal")
@@ -437,10 +669,15 @@ async def websocket_chatter(websocket: WebSocket):
                                 # audio_to_text again is the speech_to_text_client.py file,
                                 # that converts our frontend audio to text. the transcribed text is
                                 # the output from audio_to_text.
-                                text = await audio_to_text(
-                                    bytes(audio_buffer)
-                                )  # and we feed audio_buffer, our chunks of audio, into the
-                                # function as input
+                                # With a streaming session the transcript is already (nearly)
+                                # done; only if it failed do we recognize the buffered audio
+                                text = await transcriber.finish() if transcriber is not None else None
+                                if text is None:
+                                    with audio_buffer.view() as audio:  # memoryview, no copy
+                                        text = await audio_to_text(
+                                            audio, audio_format_from_message(data) or audio_format
+                                        )  # and we feed audio_buffer, our chunks of audio, into the
+                                        # function as input, with the capture format if the frontend sent it
                                 # I think this is what shows up in the backend terminal once the
                                 # transcription is complete
                                 # so we can monitor progress
@@ -450,9 +687,12 @@ async def websocket_chatter(websocket: WebSocket):
                                 print(f"[websocket] Transcription error: {e}")
                                 await websocket.send_json({"error": f"Transcription failed: {str(e)}"})
                                 audio_buffer.clear()
+                                transcriber = None
                                 is_processing = False
                                 continue
 
+                            transcriber = None
+                            audio_buffer.clear()  # transcript in hand: release the recording now
                             if not text:
                                 await websocket.send_json({"error": "Failed to transcribe audio (empty response)"})
                                 audio_buffer.clear()
@@ -469,8 +709,7 @@ async def websocket_chatter(websocket: WebSocket):
 
                             if daily_brief_id or user_id:  # Fallback: fetch by user_id if no ID provided
                                 print("[websocket] Checking for daily brief context...")
-                                from helpers import get_daily_brief_context
-                                brief_context = get_daily_brief_context(user_id)
+                                brief_context = await get_daily_brief_context_async(user_id)
 
                                 if brief_context:
                                     print(f"[websocket] Found daily brief context: {len(brief_context['chunks'])} chunks")
@@ -480,8 +719,9 @@ async def websocket_chatter(websocket: WebSocket):
                             # ========== CLASSIFY QUESTION IF BRIEF CONTEXT EXISTS ==========
                             if brief_context:
                                 await websocket.send_json({"status": "classifying_question"})
-                                from helpers import classify_question_context
-                                classification = classify_question_context(text, brief_context["transcript"], model)
+                                classification = await classify_question_context_async(
+                                    text, brief_context["transcript"], model
+                                )
                                 print(f"\n{'='*60}")
                                 print(f"[CLASSIFICATION RESULT] {classification}")
                                 print(f"{'='*60}\n")
@@ -492,6 +732,25 @@ async def websocket_chatter(websocket: WebSocket):
 
                             # NEW STEP: Query Enhancement - conditional based on question type
                             original_query = text  # Keep original for podcast generation
+                            stream_audio = bool(data.get("stream_audio", False))
+
+                            # ========== SEMANTIC ANSWER CACHE (general questions only) ==========
+                            question_embedding = None
+                            if ANSWER_CACHE_ENABLED and not use_brief_context and data.get("answer_cache", True):
+                                try:
+                                    question_embedding = await embed_query_cached_async(text)
+                                except Exception as e:
+                                    print(f"[answer-cache-error] Could not embed question: {e}")
+                                served = None
+                                if question_embedding is not None:
+                                    served = await _answer_from_cache(
+                                        websocket, question_embedding, original_query, user_id, stream_audio
+                                    )
+                                if served is not None:
+                                    audio_buffer.clear()
+                                    is_processing = False
+                                    print("[websocket] Served from answer cache, ready for next recording")
+                                    continue
 
                             if use_brief_context:
                                 # CONTEXTUAL question - use original query, no enhancement
@@ -506,7 +765,7 @@ async def websocket_chatter(websocket: WebSocket):
                                 print("[websocket] Enhancing query for general question...")
 
                                 # Enhance the query once
-                                enhancement_result, error = enhance_query_with_gemini(text, model)
+                                enhancement_result, error = await enhance_query_with_gemini_async(text, model)
 
                                 if error or not enhancement_result:
                                     print("[websocket] Query enhancement error:" f" {error}, using original query")
@@ -533,6 +792,8 @@ async def websocket_chatter(websocket: WebSocket):
                                 model,
                                 use_brief_context=use_brief_context,  # NEW: Pass context flag
                                 brief_context=brief_context,  # NEW: Pass daily brief context
+                                question_embedding=question_embedding,
+                                stream_audio=stream_audio,
                             )
 
                             if not success:
@@ -548,11 +809,19 @@ async def websocket_chatter(websocket: WebSocket):
                         elif data.get("type") == "audio":
                             # JSON with base64 audio data
                             audio_bytes = base64.b64decode(data["data"])
-                            audio_buffer.extend(audio_bytes)
+                            if not audio_buffer.append(audio_bytes):
+                                continue
+                            if transcriber is None and streaming_stt and not is_processing:
+                                transcriber = start_streaming_transcriber(audio_format)
+                            if transcriber is not None:
+                                transcriber.feed(audio_bytes)
 
                         elif data.get("type") == "reset":
                             # Frontend wants to reset
                             audio_buffer.clear()
+                            if transcriber is not None:
+                                transcriber.cancel()
+                                transcriber = None
                             is_processing = False
                             await websocket.send_json({"status": "reset"})
                             print("[websocket] Reset signal, cleared buffer & processing flag")
@@ -570,6 +839,10 @@ async def websocket_chatter(websocket: WebSocket):
             await websocket.send_json({"error": str(e)})
         except Exception:
             pass
+    finally:
+        if transcriber is not None:
+            transcriber.cancel()
+        audio_buffer.clear()
 
 
 # --------------------------
@@ -594,7 +867,7 @@ class FirebaseAuthMiddleware(BaseHTTPMiddleware):
 
         # Skip auth for health check and public endpoints
         # CHANGE CM - if request.url.path in ["/", "/healthz", "/docs", "/openapi.json"]:
-        if request.url.path in ["/", "/health", "/healthz", "/api/health", "/docs", "/openapi.json"]:
+        if request.url.path in ["/", "/health", "/healthz", "/api/health", "/metrics", "/docs", "/openapi.json"]:
             return await call_next(request)
 
         # WebSocket handles auth separately (see below)
@@ -610,7 +883,7 @@ class FirebaseAuthMiddleware(BaseHTTPMiddleware):
 
         try:
             # Verify token
-            decoded_token = verify_token(token)
+            decoded_token = await verify_token_async(token)
             user_id = decoded_token["uid"]
 
             # Attach user info to request state
@@ -633,7 +906,7 @@ async def create_user_endpoint(request: Request):
     try:
         user_id = request.state.user_id
         user_email = request.state.user_email
-        success = create_user(user_id, user_email)
+        success = await create_user_async(user_id, user_email)
         if success:
             return {"status": "success", "user_id": user_id}
         else:
@@ -647,7 +920,7 @@ async def get_preferences_endpoint(request: Request):
     """Get user preferences."""
     try:
         user_id = request.state.user_id
-        preferences = get_user_preferences(user_id)
+        preferences = await get_user_preferences_async(user_id)
         return {"status": "success", "preferences": preferences}
     except AttributeError:
         raise HTTPException(status_code=401, detail="User not authenticated")
@@ -666,14 +939,14 @@ async def save_preferences_endpoint(request: Request, preferences: Dict[str, Any
 
         # Ensure user exists in database (fallback in case frontend call failed)
         # This uses ON CONFLICT DO NOTHING, so it's safe to call even if user exists
-        create_user(user_id, user_email)
+        await create_user_async(user_id, user_email)
 
         #[Z] this saves the user preferences in our user_preferences table in CloudSQL
 #         user_id  | preference_key | preference_value
 #    ---------|----------------|------------------
 #    abc123   | topics         | ["Politics","Tech"]
 #    abc123   | sources        | ["Harvard Gazette"]
-        success = save_user_preferences(user_id, preferences)
+        success = await save_user_preferences_async(user_id, preferences)
         if success:
             return {"status": "success", "message": "Preferences saved"}
         else:
@@ -687,7 +960,7 @@ async def get_history_endpoint(request: Request, limit: int = 10):
     """Get user's audio history."""
     try:
         user_id = request.state.user_id
-        history = get_audio_history(user_id, limit)
+        history = await get_audio_history_async(user_id, limit)
         return {"status": "success", "history": history}
     except AttributeError:
         raise HTTPException(status_code=401, detail="User not authenticated")
@@ -697,26 +970,198 @@ async def get_history_endpoint(request: Request, limit: int = 10):
 # Daily Brief Endpoints
 # --------------------------
 
-@app.post("/api/daily-brief")
-async def generate_daily_brief_endpoint(request: Request):
+async def _build_brief_transcript(
+    topics: List[str], sources: List[str], progress: Callable[[str], None]
+) -> Dict[str, Any]:
+    """Retrieve articles for the preferences and have Gemini write the brief.
+
+    Returns {"podcast_text", "source_chunks"} (source_chunks is the JSON string saved for
+    context-aware Q&A). Nothing in it is specific to a user, which is what lets
+    shared_briefs.py hand the same transcript to everyone with these preferences.
+    """
+    #in this search_articles_by_preferneces function we combine topics into a single string
+    #i.e. "politics technology", generate an embedding vector, and do hybrid retrieval SQL query
+
+    # retreive the chunks based on their preferred topics and sources
+    #w/ associated parameters (30 chunks, 2 days back)
+    """
+    SELECT id, chunk, source_type, embedding <=> %s AS score
+    FROM vector_table
+    WHERE source_type = ANY(['Harvard Gazette', 'Harvard Crimson'])  -- Exact source filter
+    AND summary->>'category' = ANY(['Politics', 'Technology'])      -- Exact category filter
+    ORDER BY
+        embedding <=> %s,  -- Semantic ranking by similarity
+        id DESC            -- Newest first
+    LIMIT 30;
+    """
+
+    progress("retrieving")
+    chunks = await search_articles_by_preferences_async(
+        topics=topics,
+        sources=sources,
+        limit=30,
+        days_back=2
+    )
+
+    if not chunks:
+        raise HTTPException(
+            status_code=404,
+            detail="No articles found matching your preferences"
+        )
+
+    print(f"[daily-brief] Retrieved {len(chunks)} chunks")
+
+    # Drop near-duplicates and fit the prompt budget; the packed chunks are also what gets
+    # saved as the brief's context for follow-up questions
+    chunks = await pack_context_for_prompt_async(chunks, token_budget=DAILY_BRIEF_TOKEN_BUDGET)
+
+    # format context for Gemini API so that the podcast generation accuratelty mentions the news source title where the info came from
+    #so context_text is literally a list of [Article Title: "title" \n "chunk"] for however many chunks we return
+    context_text = "\n\n".join([
+        f"Article Title: {source_type}\n{chunk}"
+        for _, chunk, source_type, score in chunks
+    ])
+
+    
+    try:
+        # Create custom prompt for daily brief
+        today_date = datetime.now(timezone.utc).strftime("%B %d, %Y")
+        
+        # build the full prompt for the gemini API call using the DAILY_BRIEF_PROMPT
+        
+        DAILY_BRIEF_PROMPT = """
+        You are a professional news anchor creating a daily briefing for Harvard community members.
+
+        OBJECTIVE:
+        Create an engaging, comprehensive daily news summary covering the most important Harvard news stories from the provided articles.
+
+        STRUCTURE:
+        1. Opening: Brief welcome and overview of today's top stories (mention the date)
+        2. Main stories: Cover 3-5 major developments in detail with proper context
+        3. Quick hits: Mention 2-3 additional noteworthy items briefly
+        4. Closing: Brief wrap-up
+
+        DELIVERY STYLE:
+        - Professional yet conversational tone (like NPR's "The Daily")
+        - Natural narration - NO markdown formatting (**bold**, *italics*, ### headers, etc.)
+        - DO NOT use special characters or formatting - write in plain text only
+        - This will be converted to speech, so write for listening, not reading
+        - Clearly attribute information by naturally mentioning article sources
+        - Example: "According to the Harvard Gazette article 'Research Breakthrough,' scientists have discovered..."
+        - Smooth transitions between topics
+        - Appropriate pacing for audio consumption
+
+        IMPORTANT:
+        - Focus on the most significant and interesting stories
+        - Provide context and explain why stories matter to the Harvard community
+        - Keep total length around 3-5 minutes when spoken (approximately 500-750 words)
+        - Be authoritative and well-informed
+        - Make it engaging - this is the user's personalized morning briefing
+
+        Begin with: "Good morning, this is your Harvard News Daily Brief for [today's date]..."
+
+        End with: "That's your Harvard News Daily Brief. Have a great day!"
+        """
+
+        full_prompt = f"""{DAILY_BRIEF_PROMPT} 
+
+Today's date: {today_date}
+
+Here are the news articles to summarize:
+
+{context_text}
+
+Now generate your daily briefing:"""
+        #this is literally calling the gemini_api directly to generate a podcast
+        # the call_gemini_api() is a script that is solely used for the interactive Q&A
+        #creating a separate helper for one use case is "overkill" according to claude, I think it is actually helpful, but eh
+        progress("generating")
+        response = await model.generate_content_async(full_prompt)
+        podcast_text = response.text
+
+        if not podcast_text:
+            raise HTTPException(status_code=500, detail="Failed to generate briefing text")
+
+        print(f"[daily-brief] Generated text: {len(podcast_text)} chars")
+
+    except Exception as e:
+        print(f"[daily-brief] Gemini error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate briefing: {str(e)}")
+
+    # [Z] save the chunks for storage (for context-aware Q&A)
+    chunks_data = {
+        "chunks": [
+            {
+                "chunk_id": chunk_id,
+                "chunk_text": chunk_text,
+                "source_type": source_type,
+                "score": float(score)
+            }
+            for chunk_id, chunk_text, source_type, score in chunks
+        ]
+    }
+    print(f"[daily-brief] Serialized {len(chunks)} chunks for storage")
+    return {"podcast_text": podcast_text, "source_chunks": json.dumps(chunks_data)}
+
+
+async def _build_brief_audio(podcast_text: str, voice: str, owner: str, progress: Callable[[str], None]) -> str:
+    """Synthesize the brief in `voice` and upload it under daily-brief/<owner>/; returns the audio URL."""
+    print("[daily-brief] Converting text to audio...")
+    """what audio bytes does is check if text lenght > 4000 bytes, if so
+    split into chunks.
+    for each chunk, call Google TTS API, get PCM audio data, add 0.8s silence between chunks
+    Then join all audio chunks together
+    Convert them from PCM to WAV format with headers
+    Complete WAV file as bytes
+    """
+    progress("synthesizing")
+    audio_bytes = await text_to_audio_bytes_async(podcast_text, voice_name=voice)
+
+    if not audio_bytes:
+        raise HTTPException(status_code=500, detail="Failed to generate audio from text")
+
+    print("[daily-brief] Uploading audio to GCS...")
+    progress("uploading")
+    """
+    What upload_audio_to_gcs does is initialize GCS client w/ service account credentials
+    Generates a unique audio filename
+    Uploads the audio to ac215-audio-bucket
+    Sets cache control & signed URL (who can access, how long the audio file lives for inside bucket)
+    Returns URL (audio_url)
+    
+    """
+    audio_url = await upload_audio_to_gcs_async(audio_bytes, owner, filename_prefix="daily-brief")
+
+    if not audio_url:
+        raise HTTPException(status_code=500, detail="Failed to upload audio to storage")
+
+    print(f"[daily-brief] Audio uploaded successfully: {audio_url}")
+    return audio_url
+
+
+async def _generate_daily_brief(user_id: str, progress: Callable[[str], None] = lambda stage: None) -> Dict[str, Any]:
     """Generate a personalized daily news briefing based on user preferences.
     
     If only voice preference changed (not topics/sources), regenerates audio from existing transcript.
-    Otherwise, generates a new transcript and audio.
+    Otherwise, generates a new transcript and audio. Users with the same topics and sources
+    get the same transcript and, per voice, the same audio (shared_briefs.py).
+
+    Runs as a background job (brief_jobs.py); progress(stage) reports each step to the
+    job status. Failures raise HTTPException, whose status and detail become the job's error.
     """
     try:
-        user_id = request.state.user_id
         print(f"[daily-brief] Generating for user: {user_id}")
+        progress("loading_preferences")
 
         # Load user preferences from user_preferences table in CloudSQL
         #  (this function comes from the user_db.py script)
-        preferences = get_user_preferences(user_id)
+        preferences = await get_user_preferences_async(user_id)
         
         # Check if only voice preference changed (not topics/sources)
         # We check by comparing when voice was updated vs when content preferences were updated
         # If voice was updated more recently than content preferences, it's a voice-only change
-        content_prefs_updated = get_preferences_last_updated(user_id)
-        voice_pref_updated = get_voice_preference_last_updated(user_id)
+        content_prefs_updated = await get_preferences_last_updated_async(user_id)
+        voice_pref_updated = await get_voice_preference_last_updated_async(user_id)
         
         voice_only_change = False
         if voice_pref_updated:
@@ -749,7 +1194,7 @@ async def generate_daily_brief_endpoint(request: Request):
         # If only voice changed, get latest transcript and regenerate audio
         if voice_only_change:
             # Get the most recent daily brief transcript
-            history = get_audio_history(user_id, limit=50)
+            history = await get_audio_history_async(user_id, limit=50)
             daily_briefs = [h for h in history if h.get("question_text") == "Daily Brief"]
             
             if daily_briefs and daily_briefs[0].get("podcast_text"):
@@ -784,16 +1229,14 @@ async def generate_daily_brief_endpoint(request: Request):
                 # Regenerate audio with new voice
                 voice_preference = preferences.get("voice_preference", "en-US-Studio-O")
                 print(f"[daily-brief] Regenerating audio with voice: {voice_preference}")
-                audio_bytes = text_to_audio_bytes(podcast_text, voice_name=voice_preference)
-                
-                if not audio_bytes:
-                    raise HTTPException(status_code=500, detail="Failed to generate audio from text")
-                
-                # Upload new audio
-                audio_url = upload_audio_to_gcs(audio_bytes, user_id, filename_prefix="daily-brief")
-                
-                if not audio_url:
-                    raise HTTPException(status_code=500, detail="Failed to upload audio to storage")
+                # A shared brief may already have audio in this voice (another user with the
+                # same preferences picked it); otherwise synthesize and upload it once for all
+                brief_key = latest_brief.get("brief_key")
+                audio_url = await get_or_create_audio(
+                    brief_key,
+                    voice_preference,
+                    lambda: _build_brief_audio(podcast_text, voice_preference, "shared" if brief_key else user_id, progress),
+                )
                 
                 # Update the existing audio_history entry with new audio URL
                 # Note: We keep the same transcript but update the audio
@@ -807,12 +1250,13 @@ async def generate_daily_brief_endpoint(request: Request):
                     source_chunks = None
                 # If it's already a string, use it as-is
                 
-                save_audio_history(
+                await save_audio_history_async(
                     user_id=user_id,
                     question_text="Daily Brief",
-                    podcast_text=podcast_text,
+                    podcast_text=None if brief_key else podcast_text,
                     audio_url=audio_url,
-                    source_chunks=source_chunks  # Keep same chunks
+                    source_chunks=None if brief_key else source_chunks,  # Keep same chunks
+                    brief_key=brief_key,
                 )
                 
                 # Don't update last_daily_brief_generated timestamp for voice-only changes
@@ -871,170 +1315,39 @@ topics_str = preference.get("topics", "[]") pulls the list of preferred topics (
                 status_code=400,
                 detail="No preferences set. Please configure topics and sources first."
             )
-        #in this search_articles_by_preferneces function we combine topics into a single string
-        #i.e. "politics technology", generate an embedding vector, and do hybrid retrieval SQL query
-
-        # retreive the chunks based on their preferred topics and sources
-        #w/ associated parameters (30 chunks, 2 days back)
-        """
-        SELECT id, chunk, source_type, embedding <=> %s AS score
-        FROM vector_table
-        WHERE source_type = ANY(['Harvard Gazette', 'Harvard Crimson'])  -- Exact source filter
-        AND summary->>'category' = ANY(['Politics', 'Technology'])      -- Exact category filter
-        ORDER BY
-            embedding <=> %s,  -- Semantic ranking by similarity
-            id DESC            -- Newest first
-        LIMIT 30;
-        """
-
-        chunks = search_articles_by_preferences(
-            topics=topics,
-            sources=sources,
-            limit=30,
-            days_back=2
-        )
-
-        if not chunks:
-            raise HTTPException(
-                status_code=404,
-                detail="No articles found matching your preferences"
-            )
-
-        print(f"[daily-brief] Retrieved {len(chunks)} chunks")
-
-        # format context for Gemini API so that the podcast generation accuratelty mentions the news source title where the info came from
-        #so context_text is literally a list of [Article Title: "title" \n "chunk"] for however many chunks we return
-        context_text = "\n\n".join([
-            f"Article Title: {source_type}\n{chunk}"
-            for _, chunk, source_type, score in chunks
-        ])
-
-        
-        try:
-            # Create custom prompt for daily brief
-            today_date = datetime.now(timezone.utc).strftime("%B %d, %Y")
-            
-            # build the full prompt for the gemini API call using the DAILY_BRIEF_PROMPT
-            
-            DAILY_BRIEF_PROMPT = """
-        You are a professional news anchor creating a daily briefing for Harvard community members.
-
-        OBJECTIVE:
-        Create an engaging, comprehensive daily news summary covering the most important Harvard news stories from the provided articles.
-
-        STRUCTURE:
-        1. Opening: Brief welcome and overview of today's top stories (mention the date)
-        2. Main stories: Cover 3-5 major developments in detail with proper context
-        3. Quick hits: Mention 2-3 additional noteworthy items briefly
-        4. Closing: Brief wrap-up
-
-        DELIVERY STYLE:
-        - Professional yet conversational tone (like NPR's "The Daily")
-        - Natural narration - NO markdown formatting (**bold**, *italics*, ### headers, etc.)
-        - DO NOT use special characters or formatting - write in plain text only
-        - This will be converted to speech, so write for listening, not reading
-        - Clearly attribute information by naturally mentioning article sources
-        - Example: "According to the Harvard Gazette article 'Research Breakthrough,' scientists have discovered..."
-        - Smooth transitions between topics
-        - Appropriate pacing for audio consumption
-
-        IMPORTANT:
-        - Focus on the most significant and interesting stories
-        - Provide context and explain why stories matter to the Harvard community
-        - Keep total length around 3-5 minutes when spoken (approximately 500-750 words)
-        - Be authoritative and well-informed
-        - Make it engaging - this is the user's personalized morning briefing
-
-        Begin with: "Good morning, this is your Harvard News Daily Brief for [today's date]..."
-
-        End with: "That's your Harvard News Daily Brief. Have a great day!"
-        """
-
-            full_prompt = f"""{DAILY_BRIEF_PROMPT} 
-
-Today's date: {today_date}
-
-Here are the news articles to summarize:
-
-{context_text}
-
-Now generate your daily briefing:"""
-            #this is literally calling the gemini_api directly to generate a podcast
-            # the call_gemini_api() is a script that is solely used for the interactive Q&A
-            #creating a separate helper for one use case is "overkill" according to claude, I think it is actually helpful, but eh
-            response = model.generate_content(full_prompt)
-            podcast_text = response.text
-
-            if not podcast_text:
-                raise HTTPException(status_code=500, detail="Failed to generate briefing text")
-
-            print(f"[daily-brief] Generated text: {len(podcast_text)} chars")
-
-        except Exception as e:
-            print(f"[daily-brief] Gemini error: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to generate briefing: {str(e)}")
-
-        # Convert to audio and upload to GCS
-        
-        print("[daily-brief] Converting text to audio...")
-        """what audio bytes does is check if text lenght > 4000 bytes, if so
-        split into chunks.
-        for each chunk, call Google TTS API, get PCM audio data, add 0.8s silence between chunks
-        Then join all audio chunks together
-        Convert them from PCM to WAV format with headers
-        Complete WAV file as bytes
-        """
-        # Get user's voice preference
+        # Users with the same topics + sources share one transcript per day and corpus version,
+        # and one audio file per voice (shared_briefs.py). The brief is retrieved for the
+        # canonical (sorted) preferences, so it is the same whichever of them asks first.
+        topics, sources = canonical_preferences(topics), canonical_preferences(sources)
         voice_preference = preferences.get("voice_preference", "en-US-Studio-O")
         print(f"[daily-brief] Using voice preference: {voice_preference}")
-        audio_bytes = text_to_audio_bytes(podcast_text, voice_name=voice_preference)
-
-        if not audio_bytes:
-            raise HTTPException(status_code=500, detail="Failed to generate audio from text")
-
-        print("[daily-brief] Uploading audio to GCS...")
-        """
-        What upload_audio_to_gcs does is initialize GCS client w/ service account credentials
-        Generates a unique audio filename
-        Uploads the audio to ac215-audio-bucket
-        Sets cache control & signed URL (who can access, how long the audio file lives for inside bucket)
-        Returns URL (audio_url)
-        
-        """
-        audio_url = upload_audio_to_gcs(audio_bytes, user_id, filename_prefix="daily-brief")
-
-        if not audio_url:
-            raise HTTPException(status_code=500, detail="Failed to upload audio to storage")
-
-        print(f"[daily-brief] Audio uploaded successfully: {audio_url}")
-
-        # [Z] save the chunks for storage (for context-aware Q&A)
-        chunks_data = {
-            "chunks": [
-                {
-                    "chunk_id": chunk_id,
-                    "chunk_text": chunk_text,
-                    "source_type": source_type,
-                    "score": float(score)
-                }
-                for chunk_id, chunk_text, source_type, score in chunks
-            ]
-        }
-        print(f"[daily-brief] Serialized {len(chunks)} chunks for storage")
+        brief = await get_or_create_transcript(
+            brief_spec(topics, sources), lambda: _build_brief_transcript(topics, sources, progress)
+        )
+        podcast_text = brief["podcast_text"]
+        shared = brief["brief_key"] is not None
+        audio_url = await get_or_create_audio(
+            brief["brief_key"],
+            voice_preference,
+            lambda: _build_brief_audio(podcast_text, voice_preference, "shared" if shared else user_id, progress),
+        )
 
-        # Save to audio_history with question_text="Daily Brief"
-        save_audio_history(
+        # Save to audio_history with question_text="Daily Brief"; a shared brief is referenced
+        # by its key instead of copying the transcript and chunks into every user's row
+        progress("saving")
+        await save_audio_history_async(
             user_id=user_id,
             question_text="Daily Brief",
-            podcast_text=podcast_text,
+            podcast_text=None if shared else podcast_text,
             audio_url=audio_url,
-            source_chunks=json.dumps(chunks_data)  # NEW: Save chunks for context-aware Q&A
+            source_chunks=None if shared else brief["source_chunks"],  # NEW: Save chunks for context-aware Q&A
+            brief_key=brief["brief_key"],
         )
         # [Z] GCS bucket also keeps track of q+a audio files for each user
 
         # Update last_daily_brief_generated timestamp
         current_time = datetime.now(timezone.utc).isoformat()
-        save_user_preferences(user_id, {"last_daily_brief_generated": current_time})
+        await save_user_preferences_async(user_id, {"last_daily_brief_generated": current_time})
 
         print(f"[daily-brief] Successfully generated and saved")
         #return the success of generating daily brief to frontend via Websocket
@@ -1048,8 +1361,6 @@ Now generate your daily briefing:"""
 
     except HTTPException:
         raise
-    except AttributeError:
-        raise HTTPException(status_code=401, detail="User not authenticated")
     except Exception as e:
         print(f"[daily-brief-error] {e}")
         import traceback
@@ -1057,6 +1368,59 @@ Now generate your daily briefing:"""
         raise HTTPException(status_code=500, detail=f"Failed to generate daily brief: {str(e)}")
 
 
+@app.post("/api/daily-brief")
+async def generate_daily_brief_endpoint(request: Request, wait: bool = False):
+    """Start generating the user's daily brief as a background job and return its id at once.
+
+    Responds 202 with {"job_id", "status", "stage", ...}; poll /api/daily-brief/jobs/{job_id}
+    until status is "succeeded" (result holds the brief) or "failed". While a brief is already
+    queued or running for the user, the same job is returned (repeated clicks attach to it).
+    ?wait=true keeps the old blocking behaviour and returns the brief itself.
+    """
+    try:
+        user_id = request.state.user_id
+    except AttributeError:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    try:
+        job, created = await daily_brief_jobs.submit(user_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Daily brief queue is full, try again shortly ({e})")
+
+    if wait:
+        job = await daily_brief_jobs.wait_until_done(job["job_id"])
+        if job["status"] == "succeeded":
+            return job["result"]
+        if job["status"] == "failed":
+            raise HTTPException(status_code=job["error_status"] or 500, detail=job["error"])
+    job["created"] = created
+    return JSONResponse(status_code=202, content=job)
+
+
+@app.get("/api/daily-brief/jobs/{job_id}")
+async def get_daily_brief_job_endpoint(request: Request, job_id: str, wait: float = 0):
+    """Status of a daily brief job: status (queued/running/succeeded/failed), stage, result, error.
+
+    ?wait=N long-polls: the response is sent as soon as the job changes, or after N seconds
+    (at most DAILY_BRIEF_MAX_WAIT_SECONDS).
+    """
+    try:
+        user_id = request.state.user_id
+    except AttributeError:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    job = await daily_brief_jobs.wait(job_id, min(max(wait, 0), DAILY_BRIEF_MAX_WAIT_SECONDS))
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Daily brief job not found")
+    return job
+
+
+# one pool for all briefs of this worker, sized apart from interactive Q&A (DAILY_BRIEF_WORKERS)
+daily_brief_jobs = BriefJobManager(_generate_daily_brief)
+# Pre-generate every active user's brief after each loader run (batch_briefs.py)
+schedule_batch_on_corpus_change(_generate_daily_brief)
+
+
 #we check status first to avoid regenerating the same brief multiple times
 #one brief per user per day
 #podcast page CHECKS this endpoint on load to avoid re-generating if already done today
@@ -1067,12 +1431,12 @@ async def check_daily_brief_status_endpoint(request: Request):
         user_id = request.state.user_id
 
         # Load last_daily_brief_generated timestamp
-        preferences = get_user_preferences(user_id)
+        preferences = await get_user_preferences_async(user_id)
         last_generated_str = preferences.get("last_daily_brief_generated")
 
         # Get when preferences (topics/sources) were last updated
-        preferences_updated_str = get_preferences_last_updated(user_id)
-        voice_pref_updated_str = get_voice_preference_last_updated(user_id)
+        preferences_updated_str = await get_preferences_last_updated_async(user_id)
+        voice_pref_updated_str = await get_voice_preference_last_updated_async(user_id)
 
         generated_today = False
         preferences_changed = False
@@ -1141,7 +1505,7 @@ async def get_latest_daily_brief_endpoint(request: Request):
         user_id = request.state.user_id
 
         # Get all history and filter for "Daily Brief"
-        history = get_audio_history(user_id, limit=50)
+        history = await get_audio_history_async(user_id, limit=50)
 
         # Find most recent daily brief
         daily_briefs = [h for h in history if h.get("question_text") == "Daily Brief"]
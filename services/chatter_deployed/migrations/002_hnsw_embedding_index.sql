@@ -0,0 +1,25 @@
+-- Migration: Replace the ivfflat index on chunks_vector.embedding with HNSW
+-- Purpose: ivfflat lists are fixed when the index is built (lists = 100 on a table that has
+--          grown since), so recall drops unless the index is rebuilt. HNSW needs no training
+--          step, keeps recall as rows are added, and is tuned per query via hnsw.ef_search
+--          (set by retriever.py on every pooled session).
+-- Date: 2025-12-10
+--
+-- Requires pgvector >= 0.5.0. CONCURRENTLY cannot run inside a transaction block:
+-- run with plain `psql -f` (autocommit), not with --single-transaction.
+
+-- More memory makes the build faster (session only)
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_embedding_hnsw
+ON chunks_vector USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- The old ivfflat index would only compete with the HNSW one in the planner
+DROP INDEX CONCURRENTLY IF EXISTS idx_chunks_embedding;
+
+-- Verify
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'chunks_vector'
+AND indexdef ILIKE '%embedding%';
@@ -0,0 +1,25 @@
+-- Migration: Full-text search column + GIN index on chunks_vector
+-- Purpose: Hybrid retrieval (retriever.py, RETRIEVAL_MODE=hybrid). Questions that name people
+--          or places are matched lexically on title + chunk and fused with the vector ranking.
+-- Date: 2025-12-12
+--
+-- Adding a STORED generated column rewrites chunks_vector once (ACCESS EXCLUSIVE lock while it
+-- runs), so run it outside loader hours. The loader needs no change: Postgres fills the
+-- column on every INSERT. Until this migration has run, the retriever falls back to
+-- vector-only search on its own.
+
+ALTER TABLE chunks_vector
+ADD COLUMN IF NOT EXISTS search_tsv tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(chunk, '')), 'B')
+) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_search_tsv
+ON chunks_vector USING gin (search_tsv);
+
+-- Verify
+SELECT column_name, data_type, is_generated
+FROM information_schema.columns
+WHERE table_name = 'chunks_vector'
+AND column_name = 'search_tsv';
@@ -0,0 +1,16 @@
+-- Migration: Recency index on chunks_vector
+-- Purpose: search_articles_by_preferences (daily brief) only looks at chunks newer than
+--          days_back, using COALESCE(published_at, fetched_at) as the chunk's date. This
+--          index lets Postgres read just that window instead of the whole table.
+-- Date: 2025-12-15
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_recency
+ON chunks_vector ((COALESCE(published_at, fetched_at)));
+
+ANALYZE chunks_vector;
+
+-- Verify
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'chunks_vector'
+AND indexname = 'idx_chunks_recency';
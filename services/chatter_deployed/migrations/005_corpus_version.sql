@@ -0,0 +1,16 @@
+-- Migration: Corpus version stamp
+-- Purpose: The loader bumps corpus_version.version and sends NOTIFY corpus_updated after
+--          every run that inserted chunks. The chatter LISTENs on that channel and keys its
+--          retrieval result cache on the version, so cached results never outlive a load.
+-- Date: 2025-12-16
+
+CREATE TABLE IF NOT EXISTS corpus_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO corpus_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Verify
+SELECT version, updated_at FROM corpus_version;
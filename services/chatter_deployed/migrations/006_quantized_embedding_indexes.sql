@@ -0,0 +1,26 @@
+-- Migration: Compact ANN indexes on chunks_vector.embedding (halfvec and binary quantization)
+-- Purpose: The float32 HNSW index stores 768 x 4 bytes per chunk. An expression index over
+--          embedding::halfvec(768) is half that size, and one over binary_quantize(embedding)
+--          is 1 bit per dimension. retriever.py (VECTOR_STORAGE=halfvec|binary) generates
+--          RERANK_FACTOR * limit candidates on the compact index and re-ranks them by the
+--          exact float32 distance, so the column itself (and the returned scores) stay float32.
+-- Date: 2025-12-17
+--
+-- Requires pgvector >= 0.7.0 (halfvec, binary_quantize). CONCURRENTLY cannot run inside a
+-- transaction block: run with plain `psql -f` (autocommit), not with --single-transaction.
+
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_embedding_halfvec_hnsw
+ON chunks_vector USING hnsw ((embedding::halfvec(768)) halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_embedding_bit_hnsw
+ON chunks_vector USING hnsw ((binary_quantize(embedding)::bit(768)) bit_hamming_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Verify (compare with idx_chunks_embedding_hnsw)
+SELECT indexname, pg_size_pretty(pg_relation_size(indexname::regclass)) AS size
+FROM pg_indexes
+WHERE tablename = 'chunks_vector'
+AND indexdef ILIKE '%embedding%';
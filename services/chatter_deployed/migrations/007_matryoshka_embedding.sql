@@ -0,0 +1,38 @@
+-- Migration: Truncated 256-d embedding column for two-stage (Matryoshka) retrieval
+-- Purpose: text-embedding-004 is trained so that the first dimensions of its output are a
+--          usable embedding on their own. embedding_256 holds the first 256 of the 768
+--          dimensions, renormalized to unit length; its HNSW index is a third of the size of
+--          the full one. With VECTOR_STORAGE=matryoshka, retriever.py generates
+--          RERANK_FACTOR * limit candidates on it and re-ranks them by the full 768-d cosine
+--          distance. The loaders populate both columns for new chunks.
+-- Date: 2025-12-18
+--
+-- Requires pgvector >= 0.7.0 (subvector, l2_normalize). CONCURRENTLY cannot run inside a
+-- transaction block: run with plain `psql -f` (autocommit), not with --single-transaction.
+
+ALTER TABLE chunks_vector ADD COLUMN IF NOT EXISTS embedding_256 vector(256);
+
+-- Backfill existing chunks (new ones are written by the loader)
+UPDATE chunks_vector
+SET embedding_256 = l2_normalize(subvector(embedding, 1, 256))::vector(256)
+WHERE embedding_256 IS NULL
+AND embedding IS NOT NULL;
+
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_embedding_256_hnsw
+ON chunks_vector USING hnsw (embedding_256 vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+ANALYZE chunks_vector;
+
+-- Verify: no chunk left without the small vector, and index sizes
+SELECT count(*) AS missing_embedding_256
+FROM chunks_vector
+WHERE embedding IS NOT NULL
+AND embedding_256 IS NULL;
+
+SELECT indexname, pg_size_pretty(pg_relation_size(indexname::regclass)) AS size
+FROM pg_indexes
+WHERE tablename = 'chunks_vector'
+AND indexdef ILIKE '%embedding%';
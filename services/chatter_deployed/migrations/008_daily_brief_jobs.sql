@@ -0,0 +1,25 @@
+-- Migration: Daily brief jobs
+-- Purpose: POST /api/daily-brief enqueues a background job (brief_jobs.py) and returns its id.
+--          Job rows live here so any chatter replica can answer the status endpoint, and the
+--          partial unique index keeps one queued/running brief per user across replicas.
+-- Date: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS daily_brief_jobs (
+    job_id VARCHAR(64) PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    stage VARCHAR(32),
+    result JSONB,
+    error TEXT,
+    error_status INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Single flight: at most one active job per user
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_brief_jobs_active_user
+    ON daily_brief_jobs (user_id) WHERE status IN ('queued', 'running');
+
+-- Verify
+SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'daily_brief_jobs';
@@ -0,0 +1,32 @@
+-- Migration: Shared daily briefs
+-- Purpose: Users with the same topics + sources share one daily brief transcript per day and
+--          corpus version, and one audio file per voice (shared_briefs.py). Their audio_history
+--          rows reference the shared brief by key instead of copying its text and chunks.
+-- Date: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS shared_briefs (
+    brief_key VARCHAR(64) PRIMARY KEY,  -- SHA-256 of (sorted topics, sorted sources, date, corpus version)
+    topics JSONB NOT NULL,
+    sources JSONB NOT NULL,
+    brief_date DATE NOT NULL,
+    corpus_version BIGINT NOT NULL,
+    podcast_text TEXT NOT NULL,
+    source_chunks JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS shared_brief_audio (
+    brief_key VARCHAR(64) NOT NULL REFERENCES shared_briefs(brief_key) ON DELETE CASCADE,
+    voice VARCHAR(100) NOT NULL,
+    audio_url TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (brief_key, voice)
+);
+
+-- History rows of shared briefs keep podcast_text / source_chunks NULL and point here
+ALTER TABLE audio_history ADD COLUMN IF NOT EXISTS brief_key VARCHAR(64) REFERENCES shared_briefs(brief_key);
+CREATE INDEX IF NOT EXISTS idx_audio_history_brief_key ON audio_history (brief_key) WHERE brief_key IS NOT NULL;
+
+-- Verify
+SELECT table_name FROM information_schema.tables WHERE table_name IN ('shared_briefs', 'shared_brief_audio');
+SELECT column_name FROM information_schema.columns WHERE table_name = 'audio_history' AND column_name = 'brief_key';
@@ -0,0 +1,17 @@
+-- Migration: source_type index on chunks_vector
+-- Purpose: search_articles_by_preferences_async (daily brief, whole-corpus window) ranks the
+--          chunks of a selective source filter exactly (filter strategy "exact", up to
+--          FILTER_EXACT_MAX_ROWS matching rows). This index lets Postgres read just those
+--          rows instead of scanning the whole table for source_type = ANY(...).
+-- Date: 2026-10-17
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_source_type
+ON chunks_vector (source_type);
+
+ANALYZE chunks_vector;
+
+-- Verify
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'chunks_vector'
+AND indexname = 'idx_chunks_source_type';
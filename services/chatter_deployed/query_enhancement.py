@@ -89,6 +89,17 @@ def parse_gemini_response(response_text: str) -> Optional[Dict[str, str]]:
         return None
 
 
+def build_enhancement_prompt(user_query: str) -> str:
+    """Build the enhancement prompt (system prompt + user query)."""
+    system_prompt = load_system_prompt()
+
+    return f"""{system_prompt}
+
+USER QUERY: {user_query}
+
+Please provide your response in the required JSON format."""
+
+
 def enhance_query_with_gemini(
     user_query: str, model: GenerativeModel
 ) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
@@ -106,14 +117,7 @@ def enhance_query_with_gemini(
         return None, "Gemini model not configured"
 
     try:
-        system_prompt = load_system_prompt()
-
-        # Build the prompt
-        prompt = f"""{system_prompt}
-
-USER QUERY: {user_query}
-
-Please provide your response in the required JSON format."""
+        prompt = build_enhancement_prompt(user_query)
 
         # Call Gemini
         response = model.generate_content(prompt)
@@ -130,3 +134,25 @@ Please provide your response in the required JSON format."""
     except Exception as e:
         print(f"[query-enhancement-error] Error calling Gemini: {e}")
         return None, str(e)
+
+
+async def enhance_query_with_gemini_async(
+    user_query: str, model: GenerativeModel
+) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """Async twin of enhance_query_with_gemini (awaits model.generate_content_async)."""
+    if not model:
+        return None, "Gemini model not configured"
+
+    try:
+        prompt = build_enhancement_prompt(user_query)
+        response = await model.generate_content_async(prompt)
+
+        parsed = parse_gemini_response(response.text)
+        if parsed:
+            return parsed, None
+        else:
+            return None, "Failed to parse Gemini response"
+
+    except Exception as e:
+        print(f"[query-enhancement-error] Error calling Gemini: {e}")
+        return None, str(e)
@@ -9,25 +9,37 @@ Changes are marked with "FE" and comments
 
 Steps:
 * get_db_connection
-* embed the query
-* search_articles in the vector database by similarity
+* embed the query (one VertexEmbeddings per process, query embeddings cached in memory)
+* search_articles_async in the vector database by similarity (hybrid mode: + full-text match, RRF)
+* search_articles_multi_async: several sub-queries, one batched embedding call and
+  ONE SQL statement (unnest + LATERAL top-k), per-query and fused rankings
 * return chunks
 
 
 NOTE: for testing use: #VECTOR_TABLE_NAME = "chunks_vector_test"
 """
 
+import hashlib
 import os
-import psycopg
-from pgvector.psycopg import register_vector, Vector
-from psycopg import sql
-from typing import List, Tuple
+import re
+import threading
+from pgvector.psycopg import Vector
+from psycopg import errors, sql
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
 import traceback
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 
 from google import genai
 from google.genai import types
 import logging
 
+from db_pool import connection, async_connection, PREPARE_HOT_QUERIES
+from ttl_cache import TTLCache
+import corpus_version
+from ann_snapshot import get_snapshot
+
 if os.path.exists(".env"):
     from dotenv import load_dotenv
 
@@ -40,16 +52,7 @@ VECTOR_TABLE_NAME = "chunks_vector"
 # VECTOR_TABLE_NAME = "chunks_vector_test"
 
 # Configuration
-# DB_URL = os.environ["DATABASE_URL"]
-# DB_URL = os.environ.get("DATABASE_URL",
-#    "postgresql://postgres:Newsjuice25+@/newsdb?host=/cloudsql/newsjuice-123456:
-#                                                                   us-central1:newsdb-instance")
-DB_URL = os.environ.get(
-    "DATABASE_URL"
-)  # [Z] for any script trying to access our GCP DB, assuming we have to specify the path
-if not DB_URL:
-    # Fallback for Cloud Run
-    DB_URL = "postgresql://postgres:Newsjuice25+@/newsdb?host=/cloudsql/newsjuice-123456:" "us-central1:newsdb-instance"
+# Connections come from the shared pool in db_pool.py (DATABASE_URL is read there)
 
 TIMEOUT = 10.0
 USER_AGENT = "minimal-rag-ingest/0.1"
@@ -70,6 +73,79 @@ EMBEDDING_MODEL = "text-embedding-004"
 EMBEDDING_DIM = 768  # 256
 # ======================================END
 
+# Query embedding cache: daily-brief topic strings and common questions repeat a lot,
+# so we keep their vectors in memory instead of calling Vertex AI every time
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.environ.get("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+
+# Multi-query retrieval: how per-sub-query rankings are fused ("best_score" keeps each
+# chunk's lowest distance; "rrf" is reciprocal-rank fusion) and an optional cap on
+# chunks per article in the fused list (0 = no cap)
+MULTI_QUERY_FUSION = os.environ.get("MULTI_QUERY_FUSION", "best_score")
+MAX_CHUNKS_PER_ARTICLE = int(os.environ.get("MAX_CHUNKS_PER_ARTICLE", "0"))
+RRF_K = 60
+
+# ANN recall/latency knobs, set on the pooled session before every search so they apply
+# to whichever index chunks_vector has (HNSW since migration 002, ivfflat before).
+# Defaults come from benchmarks/bench_ann_recall.py (recall@10 vs exact search).
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "64"))
+# pgvector rejects a larger hnsw.ef_search, so no HNSW scan returns more rows than this
+HNSW_MAX_EF_SEARCH = 1000
+IVFFLAT_PROBES = int(os.environ.get("IVFFLAT_PROBES", "10"))
+ANN_SETTINGS_SQL = (
+    "SELECT set_config('hnsw.ef_search', %s, false), set_config('ivfflat.probes', %s, false)"
+)
+
+# Compact ANN storage (migration 006). "full" searches the float32 HNSW index; "halfvec"
+# generates candidates on an HNSW index over embedding::halfvec (half the size) and
+# "binary" on one over binary_quantize(embedding) (1 bit per dimension); both re-rank the
+# RERANK_FACTOR * limit candidates by the exact float32 distance, so scores are unchanged.
+# Recall vs "full": benchmarks/bench_quantized_recall.py.
+# "matryoshka" (migration 007) is the same two-stage search on the embedding_256 column: the
+# first 256 dimensions of the text-embedding-004 vector, renormalized (the model is trained
+# so that prefixes are usable embeddings). Recall: benchmarks/bench_matryoshka_recall.py.
+VECTOR_STORAGE = os.environ.get("VECTOR_STORAGE", "full")  # "full", "halfvec", "binary" or "matryoshka"
+RERANK_FACTOR = int(os.environ.get("RERANK_FACTOR", "4"))
+MATRYOSHKA_DIM = 256
+MATRYOSHKA_COLUMN = "embedding_256"
+_quantized_available = True  # flipped off if the compact index / column is missing
+
+# Hybrid retrieval: a lexical (full-text, search_tsv column from migration 003) leg runs
+# in the same statement as the ANN leg and the two rankings are fused with RRF. Questions
+# that name someone ("What did Amanda Claybaugh say?") and get lexical hits are answered
+# with NAME_QUERY_LIMIT chunks, which keeps the Gemini prompt small.
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")  # "hybrid" or "vector"
+NAME_QUERY_LIMIT = int(os.environ.get("NAME_QUERY_LIMIT", "5"))
+_hybrid_available = True  # flipped off if search_tsv does not exist yet (migration 003 not run)
+
+# Daily brief recency window: chunks newer than days_back (published_at, else fetched_at).
+# If the window yields fewer than limit chunks it is doubled up to MAX_DAYS_BACK, then the
+# whole corpus is searched. Optional recency decay blends distance with age:
+#   score = (1 - RECENCY_WEIGHT) * distance + RECENCY_WEIGHT * (1 - 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS))
+MAX_DAYS_BACK = int(os.environ.get("MAX_DAYS_BACK", "14"))
+RECENCY_WEIGHT = float(os.environ.get("RECENCY_WEIGHT", "0.2"))
+RECENCY_HALF_LIFE_HOURS = float(os.environ.get("RECENCY_HALF_LIFE_HOURS", "24"))
+
+# Source-filtered ANN (search_articles_by_preferences_async without a recency window). An ANN
+# index scan followed by WHERE source_type = ANY(...) can return fewer than limit rows when
+# the sources are rare, so the strategy is picked from the filter's selectivity:
+#   exact      - few matching rows: read just those (idx_chunks_source_type, migration 010), rank exactly
+#   iterative  - pgvector >= 0.8: iterative index scan keeps going until limit rows match
+#   overfetch  - older pgvector: over-fetch unfiltered ANN candidates, filter, grow the fetch
+# Every strategy ends with an exact scan if it still has fewer than limit rows.
+FILTER_EXACT_MAX_ROWS = int(os.environ.get("FILTER_EXACT_MAX_ROWS", "20000"))
+SOURCE_STATS_TTL_SECONDS = float(os.environ.get("SOURCE_STATS_TTL_SECONDS", "900"))
+ITERATIVE_SCAN_SQL = (
+    "SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true), "
+    "set_config('ivfflat.iterative_scan', 'relaxed_order', true)"
+)
+
+# Retrieval result cache: the corpus only changes when the loader runs, so results are kept
+# per (query-vector hash, filters, limit, corpus version). A loader NOTIFY (corpus_version.py)
+# clears the cache; while the version is unknown nothing is cached.
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_SECONDS", "21600"))
+
 # ====FE 15-11-25 ADDED: embedding model switch
 logger = logging.getLogger(__name__)
 
@@ -105,156 +181,966 @@ class VertexEmbeddings:
     def embed_query(self, text: str) -> List[float]:
         return self._embed_one(text)
 
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async twin of embed_query (native genai aio client, no thread hop)."""
+        resp = await self.client.aio.models.embed_content(
+            model=self.model,
+            contents=[text],
+            config=types.EmbedContentConfig(output_dimensionality=self.dim),
+        )
+        return resp.embeddings[0].values
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several short queries in ONE request (sub-queries are far below the token limit)."""
+        resp = await self.client.aio.models.embed_content(
+            model=self.model,
+            contents=texts,
+            config=types.EmbedContentConfig(output_dimensionality=self.dim),
+        )
+        return [e.values for e in resp.embeddings]
+
 
 # ==========END
 
 
 # model = SentenceTransformer("all-MiniLM-L6-v2") # 384 D
 
+# One embedder (and one genai.Client) per process, created on first use
+_embedder: Optional[VertexEmbeddings] = None
+_embedder_lock = threading.Lock()
+_query_embedding_cache = TTLCache(max_size=EMBEDDING_CACHE_SIZE, ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS)
+_result_cache = TTLCache(max_size=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+corpus_version.on_corpus_change(lambda version: _result_cache.clear())
+
+
+def get_embedder() -> VertexEmbeddings:
+    """Return the process-wide VertexEmbeddings instance (created lazily, thread-safe)."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = VertexEmbeddings()
+    return _embedder
+
+
+def _normalize_query(text: str) -> str:
+    """Normalize query text for cache lookups (collapse whitespace, lowercase)."""
+    return " ".join(text.split()).lower()
+
+
+def _embedding_cache_key(text: str, embedder: VertexEmbeddings) -> Tuple[str, str, int]:
+    return (_normalize_query(text), embedder.model, embedder.dim)
+
+
+async def embed_query_cached_async(text: str) -> List[float]:
+    """
+    Embed a query, reusing the cached vector when the same (normalized) text was seen recently.
+
+    Args:
+        text: The query string
+
+    Returns:
+        The embedding as a list of floats
+    """
+    embedder = get_embedder()
+    key = _embedding_cache_key(text, embedder)
+    cached = _query_embedding_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    values = await embedder.aembed_query(text)
+    _query_embedding_cache.set(key, tuple(values))
+    return list(values)
+
+
+async def embed_queries_cached_async(texts: List[str]) -> List[List[float]]:
+    """
+    Embed several queries, sending all cache misses to Vertex AI in a single batched request.
+
+    Returns the embeddings in the same order as texts.
+    """
+    embedder = get_embedder()
+    keys = [_embedding_cache_key(t, embedder) for t in texts]
+    vectors: Dict[Tuple[str, str, int], List[float]] = {}
+    missing: Dict[Tuple[str, str, int], str] = {}  # one request entry per distinct key
+    for text, key in zip(texts, keys):
+        cached = _query_embedding_cache.get(key)
+        if cached is not None:
+            vectors[key] = list(cached)
+        else:
+            missing.setdefault(key, text)
+
+    if missing:
+        embedded = await embedder.aembed_queries(list(missing.values()))
+        for key, values in zip(missing.keys(), embedded):
+            _query_embedding_cache.set(key, tuple(values))
+            vectors[key] = list(values)
+
+    return [list(vectors[key]) for key in keys]
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the query embedding cache."""
+    return _query_embedding_cache.stats()
+
+
+def retrieval_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the retrieval result cache and the corpus version it is keyed on."""
+    return dict(_result_cache.stats(), corpus_version=corpus_version.current_version())
+
+
+def _vector_hash(values: List[float]) -> str:
+    return hashlib.sha1(array("f", values).tobytes()).hexdigest()
+
+
+def _result_cache_key(kind: str, values: List[float], *parts: Any) -> Optional[tuple]:
+    """Cache key for one search, or None (don't cache) while the corpus version is unknown."""
+    version = corpus_version.current_version()
+    if version is None:
+        return None
+    return (kind, _vector_hash(values), *parts, version)
+
+
+def _cached_results(key: Optional[tuple]) -> Optional[Tuple[List[tuple], Dict[int, str]]]:
+    return _result_cache.get(key) if key is not None else None
+
+
+def _cache_results(key: Optional[tuple], results: List[tuple], article_ids: Dict[int, str]) -> None:
+    if key is not None:
+        ids = {row[0]: article_ids[row[0]] for row in results if row[0] in article_ids}
+        _result_cache.set(key, (results, ids))
+
 
 def get_db_connection():
-    """Get a database connection with vector support."""
-    conn = psycopg.connect(DB_URL, autocommit=True)
-    register_vector(conn)
-    return conn
+    """Borrow a pooled database connection with vector support (use as a context manager)."""
+    return connection()
+
+
+def _ann_settings(limit: int, ef_search: Optional[int] = None, probes: Optional[int] = None) -> Tuple[str, str]:
+    """
+    Parameters for ANN_SETTINGS_SQL.
+
+    HNSW never returns more than ef_search rows per scan, so it is raised to at least limit
+    (capped at HNSW_MAX_EF_SEARCH, the most pgvector accepts).
+    """
+    ef_search = min(max(ef_search or HNSW_EF_SEARCH, limit), HNSW_MAX_EF_SEARCH)
+    return (str(ef_search), str(probes or IVFFLAT_PROBES))
+
+
+def _similarity_sql() -> sql.Composed:
+    """Top-k chunks by cosine distance to one query vector (the per-query baseline in benchmarks/)."""
+    return sql.SQL(
+        """
+        SELECT id, chunk, source_type, embedding <=> %s AS score
+        FROM {}
+        ORDER BY embedding <=> %s
+        LIMIT %s;
+        """
+    ).format(sql.Identifier(VECTOR_TABLE_NAME))
+
+
+def _recent_preferences_sql(recency_decay: bool = False) -> sql.Composed:
+    """
+    Top-k chunks of the user's sources inside a recency window, ranked exactly.
+
+    The window is found through idx_chunks_recency (migration 004) and materialized first,
+    so the cost grows with the number of recent chunks, not with the whole corpus.
+    """
+    if recency_decay:
+        score = sql.SQL(
+            "(1 - %(weight)s) * (embedding <=> %(q)s) + %(weight)s * "
+            "(1 - power(0.5, GREATEST(EXTRACT(EPOCH FROM (%(now)s - ts)), 0) / 3600.0 / %(half_life)s))"
+        )
+    else:
+        score = sql.SQL("embedding <=> %(q)s")
+    return sql.SQL(
+        """
+        WITH recent AS MATERIALIZED (
+            SELECT id, chunk, source_type, embedding, COALESCE(published_at, fetched_at) AS ts
+            FROM {table}
+            WHERE COALESCE(published_at, fetched_at) >= %(cutoff)s
+              AND source_type = ANY(%(sources)s)
+        )
+        SELECT id, chunk, source_type, {score} AS score
+        FROM recent
+        ORDER BY score, id DESC
+        LIMIT %(limit)s;
+        """
+    ).format(table=sql.Identifier(VECTOR_TABLE_NAME), score=score)
+
+
+def _preference_windows(days_back: Optional[int]) -> List[Optional[int]]:
+    """Windows to try in order: days_back, doubled up to MAX_DAYS_BACK, then None (all history)."""
+    if days_back is None:
+        return [None]
+    windows = [days_back]
+    while windows[-1] < MAX_DAYS_BACK:
+        windows.append(min(windows[-1] * 2, MAX_DAYS_BACK))
+    return windows + [None]
+
+
+def _preferences_query(
+    embedding: Vector, sources: List[str], limit: int, days_back: int, recency_decay: bool
+) -> Tuple[sql.Composed, Any]:
+    now = datetime.utcnow()  # published_at / fetched_at are stored as naive UTC
+    params = {
+        "q": embedding,
+        "sources": sources,
+        "limit": limit,
+        "cutoff": now - timedelta(days=days_back),
+        "now": now,
+        "weight": RECENCY_WEIGHT,
+        "half_life": RECENCY_HALF_LIFE_HOURS,
+    }
+    return _recent_preferences_sql(recency_decay), params
+
 
 # [Z] this function should really be called get_chunks; it searches the articles table
 # with the query search string (SQL command) and pulls most relevant chunks
-def search_articles(query: str, limit: int = 10) -> List[Tuple[int, str, str, float]]:
+async def search_articles_async(
+    query: str,
+    limit: int = 10,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    mode: Optional[str] = None,
+) -> List[Tuple[int, str, str, float]]:
     """
-    Search for articles using semantic similarity.
+    Search for articles using semantic similarity (plus full-text matching in hybrid mode).
 
     Args:
         query: The search query string
         limit: Maximum number of results to return (default: 10)
+        ef_search: hnsw.ef_search for this request (default HNSW_EF_SEARCH)
+        probes: ivfflat.probes for this request (default IVFFLAT_PROBES)
+        mode: "hybrid" (vector + lexical, fused with RRF) or "vector" (default RETRIEVAL_MODE)
 
     Returns:
         List of tuples: (id, chunk, source_type, score) for each matching article
     """
     try:
-        # Query embedding
-
-        # ======= FE 15-11-25 Added: for new emnbedding model
-        vertex_embedder = VertexEmbeddings()
-        # ============END
-
-        # ======= FE 15-11-25 Commented out: for new emnbedding model
-        # q = Vector(model.encode(query).tolist())
-        # ==============END
-
-        # ======= FE 15-11-25 Added: for new emnbedding model
-        # q = vertex_embedder.embed_documents(query.tolist())
-        q = Vector(vertex_embedder.embed_query(query))
-        # ========END
-
-        with get_db_connection() as conn, conn.cursor() as cur:
-            # Test database connection
-            cur.execute("SELECT current_database(), version();")
-            db_name, db_version = cur.fetchone()
-            print(f"[retriever] Connected to '{db_name}'")
-
-            # Search for similar chunks
-            select_sql = sql.SQL(
-                """
-                SELECT id, chunk, source_type, embedding <=> %s AS score
-                FROM {}
-                ORDER BY embedding <=> %s
-                LIMIT %s;
-                """
-            ).format(sql.Identifier(VECTOR_TABLE_NAME))
-            cur.execute(select_sql, (q, q, limit))
-
-            results = cur.fetchall()
-            print(f"[retriever] Found {len(results)} results for query: '{query[:50]}...'")
-            return results
+        q = await embed_query_cached_async(query)
+        results = await search_vectors_multi_async(
+            [q], limit=limit, texts=[query] if _use_hybrid(mode) else None, ef_search=ef_search, probes=probes
+        )
+        results = results["per_query"][0]
+        print(f"[retriever] Found {len(results)} results for query: '{query[:50]}...'")
+        return results
 
     except Exception as e:
         print(f"[retriever] Error searching articles: {e}")
-        import traceback
         traceback.print_exc()
         return []
 
 
+def _vector_storage() -> str:
+    return VECTOR_STORAGE if _quantized_available else "full"
+
+
+def _candidates(limit: int) -> int:
+    """Rows fetched from the ANN index per query (more than limit when they are re-ranked)."""
+    return limit if _vector_storage() == "full" else limit * max(RERANK_FACTOR, 1)
+
+
+def _ann_order(q: sql.Composable) -> sql.Composable:
+    """ORDER BY expression matching the ANN index of the configured storage mode."""
+    storage = _vector_storage()
+    dim = sql.Literal(EMBEDDING_DIM)
+    if storage == "halfvec":
+        return sql.SQL("embedding::halfvec({dim}) <=> ({q})::halfvec({dim})").format(dim=dim, q=q)
+    if storage == "binary":
+        return sql.SQL("binary_quantize(embedding)::bit({dim}) <~> binary_quantize({q})").format(dim=dim, q=q)
+    if storage == "matryoshka":
+        return sql.SQL("{column} <=> l2_normalize(subvector(({q})::vector, 1, {small}))::vector({small})").format(
+            column=sql.Identifier(MATRYOSHKA_COLUMN), q=q, small=sql.Literal(MATRYOSHKA_DIM)
+        )
+    return sql.SQL("embedding <=> {q}").format(q=q)
+
+
+def _vector_leg_sql() -> sql.Composed:
+    """LATERAL body: top-k by cosine distance to q.embedding.
+
+    Quantized storage fetches candidates from the compact index first (one extra %s) and
+    re-ranks them by the exact distance.
+    """
+    if _vector_storage() == "full":
+        return sql.SQL(
+            """
+            SELECT id, article_id, chunk, source_type, embedding <=> q.embedding AS score
+            FROM {table}
+            ORDER BY embedding <=> q.embedding
+            LIMIT %s
+            """
+        ).format(table=sql.Identifier(VECTOR_TABLE_NAME))
+    return sql.SQL(
+        """
+        SELECT id, article_id, chunk, source_type, embedding <=> q.embedding AS score
+        FROM (
+            SELECT id, article_id, chunk, source_type, embedding
+            FROM {table}
+            ORDER BY {order}
+            LIMIT %s
+        ) candidates
+        ORDER BY score, id
+        LIMIT %s
+        """
+    ).format(table=sql.Identifier(VECTOR_TABLE_NAME), order=_ann_order(sql.SQL("q.embedding")))
+
+
+def _disable_quantized(error: Exception) -> None:
+    """Fall back to the float32 index for the rest of the process (migration 006/007 or pgvector 0.7 missing)."""
+    global _quantized_available
+    _quantized_available = False
+    print(f"[retriever-warning] {VECTOR_STORAGE} storage unavailable, searching full-precision vectors: {error}")
+
+
+_MISSING_MIGRATION_ERRORS = (errors.UndefinedColumn, errors.UndefinedObject, errors.UndefinedFunction)
+
+
+def _degrade_search(error: Exception, texts: Optional[List[str]]) -> Tuple[bool, Optional[List[str]]]:
+    """Turn off the feature whose migration is missing. Returns (retry, texts for the retry)."""
+    if isinstance(error, errors.UndefinedColumn) and MATRYOSHKA_COLUMN in str(error) and _vector_storage() != "full":
+        _disable_quantized(error)
+        return True, texts
+    if isinstance(error, errors.UndefinedColumn) and texts is not None:
+        _disable_hybrid(error)
+        return True, None
+    if isinstance(error, (errors.UndefinedObject, errors.UndefinedFunction)) and _vector_storage() != "full":
+        _disable_quantized(error)
+        return True, texts
+    return False, texts
+
+
+def _multi_vector_sql() -> sql.Composed:
+    """
+    Top-k chunks for every query vector in ONE statement.
+
+    The vectors arrive as one text[] parameter; unnest ... WITH ORDINALITY numbers them
+    and the LATERAL subquery runs the usual ORDER BY embedding <=> ... LIMIT (index scan)
+    once per vector on the server, so N sub-queries cost one round trip.
+    """
+    return sql.SQL(
+        """
+        WITH q AS (
+            SELECT ord::int AS query_idx, v::vector AS embedding
+            FROM unnest(%s::text[]) WITH ORDINALITY AS t(v, ord)
+        )
+        SELECT q.query_idx, c.id, c.article_id, c.chunk, c.source_type, c.score
+        FROM q
+        CROSS JOIN LATERAL ({vector_leg}) c
+        ORDER BY q.query_idx, c.score, c.id;
+        """
+    ).format(vector_leg=_vector_leg_sql())
+
+
+def _hybrid_multi_sql() -> sql.Composed:
+    """
+    _multi_vector_sql plus a lexical leg, still ONE statement.
+
+    Each query text becomes an OR of its stemmed terms (so a name matches even when the
+    rest of the question does not), the GIN index on search_tsv finds candidate chunks
+    and ts_rank_cd orders them. leg 1 = ANN rows ordered by distance, leg 2 = lexical rows
+    ordered by text rank; both legs report cosine distance as score.
+    """
+    return sql.SQL(
+        """
+        WITH q AS (
+            SELECT ord::int AS query_idx,
+                   v::vector AS embedding,
+                   replace(plainto_tsquery('english', qt)::text, ' & ', ' | ')::tsquery AS tsq
+            FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS t(v, qt, ord)
+        )
+        SELECT q.query_idx, 1 AS leg, c.id, c.article_id, c.chunk, c.source_type, c.score, c.score AS sort_key
+        FROM q
+        CROSS JOIN LATERAL ({vector_leg}) c
+        UNION ALL
+        SELECT q.query_idx, 2 AS leg, l.id, l.article_id, l.chunk, l.source_type, l.score, -l.lex_rank
+        FROM q
+        CROSS JOIN LATERAL (
+            SELECT id, article_id, chunk, source_type, embedding <=> q.embedding AS score,
+                   ts_rank_cd(search_tsv, q.tsq) AS lex_rank
+            FROM {table}
+            WHERE search_tsv @@ q.tsq
+            ORDER BY lex_rank DESC, id
+            LIMIT %s
+        ) l
+        ORDER BY 1, 2, 8, 3;
+        """
+    ).format(table=sql.Identifier(VECTOR_TABLE_NAME), vector_leg=_vector_leg_sql())
+
+
+_NAME_PATTERN = re.compile(r"\b[A-Z][\w'-]+(?:\s+[A-Z][\w'-]+)+")
+_QUESTION_WORDS = {"What", "Who", "Whom", "How", "When", "Where", "Why", "Which", "Did", "Does", "Do", "Is",
+                   "Are", "Was", "Were", "Can", "Could", "Tell", "The"}
+
+
+def is_exact_name_query(query: str) -> bool:
+    """
+    True if the question names someone/something: a quoted phrase or two or more
+    capitalized words in a row ("Amanda Claybaugh", "Kennedy School").
+    """
+    if re.search(r'"[^"]+"', query):
+        return True
+    for match in _NAME_PATTERN.finditer(query):
+        words = [w for w in match.group(0).split() if w not in _QUESTION_WORDS]
+        if len(words) >= 2:
+            return True
+    return False
+
+
+def _use_hybrid(mode: Optional[str]) -> bool:
+    return (mode or RETRIEVAL_MODE) == "hybrid" and _hybrid_available
+
+
+def _disable_hybrid(error: Exception) -> None:
+    """Fall back to vector-only search for the rest of the process (migration 003 missing)."""
+    global _hybrid_available
+    _hybrid_available = False
+    print(f"[retriever-warning] Hybrid search unavailable, using vector search only: {error}")
+
+
+def _multi_params(vectors: List[List[float]], texts: Optional[List[str]], limit: int) -> tuple:
+    literals = [_vector_literal(v) for v in vectors]
+    vector_leg = (limit,) if _vector_storage() == "full" else (_candidates(limit), limit)
+    if texts is None:
+        return (literals, *vector_leg)
+    return (literals, list(texts), *vector_leg, limit)
+
+
+def _split_rows(
+    rows: List[tuple], n_queries: int, texts: Optional[List[str]], limit: int
+) -> Tuple[List[List[Tuple[int, str, str, float]]], Dict[int, str]]:
+    """
+    Turn the rows of _multi_vector_sql / _hybrid_multi_sql into one ranked list per query.
+
+    In hybrid mode the two legs of each query are fused with RRF, and a name question with
+    lexical hits is cut to NAME_QUERY_LIMIT rows.
+    """
+    legs: List[Dict[int, List[Tuple[int, str, str, float]]]] = [{1: [], 2: []} for _ in range(n_queries)]
+    article_ids: Dict[int, str] = {}
+    for row in rows:
+        if texts is None:
+            query_idx, chunk_id, article_id, chunk, source_type, score = row
+            leg = 1
+        else:
+            query_idx, leg, chunk_id, article_id, chunk, source_type, score, _ = row
+        legs[query_idx - 1][leg].append((chunk_id, chunk, source_type, score))
+        article_ids[chunk_id] = article_id
+
+    per_query = []
+    for i, query_legs in enumerate(legs):
+        if texts is None:
+            per_query.append(query_legs[1])
+            continue
+        query_limit = limit
+        if query_legs[2] and is_exact_name_query(texts[i]):
+            query_limit = min(limit, NAME_QUERY_LIMIT)
+        per_query.append(reciprocal_rank_fusion([query_legs[1], query_legs[2]])[:query_limit])
+    return per_query, article_ids
+
+
+async def _execute_multi_async(
+    cur, vectors: List[List[float]], texts: Optional[List[str]], limit: int, ef_search=None, probes=None
+) -> List[tuple]:
+    """Run the ANN settings and the (hybrid) multi-vector statement pipelined on an async cursor."""
+    async with cur.connection.pipeline():
+        await cur.execute(
+            ANN_SETTINGS_SQL, _ann_settings(_candidates(limit), ef_search, probes), prepare=PREPARE_HOT_QUERIES
+        )
+        query = _hybrid_multi_sql() if texts is not None else _multi_vector_sql()
+        await cur.execute(query, _multi_params(vectors, texts, limit), prepare=PREPARE_HOT_QUERIES)
+        return await cur.fetchall()
+
+
+def _snapshot_rows(vectors: List[List[float]], texts: Optional[List[str]], limit: int) -> Optional[List[tuple]]:
+    """Vector-only searches run on the in-process snapshot when it is current (None = use Postgres).
+
+    Same rows as _multi_vector_sql, but exact instead of ANN. Hybrid searches need the
+    full-text leg and always go to Postgres.
+    """
+    snapshot = get_snapshot() if texts is None else None
+    if snapshot is None:
+        return None
+    return snapshot.multi_rows(vectors, limit)
+
+
+def _preferences_from_snapshot(
+    snapshot, values: List[float], sources: List[str], limit: int, days_back: Optional[int], recency_decay: bool
+) -> List[Tuple[int, str, str, float]]:
+    """search_articles_by_preferences_async on the snapshot: same windows, widening and scores."""
+    results = []
+    now = datetime.utcnow()
+    for window in _preference_windows(days_back):
+        if window is None:
+            return snapshot.search(values, limit, sources=sources)
+        weight = RECENCY_WEIGHT if recency_decay else None
+        results = snapshot.search(
+            values,
+            limit,
+            sources=sources,
+            since=now - timedelta(days=window),
+            now=now,
+            recency_weight=weight,
+            half_life_hours=RECENCY_HALF_LIFE_HOURS,
+        )
+        if len(results) >= limit:
+            break
+        print(f"[retriever] Only {len(results)} chunks in the last {window} days, widening the window")
+    return results
+
+
+def _vector_literal(values: List[float]) -> str:
+    """pgvector text form '[x,y,...]' (lets a whole batch travel as one text[] parameter)."""
+    return "[" + ",".join(repr(float(v)) for v in values) + "]"
+
+
+def merge_results_by_chunk_id(
+    result_lists: List[List[Tuple[int, str, str, float]]],
+) -> List[Tuple[int, str, str, float]]:
+    """
+    Merge several result lists into one, one row per chunk id.
+
+    When a chunk was found by more than one sub-query the row with the best (lowest
+    cosine distance) score is kept. The output is sorted by (score, id), so it does not
+    depend on which search finished first.
+    """
+    best: Dict[int, Tuple[int, str, str, float]] = {}
+    for results in result_lists:
+        for row in results:
+            current = best.get(row[0])
+            if current is None or row[3] < current[3]:
+                best[row[0]] = row
+    return sorted(best.values(), key=lambda row: (row[3], row[0]))
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Tuple[int, str, str, float]]],
+    k: int = RRF_K,
+) -> List[Tuple[int, str, str, float]]:
+    """
+    Fuse several rankings with reciprocal-rank fusion: sum over lists of 1 / (k + rank).
+
+    Chunks found by several sub-queries rise to the top even if no single query ranked
+    them first. The returned tuples keep their best cosine distance as score; ties are
+    broken by that score and then by id, so the order is deterministic.
+    """
+    fused: Dict[int, float] = {}
+    for results in result_lists:
+        for rank, row in enumerate(results, 1):
+            fused[row[0]] = fused.get(row[0], 0.0) + 1.0 / (k + rank)
+    best = {row[0]: row for row in merge_results_by_chunk_id(result_lists)}
+    return sorted(best.values(), key=lambda row: (-fused[row[0]], row[3], row[0]))
+
+
+def cap_per_article(
+    rows: List[Tuple[int, str, str, float]],
+    article_ids: Dict[int, str],
+    max_per_article: Optional[int],
+) -> List[Tuple[int, str, str, float]]:
+    """Keep at most max_per_article chunks of any one article (rows stay in order)."""
+    if not max_per_article:
+        return rows
+    counts: Dict[str, int] = {}
+    kept = []
+    for row in rows:
+        article = article_ids.get(row[0], row[0])
+        if counts.get(article, 0) < max_per_article:
+            counts[article] = counts.get(article, 0) + 1
+            kept.append(row)
+    return kept
+
+
+def _fuse(
+    per_query: List[List[Tuple[int, str, str, float]]],
+    article_ids: Dict[int, str],
+    fusion: str,
+    limit: Optional[int],
+    max_per_article: Optional[int],
+) -> List[Tuple[int, str, str, float]]:
+    if fusion == "rrf":
+        fused = reciprocal_rank_fusion(per_query)
+    elif fusion == "best_score":
+        fused = merge_results_by_chunk_id(per_query)
+    else:
+        raise ValueError(f"Unknown fusion method: {fusion}")
+    fused = cap_per_article(fused, article_ids, max_per_article)
+    return fused[:limit] if limit else fused
+
+
+async def search_vectors_multi_async(
+    vectors: List[List[float]],
+    limit: int = 10,
+    fusion: str = "rrf",
+    fused_limit: Optional[int] = None,
+    max_per_article: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    texts: Optional[List[str]] = None,
+) -> Dict[str, List]:
+    """
+    Top-k search for several query vectors in a single SQL round trip.
+
+    Args:
+        vectors: Query embeddings
+        limit: Results per query vector
+        fusion: "rrf" (reciprocal-rank fusion) or "best_score" (lowest distance per chunk)
+        fused_limit: Length of the fused list (default: no limit)
+        max_per_article: Keep at most this many chunks of one article in the fused list
+        ef_search / probes: ANN knobs for this request (defaults HNSW_EF_SEARCH / IVFFLAT_PROBES)
+        texts: The query strings; when given, each query also gets a lexical leg (hybrid mode)
+
+    Returns:
+        {"per_query": one (id, chunk, source_type, score) list per vector, in input order,
+         "fused": the fused list in the same tuple format}
+    """
+    per_query: List[List[Tuple[int, str, str, float]]] = [[] for _ in vectors]
+    article_ids: Dict[int, str] = {}
+
+    # Serve what we can from the result cache; only the misses go to Postgres
+    keys = [
+        _result_cache_key("multi", v, texts[i] if texts else None, limit, ef_search, probes)
+        for i, v in enumerate(vectors)
+    ]
+    misses = []
+    for i, key in enumerate(keys):
+        cached = _cached_results(key)
+        if cached is None:
+            misses.append(i)
+        else:
+            per_query[i] = cached[0]
+            article_ids.update(cached[1])
+
+    if misses:
+        miss_vectors = [vectors[i] for i in misses]
+        miss_texts = [texts[i] for i in misses] if texts else None
+        rows = _snapshot_rows(miss_vectors, miss_texts, limit)
+        if rows is None:
+            try:
+                async with async_connection() as conn, conn.cursor() as cur:
+                    rows = await _execute_multi_async(cur, miss_vectors, miss_texts, limit, ef_search, probes)
+            except _MISSING_MIGRATION_ERRORS as e:
+                retry, miss_texts = _degrade_search(e, miss_texts)
+                if not retry:
+                    raise
+                async with async_connection() as conn, conn.cursor() as cur:
+                    rows = await _execute_multi_async(cur, miss_vectors, miss_texts, limit, ef_search, probes)
+        miss_results, miss_ids = _split_rows(rows, len(misses), miss_texts, limit)
+        article_ids.update(miss_ids)
+        for i, results in zip(misses, miss_results):
+            per_query[i] = results
+            _cache_results(keys[i], results, miss_ids)
+
+    return {
+        "per_query": per_query,
+        "fused": _fuse(per_query, article_ids, fusion, fused_limit, max_per_article),
+    }
+
+
+async def search_articles_multi_async(
+    queries: List[str],
+    limit: int = 10,
+    fusion: str = MULTI_QUERY_FUSION,
+    max_per_article: Optional[int] = MAX_CHUNKS_PER_ARTICLE,
+    mode: Optional[str] = None,
+) -> Dict[str, List]:
+    """
+    Search for several sub-queries at once.
+
+    All uncached queries are embedded in one Vertex AI request, then every sub-query is
+    searched in one SQL statement (search_vectors_multi_async).
+
+    Args:
+        queries: The sub-query strings
+        limit: Maximum number of results per sub-query
+        fusion: How per-query rankings are combined ("best_score" or "rrf")
+        max_per_article: Per-article cap on the fused list (None/0 = no cap)
+        mode: "hybrid" or "vector" (default RETRIEVAL_MODE)
+
+    Returns:
+        {"per_query": [...], "fused": [...]}; empty lists if embedding or search failed
+    """
+    empty = {"per_query": [[] for _ in queries], "fused": []}
+    if not queries:
+        return empty
+    try:
+        embeddings = await embed_queries_cached_async(queries)
+        results = await search_vectors_multi_async(
+            embeddings,
+            limit=limit,
+            fusion=fusion,
+            max_per_article=max_per_article,
+            texts=queries if _use_hybrid(mode) else None,
+        )
+    except Exception as e:
+        print(f"[retriever] Error searching sub-queries: {e}")
+        traceback.print_exc()
+        return empty
+
+    for query, rows in zip(queries, results["per_query"]):
+        print(f"[retriever] Found {len(rows)} results for query: '{query[:50]}...'")
+    return results
+
+
 # Retriever service is designed to be called by other services
-# Use search_articles(query, limit) function directly
+# Use search_articles_async(query, limit) directly (or search_articles_multi_async for several queries)
 # No standalone mode - only function-based API
 
-def search_articles_by_preferences(
-        topics: List[str],
-        sources: List[str],
-        limit: int = 30,
-        days_back: int = 2 #only search recent articles for the daily briefing
-) -> List[Tuple[int, str, str, float]]: #returns the id of the chunk, the actual chunk, the source, similarity score
+# ---------- Source-filtered ANN ----------
+
+_source_stats_cache = TTLCache(max_size=4, ttl_seconds=SOURCE_STATS_TTL_SECONDS)
+SOURCE_COUNTS_SQL = sql.SQL("SELECT source_type, count(*) FROM {} GROUP BY source_type").format(
+    sql.Identifier(VECTOR_TABLE_NAME)
+)
+PGVECTOR_VERSION_SQL = "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+
+
+def _filtered_exact_sql() -> sql.Composed:
+    """Exact top-k over only the rows of the requested sources (found through idx_chunks_source_type)."""
+    return sql.SQL(
+        """
+        WITH f AS MATERIALIZED (
+            SELECT id, chunk, source_type, embedding
+            FROM {table}
+            WHERE source_type = ANY(%(sources)s)
+        )
+        SELECT id, chunk, source_type, embedding <=> %(q)s AS score
+        FROM f
+        ORDER BY score, id DESC
+        LIMIT %(limit)s;
+        """
+    ).format(table=sql.Identifier(VECTOR_TABLE_NAME))
+
+
+def _filtered_ann_sql() -> sql.Composed:
+    """Filtered ANN scan (used with iterative scans; relaxed order is re-sorted outside)."""
+    return sql.SQL(
+        """
+        WITH c AS MATERIALIZED (
+            SELECT id, chunk, source_type, embedding <=> %(q)s AS score
+            FROM {table}
+            WHERE source_type = ANY(%(sources)s)
+            ORDER BY {order}
+            LIMIT %(candidates)s
+        )
+        SELECT * FROM c ORDER BY score, id DESC
+        LIMIT %(limit)s;
+        """
+    ).format(table=sql.Identifier(VECTOR_TABLE_NAME), order=_ann_order(sql.SQL("%(q)s")))
+
+
+def _overfetch_sql() -> sql.Composed:
+    """Unfiltered ANN top-fetch candidates, then the source filter."""
+    return sql.SQL(
+        """
+        WITH c AS MATERIALIZED (
+            SELECT id, chunk, source_type, embedding <=> %(q)s AS score
+            FROM {table}
+            ORDER BY {order}
+            LIMIT %(fetch)s
+        )
+        SELECT * FROM c
+        WHERE source_type = ANY(%(sources)s)
+        ORDER BY score, id DESC
+        LIMIT %(limit)s;
+        """
+    ).format(table=sql.Identifier(VECTOR_TABLE_NAME), order=_ann_order(sql.SQL("%(q)s")))
+
+
+def _supports_iterative_scan(version: Optional[str]) -> bool:
+    """Iterative index scans arrived in pgvector 0.8.0."""
+    try:
+        major, minor = (int(part) for part in (version or "0.0").split(".")[:2])
+    except ValueError:
+        return False
+    return (major, minor) >= (0, 8)
+
+
+def choose_filter_strategy(
+    sources: List[str], source_counts: Dict[str, int], iterative_supported: bool
+) -> Tuple[str, int, int]:
+    """
+    Pick exact / iterative / overfetch for a source filter.
+
+    Returns:
+        (strategy, rows matching the filter, total rows)
+    """
+    total = sum(source_counts.values())
+    matching = sum(source_counts.get(source, 0) for source in set(sources))
+    if matching <= FILTER_EXACT_MAX_ROWS:
+        return "exact", matching, total
+    if iterative_supported:
+        return "iterative", matching, total
+    return "overfetch", matching, total
+
+
+def _filtered_steps(
+    embedding: Vector, sources: List[str], limit: int, strategy: str, matching: int, total: int
+):
+    """
+    Generator of query steps for one filtered search.
+
+    Yields (statements, transaction_local) where statements is a list of (sql, params) run
+    pipelined; receives the rows of the last statement and stops once it has enough rows.
+    """
+    params = {"q": embedding, "sources": sources, "limit": limit, "candidates": _candidates(limit)}
+    needed = min(limit, matching) if matching else limit
+
+    if strategy == "iterative":
+        # transaction-local settings so the pooled session goes back without iterative scans
+        rows = yield (
+            [
+                (ITERATIVE_SCAN_SQL, ()),
+                (ANN_SETTINGS_SQL, _ann_settings(_candidates(limit))),
+                (_filtered_ann_sql(), params),
+            ],
+            True,
+        )
+        if len(rows) >= needed:
+            return
+        print(f"[retriever] Iterative scan returned {len(rows)}/{needed} rows, falling back to exact")
+
+    if strategy == "overfetch":
+        # expected candidates needed = limit * total / matching; start at twice that. HNSW
+        # returns at most HNSW_MAX_EF_SEARCH candidates, so the fetch stops growing there and
+        # the exact scan takes over if that was still not enough.
+        fetch = min(max(limit * 2, int(limit * 2 * total / max(matching, 1))), HNSW_MAX_EF_SEARCH)
+        while fetch < total:
+            rows = yield (
+                [(ANN_SETTINGS_SQL, _ann_settings(fetch)), (_overfetch_sql(), dict(params, fetch=fetch))],
+                False,
+            )
+            if len(rows) >= needed:
+                return
+            if fetch >= HNSW_MAX_EF_SEARCH:
+                print(f"[retriever] Over-fetch at the ef_search cap gave {len(rows)}/{needed} rows, using exact")
+                break
+            print(f"[retriever] Over-fetch of {fetch} gave {len(rows)}/{needed} rows, widening")
+            fetch = min(fetch * 4, HNSW_MAX_EF_SEARCH)
+
+    yield [(_filtered_exact_sql(), params)], False
+
+
+async def _source_counts_async(cursor) -> Tuple[Dict[str, int], bool]:
+    """Row count per source_type and iterative-scan support (cached for SOURCE_STATS_TTL_SECONDS)."""
+    cached = _source_stats_cache.get("stats")
+    if cached is None:
+        await cursor.execute(SOURCE_COUNTS_SQL)
+        counts = {source: count for source, count in await cursor.fetchall()}
+        await cursor.execute(PGVECTOR_VERSION_SQL)
+        version = await cursor.fetchone()
+        cached = (counts, _supports_iterative_scan(version[0] if version else None))
+        _source_stats_cache.set("stats", cached)
+    return cached
+
+
+async def _filtered_search_async(conn, cursor, embedding, sources, limit, strategy=None) -> List[tuple]:
+    """Run a source-filtered top-k with the strategy chosen from the filter's selectivity."""
+    counts, iterative_supported = await _source_counts_async(cursor)
+    chosen, matching, total = choose_filter_strategy(sources, counts, iterative_supported)
+    strategy = strategy or chosen
+    print(f"[retriever] Filtered search: {strategy} ({matching} of {total} rows match the sources)")
+
+    steps = _filtered_steps(embedding, sources, limit, strategy, matching, total)
+    rows: List[tuple] = []
+    step = next(steps)
+    while True:
+        statements, local = step
+        async with conn.transaction() if local else nullcontext():
+            async with conn.pipeline():
+                for query, params in statements:
+                    await cursor.execute(query, params, prepare=PREPARE_HOT_QUERIES)
+                rows = await cursor.fetchall()
+        try:
+            step = steps.send(rows)
+        except StopIteration:
+            return rows
+
+
+async def search_articles_by_preferences_async(
+    topics: List[str],
+    sources: List[str],
+    limit: int = 30,
+    days_back: Optional[int] = 2,
+    recency_decay: bool = False,
+    filter_strategy: Optional[str] = None,
+) -> List[Tuple[int, str, str, float]]:
     """
     Retrieve recent articles matching user preferences.
-    
+
     Args:
         topics: List of topic keywords to search for (e.g., ["Politics", "Technology"])
         sources: List of source_type values to filter by (e.g., ["Harvard Gazette"])
         limit: Max number of chunks to return
-        days_back: How many days back to search for recent articles
-        
-    Returns: 
+        days_back: How many days back to search for recent articles (None = whole corpus).
+            The window is widened (doubling, up to MAX_DAYS_BACK, then unbounded) while
+            fewer than limit chunks come back.
+        recency_decay: Rank by distance blended with age instead of distance alone
+        filter_strategy: Force "exact" / "iterative" / "overfetch" for the whole-corpus
+            search (default: chosen from the filter's selectivity)
+
+    Returns:
         List of tuples: (id, chunk, source_type, score)
     """
     try:
-        #create broad query from topics for semantic rankoing
-        topic_query = " ".join(topics) #ex is "politics technology health"
+        topic_query = " ".join(topics)
         print(f"[retriever] Generating embedding for topics: {topic_query}")
+        values = await embed_query_cached_async(topic_query)
+        embedding = Vector(values)
+
+        key = _result_cache_key(
+            "prefs", values, tuple(sorted(sources)), limit, days_back, recency_decay, filter_strategy
+        )
+        cached = _cached_results(key)
+        if cached is not None:
+            print(f"[retriever] Cache hit: {len(cached[0])} chunks matching preferences")
+            return cached[0]
 
-        #generate embedding for topic query
-        vertex_embedder = VertexEmbeddings()
-        embedding = Vector(vertex_embedder.embed_query(topic_query))
-
-        #connect to chunks_vector db
-        conn = psycopg.connect(DB_URL, autocommit=True)
-        register_vector(conn)
-        cursor = conn.cursor()
-
-        #SQL query the DB w/ category filtering + semantic rankong
-        '''select_sql = sql.SQL("""
-                             SELECT id, chunk, source_type, embedding <=> %s AS score
-                             FROM {table}
-                             WHERE source_type = ANY(%s)
-                               AND summary->>'' = ANY(%s)
-                             ORDER BY
-                                embedding <=> %s,
-                                id DESC
-                             LIMIT %s;
-                            """).format(table=sql.Identifier(VECTOR_TABLE_NAME))
-        print(f"[retriever] Filtering by sources: {sources}")
-        print(f"[retriever] Filtering by categories: {topics}")
-        print(f"[retriever] Limiting to {limit} chunks")'''
-
-        ########test with no category filtering#########
-        select_sql = sql.SQL("""
-                             SELECT id, chunk, source_type, embedding <=> %s AS score
-                             FROM {table}
-                             WHERE source_type = ANY(%s)
-                             ORDER BY
-                                embedding <=> %s,
-                                id DESC
-                             LIMIT %s;
-                            """).format(table=sql.Identifier(VECTOR_TABLE_NAME))
         print(f"[retriever] Filtering by sources: {sources}")
-        print(f"[retriever] Filtering by categories: {topics}")
         print(f"[retriever] Limiting to {limit} chunks")
 
-        # Execute query
-        cursor.execute(select_sql, (embedding, sources, embedding, limit))
-        results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            results = _preferences_from_snapshot(snapshot, values, sources, limit, days_back, recency_decay)
+            print(f"[retriever] Found {len(results)} chunks matching preferences (snapshot v{snapshot.version})")
+            _cache_results(key, results, {})
+            return results
+
+        results = []
+        async with async_connection() as conn, conn.cursor() as cursor:
+            for window in _preference_windows(days_back):
+                if window is None:
+                    results = await _filtered_search_async(conn, cursor, embedding, sources, limit, filter_strategy)
+                    break
+                query, params = _preferences_query(embedding, sources, limit, window, recency_decay)
+                async with conn.pipeline():
+                    await cursor.execute(ANN_SETTINGS_SQL, _ann_settings(limit), prepare=PREPARE_HOT_QUERIES)
+                    await cursor.execute(query, params, prepare=PREPARE_HOT_QUERIES)
+                    results = await cursor.fetchall()
+                if len(results) >= limit:
+                    break
+                print(f"[retriever] Only {len(results)} chunks in the last {window} days, widening the window")
+
         print(f"[retriever] Found {len(results)} chunks matching preferences")
-        
-        # Return as list of tuples: (id, chunk, source_type, score)
+        _cache_results(key, results, {})
         return results
-        
+
     except Exception as e:
         print(f"[retriever-error] Failed to search by preferences: {e}")
         traceback.print_exc()
         return []
-        
-    
\ No newline at end of file
+
+
+# ====== Chunk metadata for the context packer (context_packer.py) ======
+CHUNK_METADATA_SQL = sql.SQL("SELECT id, article_id, embedding FROM {} WHERE id = ANY(%s)").format(
+    sql.Identifier(VECTOR_TABLE_NAME)
+)
+
+
+async def chunk_metadata_async(chunk_ids: List[int]) -> Dict[int, Tuple[str, Any]]:
+    """Map chunk id -> (article_id, embedding) for chunks already retrieved ({} on failure)."""
+    try:
+        async with async_connection() as conn, conn.cursor() as cur:
+            await cur.execute(CHUNK_METADATA_SQL, (list(chunk_ids),), prepare=PREPARE_HOT_QUERIES)
+            return {row[0]: (row[1], row[2]) for row in await cur.fetchall()}
+    except Exception as e:
+        print(f"[retriever-error] Failed to load chunk metadata: {e}")
+        return {}
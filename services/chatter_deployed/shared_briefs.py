@@ -0,0 +1,255 @@
+"""
+Daily briefs shared by users with the same preferences (used by main.py _generate_daily_brief)
+
+A brief is fully determined by the user's topics and sources, the day and the corpus it was
+retrieved from; only the audio also depends on the voice. Many users pick the same
+combination, so instead of running retrieval, Gemini and TTS once per user:
+
+- shared_briefs (migration 009) holds one transcript + source chunks per brief key, the
+  SHA-256 of (sorted topics, sorted sources, date, corpus version)
+- shared_brief_audio holds one uploaded audio file per (brief key, voice)
+- each user's audio_history row references the brief (audio_history.brief_key) and the
+  shared audio URL instead of a copy of the text and chunks
+
+Generation cost scales with the number of distinct preference sets (and voices), not users.
+Within a worker a key is generated once even when several users ask at the same time (the
+others wait for it); across replicas the first row written wins (ON CONFLICT DO NOTHING)
+and everybody uses that one.
+
+Sharing is off (each user gets their own brief, as before) when SHARED_BRIEFS_ENABLED is
+false, while the corpus version is unknown, or when the tables are missing.
+
+FUNCTIONS CONTAINED:
+
+canonical_preferences(values) -> List[str]
+    Deduplicated, sorted preference values (the order the brief is retrieved and keyed in)
+
+brief_spec(topics, sources) -> Optional[Dict]
+    What a shared brief is keyed on, or None when sharing is off
+
+brief_key(spec) -> str
+    SHA-256 of the canonical JSON of a spec
+
+async get_or_create_transcript(spec, build) -> Dict
+    The shared transcript for spec, building and storing it on a miss
+
+async get_or_create_audio(key, voice, build) -> str
+    The shared audio URL for (key, voice), building and storing it on a miss
+
+shared_brief_stats() -> Dict
+    Hit/build counters (for /metrics)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import psycopg
+
+import corpus_version
+from db_pool import async_connection
+
+SHARED_BRIEFS_ENABLED = os.environ.get("SHARED_BRIEFS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Bump to stop sharing briefs generated by an older prompt / pipeline
+BRIEF_KEY_VERSION = 1
+
+GET_SHARED_BRIEF_SQL = "SELECT podcast_text, source_chunks FROM shared_briefs WHERE brief_key = %s"
+INSERT_SHARED_BRIEF_SQL = """INSERT INTO shared_briefs (brief_key, topics, sources, brief_date, corpus_version,
+                       podcast_text, source_chunks)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s)
+                       ON CONFLICT (brief_key) DO NOTHING"""
+GET_SHARED_AUDIO_SQL = "SELECT audio_url FROM shared_brief_audio WHERE brief_key = %s AND voice = %s"
+INSERT_SHARED_AUDIO_SQL = """INSERT INTO shared_brief_audio (brief_key, voice, audio_url)
+                       VALUES (%s, %s, %s)
+                       ON CONFLICT (brief_key, voice) DO NOTHING"""
+
+_available = True
+_inflight: Dict[str, asyncio.Future] = {}
+_stats = {"transcript_hits": 0, "transcript_builds": 0, "audio_hits": 0, "audio_builds": 0, "waited": 0}
+
+
+def canonical_preferences(values: Iterable[Any]) -> List[str]:
+    """Deduplicated, sorted, stripped values; users who picked the same set in any order match."""
+    return sorted({str(value).strip() for value in values or [] if str(value).strip()})
+
+
+def brief_spec(
+    topics: Iterable[Any],
+    sources: Iterable[Any],
+    brief_date: Optional[date] = None,
+    version: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """What a shared brief is keyed on, or None when sharing is off (disabled, tables missing, corpus unknown)."""
+    if not SHARED_BRIEFS_ENABLED or not _available:
+        return None
+    if version is None:
+        version = corpus_version.current_version()
+        if version is None:
+            return None
+    return {
+        "topics": canonical_preferences(topics),
+        "sources": canonical_preferences(sources),
+        "date": (brief_date or datetime.now(timezone.utc).date()).isoformat(),
+        "corpus_version": version,
+    }
+
+
+def brief_key(spec: Dict[str, Any]) -> str:
+    """SHA-256 of the canonical JSON of a spec (and BRIEF_KEY_VERSION)."""
+    payload = json.dumps({"v": BRIEF_KEY_VERSION, **spec}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _disable(e: Exception) -> None:
+    global _available
+    print(f"[shared-briefs-warning] shared_briefs tables missing (migration 009), generating per user: {e}")
+    _available = False
+
+
+async def _fetch(sql: str, params: tuple) -> Optional[tuple]:
+    """One row, or None (also on errors, which are logged; a missing table turns sharing off)."""
+    try:
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, params)
+                return await cur.fetchone()
+    except psycopg.errors.UndefinedTable as e:
+        _disable(e)
+    except Exception as e:
+        print(f"[shared-briefs-error] Read failed: {e}")
+    return None
+
+
+async def _insert(sql: str, params: tuple) -> bool:
+    try:
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, params)
+                return True
+    except psycopg.errors.UndefinedTable as e:
+        _disable(e)
+    except Exception as e:
+        print(f"[shared-briefs-error] Write failed: {e}")
+    return False
+
+
+async def _single_flight(
+    key: str,
+    load: Callable[[], Awaitable[Optional[Any]]],
+    build_and_store: Callable[[], Awaitable[Any]],
+    kind: str,
+) -> Any:
+    """Stored value for key, or build it once per worker while concurrent callers wait for it."""
+    while True:
+        stored = await load()
+        if stored is not None:
+            _stats[f"{kind}_hits"] += 1
+            return stored
+        future = _inflight.get(key)
+        if future is None:
+            break
+        _stats["waited"] += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise  # this caller was cancelled
+            # the caller building it was cancelled: look again and build it here
+
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())  # waiters may be gone
+    _inflight[key] = future
+    try:
+        value = await build_and_store()
+        _stats[f"{kind}_builds"] += 1
+        future.set_result(value)
+        return value
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)  # same failure for everyone waiting (e.g. no articles found)
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+async def get_or_create_transcript(
+    spec: Optional[Dict[str, Any]],
+    build: Callable[[], Awaitable[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    """
+    The shared transcript for spec, building and storing it on a miss.
+
+    Args:
+        spec: From brief_spec(); None builds a private transcript
+        build: async build() -> {"podcast_text", "source_chunks"} (source_chunks a JSON string)
+
+    Returns:
+        {"brief_key", "podcast_text", "source_chunks"}; brief_key is None if the transcript
+        is not shared (sharing off, or it could not be stored)
+    """
+    if spec is None:
+        return {**await build(), "brief_key": None}
+    key = brief_key(spec)
+
+    async def load() -> Optional[Dict[str, Any]]:
+        row = await _fetch(GET_SHARED_BRIEF_SQL, (key,))
+        if row is None:
+            return None
+        source_chunks = row[1] if row[1] is None or isinstance(row[1], str) else json.dumps(row[1])
+        return {"brief_key": key, "podcast_text": row[0], "source_chunks": source_chunks}
+
+    async def build_and_store() -> Dict[str, Any]:
+        built = await build()
+        params = (
+            key,
+            json.dumps(spec["topics"]),
+            json.dumps(spec["sources"]),
+            spec["date"],
+            spec["corpus_version"],
+            built["podcast_text"],
+            built["source_chunks"],
+        )
+        if not await _insert(INSERT_SHARED_BRIEF_SQL, params):
+            return {**built, "brief_key": None}
+        print(f"[shared-briefs] Stored brief {key[:12]} for topics={spec['topics']} sources={spec['sources']}")
+        return await load() or {**built, "brief_key": key}  # another replica's row if it won the race
+
+    return await _single_flight(key, load, build_and_store, "transcript")
+
+
+async def get_or_create_audio(
+    key: Optional[str],
+    voice: str,
+    build: Callable[[], Awaitable[str]],
+) -> str:
+    """
+    The shared audio URL of brief `key` in `voice`, building and storing it on a miss.
+
+    Args:
+        key: brief_key of a shared transcript; None builds private audio
+        build: async build() -> audio URL (synthesize + upload)
+    """
+    if key is None:
+        return await build()
+
+    async def load() -> Optional[str]:
+        row = await _fetch(GET_SHARED_AUDIO_SQL, (key, voice))
+        return row[0] if row else None
+
+    async def build_and_store() -> str:
+        audio_url = await build()
+        if await _insert(INSERT_SHARED_AUDIO_SQL, (key, voice, audio_url)):
+            return await load() or audio_url
+        return audio_url
+
+    return await _single_flight(f"{key}:{voice}", load, build_and_store, "audio")
+
+
+def shared_brief_stats() -> Dict[str, Any]:
+    """Return hit/build counters as a plain dict (for /metrics and logs)."""
+    return {"enabled": SHARED_BRIEFS_ENABLED and _available, "in_flight": len(_inflight), **_stats}
@@ -1,32 +1,162 @@
 """Speech-to-Text client for converting audio bytes to text.
 
+Every question is transcribed with exactly one recognize() round trip. The capture format
+(encoding, sample rate, channels) comes from, in order:
+1. the websocket protocol: {"type": "audio_format", "encoding": "LINEAR16", "sample_rate": 48000,
+   "channels": 1} sent before the audio (or the same keys on the "complete" message)
+2. a container header in the audio itself (WAV, FLAC, Ogg Opus, WebM Opus)
+3. legacy clients that send bare PCM without a format: the candidate rates in
+   STT_LEGACY_SAMPLE_RATES are recognized in parallel and the most confident transcript wins
+   (one round trip of latency instead of up to five sequential ones)
+
+When the format is known up front, /ws/chat also runs a StreamingTranscriber: frames are fed
+to a streaming recognition session while the user is still talking, interim transcripts go
+back to the client, and on "complete" only the tail of the utterance is left to recognize.
+
+CLASSES CONTAINED:
+
+class StreamingTranscriber:
+    One streaming recognition session per question: feed(chunk), pop_interim(), finish()
+
 FUNCTIONS CONTAINED:
 
-async def audio_to_text(audio_bytes: bytes) -> Optional[str]:
-(Convert audio bytes (PCM 16kHz mono) to text using Speech-to-Text API.)
+async def audio_to_text(audio_bytes: Union[bytes, memoryview], audio_format: Optional[Dict] = None) -> Optional[str]:
+(Convert audio bytes to text using Speech-to-Text API.)
+
+def audio_format_from_message(data: Dict) -> Optional[Dict]:
+(Validated capture format from a websocket JSON message, None if it carries none.)
 
-async def _transcribe_with_google_speech(audio_bytes: bytes) -> Optional[str]:
+def detect_audio_format(audio_bytes: Union[bytes, memoryview]) -> Optional[Dict]:
+(Capture format read from a WAV/FLAC/Ogg/WebM header, None for bare PCM.)
+
+async def _transcribe_with_google_speech(audio_bytes: bytes, audio_format: Optional[Dict] = None) -> Optional[str]:
 (Transcribe the audio from frontend using the Google Speech to Text API.)
+
+def start_streaming_transcriber(audio_format: Optional[Dict]) -> Optional[StreamingTranscriber]:
+(Started session for this format, None if streaming is off or the format is unknown.)
+
+async def google_streaming_recognize(audio_chunks, audio_format) -> AsyncIterator[Tuple[str, bool]]:
+(Default streaming backend: (transcript, is_final) pairs from streaming_recognize.)
 """
 
-from typing import Optional
+import asyncio
+import os
+import struct
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 
 # Try google cloud speech to text in order to transcribe audio
 try:
     from google.cloud import speech
 
+    from google_clients import get_speech_async_client
+
     GOOGLE_SPEECH_AVAILABLE = True
 except ImportError:
     GOOGLE_SPEECH_AVAILABLE = False
     print("[speech-to-text] google-cloud-speech not available")
 
+# Rates probed (in parallel) for clients that send bare PCM without an audio_format message.
+# Browsers capture at 48000 or 44100 Hz; ties go to the earlier rate.
+STT_LEGACY_SAMPLE_RATES = [
+    int(rate) for rate in os.environ.get("STT_LEGACY_SAMPLE_RATES", "48000,44100,16000").split(",") if rate.strip()
+]
+SUPPORTED_ENCODINGS = ("LINEAR16", "FLAC", "MULAW", "OGG_OPUS", "WEBM_OPUS")
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+STT_STREAMING_ENABLED = os.environ.get("STT_STREAMING_ENABLED", "true").lower() in ("1", "true", "yes")
+# How long "complete" waits for the last final result before falling back to one recognize() call
+STT_STREAMING_FINAL_TIMEOUT_SECONDS = float(os.environ.get("STT_STREAMING_FINAL_TIMEOUT_SECONDS", "3"))
+# API limit on audio_content per StreamingRecognizeRequest
+STREAMING_REQUEST_MAX_BYTES = 25 * 1024
+
+
+def audio_format_from_message(data: Dict) -> Optional[Dict]:
+    """
+    Capture format sent by the frontend, e.g. {"sample_rate": 48000, "channels": 1, "encoding": "LINEAR16"}.
+
+    Returns:
+        {"encoding", "sample_rate", "channels"} or None if the message has no sample_rate
+
+    Raises:
+        ValueError: If the format is present but unusable (so the client hears about it)
+    """
+    if data.get("sample_rate") is None:
+        return None
+    encoding = str(data.get("encoding", "LINEAR16")).upper()
+    sample_rate = int(data["sample_rate"])
+    channels = int(data.get("channels", 1))
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise ValueError(f"Unsupported audio encoding {encoding!r} (supported: {', '.join(SUPPORTED_ENCODINGS)})")
+    if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Unsupported sample rate {sample_rate} (must be {MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE} Hz)")
+    if not 1 <= channels <= 8:
+        raise ValueError(f"Unsupported channel count {channels}")
+    return {"encoding": encoding, "sample_rate": sample_rate, "channels": channels}
+
 
-async def audio_to_text(audio_bytes: bytes) -> Optional[str]:
+def _wav_format(audio_bytes: bytes) -> Optional[Dict]:
+    """Format of a PCM WAV file; the data chunk offset is returned so the header can be stripped."""
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(audio_bytes):
+        chunk_id, chunk_size = struct.unpack("<4sI", audio_bytes[offset : offset + 8])
+        body = offset + 8
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            audio_format, channels, sample_rate = struct.unpack("<HHI", audio_bytes[body : body + 8])
+            bits = struct.unpack("<H", audio_bytes[body + 14 : body + 16])[0]
+            if audio_format == 1 and bits == 16:
+                fmt = {"encoding": "LINEAR16", "sample_rate": sample_rate, "channels": channels}
+            elif audio_format == 7:
+                fmt = {"encoding": "MULAW", "sample_rate": sample_rate, "channels": channels}
+        elif chunk_id == b"data":
+            if fmt is not None:
+                fmt["data_offset"] = body
+            return fmt
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def detect_audio_format(audio_bytes: Union[bytes, memoryview]) -> Optional[Dict]:
+    """
+    Read the capture format from a container header.
+
+    Returns:
+        {"encoding", "sample_rate", "channels"} (plus "data_offset" for WAV), or None for
+        bare PCM and anything unrecognized
+    """
+    try:
+        head = bytes(audio_bytes[:512])  # audio_bytes may be a memoryview of the whole recording
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _wav_format(audio_bytes)
+        if head[:4] == b"fLaC" and len(head) >= 26:
+            # STREAMINFO: 20-bit sample rate, 3-bit (channels - 1) after the 10 bytes of block sizes
+            packed = int.from_bytes(head[18:21], "big")
+            return {"encoding": "FLAC", "sample_rate": packed >> 4, "channels": ((packed >> 1) & 0x7) + 1}
+        if head[:4] == b"OggS":
+            opus = head.find(b"OpusHead")
+            if opus >= 0 and len(head) >= opus + 16:
+                channels = head[opus + 9]
+                input_rate = struct.unpack("<I", head[opus + 12 : opus + 16])[0]
+                sample_rate = input_rate if MIN_SAMPLE_RATE <= input_rate <= MAX_SAMPLE_RATE else 48000
+                return {"encoding": "OGG_OPUS", "sample_rate": sample_rate, "channels": channels}
+        if head[:4] == b"\x1a\x45\xdf\xa3" and b"webm" in head[:64]:
+            # MediaRecorder's WebM is Opus, which is always decoded at 48 kHz
+            return {"encoding": "WEBM_OPUS", "sample_rate": 48000, "channels": 1}
+    except Exception as e:
+        print(f"[speech-to-text] Could not parse audio header: {e}")
+    return None
+
+
+async def audio_to_text(audio_bytes: Union[bytes, memoryview], audio_format: Optional[Dict] = None) -> Optional[str]:
     """
-    Convert audio bytes (PCM 16kHz mono) to text using Speech-to-Text API.
+    Convert audio bytes to text using Speech-to-Text API.
 
     Args:
-        audio_bytes: Raw audio data in PCM 16kHz mono format that come FROM THE FRONTEND
+        audio_bytes: Raw audio data that come FROM THE FRONTEND (bare PCM or a WAV/FLAC/Ogg/WebM file),
+            as bytes or a memoryview of the ingest buffer (audio_ingest.py)
+        audio_format: Capture format announced by the frontend (see audio_format_from_message);
+            None = detect from the header, or probe the legacy rates for bare PCM
 
     Returns:
         Transcribed text string, or None if transcription fails
@@ -36,7 +166,7 @@ async def audio_to_text(audio_bytes: bytes) -> Optional[str]:
 
         if GOOGLE_SPEECH_AVAILABLE:
             # transcribe_with_google_speech is defined below
-            return await _transcribe_with_google_speech(audio_bytes)
+            return await _transcribe_with_google_speech(audio_bytes, audio_format)
 
         else:
             print("[speech-to-text-error] No speech-to-text library available")
@@ -50,94 +180,234 @@ async def audio_to_text(audio_bytes: bytes) -> Optional[str]:
         return None
 
 
-async def _transcribe_with_google_speech(audio_bytes: bytes) -> Optional[str]:
+def _recognition_config(audio_format: Dict) -> "speech.RecognitionConfig":
+    return speech.RecognitionConfig(
+        encoding=getattr(speech.RecognitionConfig.AudioEncoding, audio_format["encoding"]),
+        sample_rate_hertz=audio_format["sample_rate"],
+        language_code="en-US",
+        enable_automatic_punctuation=True,
+        enable_word_time_offsets=False,
+        audio_channel_count=audio_format.get("channels", 1),
+    )
+
+
+async def _recognize(client, audio, audio_format: Dict) -> Tuple[str, float]:
+    """One recognize() call. Returns (transcript, mean confidence of its segments)."""
+    response = await client.recognize(config=_recognition_config(audio_format), audio=audio)
+    print(f"[speech-to-text] Response received at {audio_format['sample_rate']}Hz: {len(response.results)} results")
+    # response.results is one entry per phrase/sentence segment; alternatives[0] is the most
+    # likely interpretation of that segment, with the model's confidence in it
+    transcript_parts: List[str] = []
+    confidences: List[float] = []
+    for i, result in enumerate(response.results):
+        if result.alternatives:
+            best = result.alternatives[0]
+            print(f"[speech-to-text] Result {i}: '{best.transcript}' (confidence: {best.confidence})")
+            if best.transcript.strip():  # Only add non-empty transcripts
+                transcript_parts.append(best.transcript)
+                confidences.append(best.confidence)
+    transcript = " ".join(transcript_parts).strip()
+    return transcript, (sum(confidences) / len(confidences) if confidences else 0.0)
+
+
+async def _probe_sample_rates(client, audio) -> Optional[str]:
+    """Legacy clients (bare PCM, no format): recognize at every candidate rate at once, keep the most confident."""
+    print(f"[speech-to-text] No audio format from client, probing {STT_LEGACY_SAMPLE_RATES} Hz in parallel")
+    results = await asyncio.gather(
+        *(
+            _recognize(client, audio, {"encoding": "LINEAR16", "sample_rate": rate, "channels": 1})
+            for rate in STT_LEGACY_SAMPLE_RATES
+        ),
+        return_exceptions=True,
+    )
+    best_rate, best = None, None
+    for rate, result in zip(STT_LEGACY_SAMPLE_RATES, results):
+        if isinstance(result, Exception):
+            print(f"[speech-to-text] Error at {rate}Hz: {result}")
+            continue
+        if result[0] and (best is None or result[1] > best[1]):
+            best_rate, best = rate, result
+    if best is None:
+        print("[speech-to-text] No transcript returned from any sample rate")
+        return None
+    print(f"[speech-to-text] Transcription successful at {best_rate}Hz: {best[0][:100]}...")
+    return best[0]
+
+
+async def _transcribe_with_google_speech(
+    audio_bytes: Union[bytes, memoryview], audio_format: Optional[Dict] = None
+) -> Optional[str]:
     """Transcribe the audio from frontend using the Google Speech to Text API."""
     try:
         # [Z]
-        # initialize the client, which uses GOOGLE_APPLICATION_CREDENTIALS from env
-        client = speech.SpeechClient()
+        # shared client (google_clients.py), which uses GOOGLE_APPLICATION_CREDENTIALS from env
+        # (asyncio client: recognize() is awaited instead of blocking the event loop)
+        client = get_speech_async_client()
+
+        detected = detect_audio_format(audio_bytes)
+        if audio_format is None:
+            audio_format = detected
+        if detected and detected.get("data_offset"):
+            # WAV: send the samples only; the format travels in the config
+            audio_bytes = audio_bytes[detected["data_offset"] :]
 
         # create the audio object. This wraps raw audio bytes into a RecognitionAudio
-        # object for the Google
-        # Cloud Speech-to-Text. Tells the API the audio data to transcribe.
-        audio = speech.RecognitionAudio(content=audio_bytes)
-        # [Z]
-        # have to try multiple sample rates in case there is something funky from the frontend
-        # but usually audio streamed from a browser is 44100 Hz
-        # sample rate is how many audio samples per second, so higher = better quality, larger files
-        # It's like frames per second.
-        sample_rates_to_try = [44100, 48000, 16000, 22050, 32000]
-
-        print("[speech-to-text] Trying multiple sample rates...")
-
-        for sample_rate in sample_rates_to_try:
-            # Configure recognition
-            # configure recognition tries to recognize the sample rate of the audio
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=sample_rate,
-                language_code="en-US",
-                enable_automatic_punctuation=True,
-                enable_word_time_offsets=False,
-                audio_channel_count=1,  # Mono
-            )
-
-            print(f"[speech-to-text] Trying sample rate: {sample_rate} Hz...")
-
-            try:
-                # [Z]
-                # Perform transcription
-                # recognize is what the Google Cloud Speech  to Text API uses to understand audio,
-                # in order for transcription
-                response = client.recognize(config=config, audio=audio)
-                # response is essentially one giant dictionary that contaisn the
-                # speech to text transcription version : degree of confidence model has that that is
-                # the ground truth transcription
-
-                # Debug: Print full response
-                print(f"[speech-to-text] Response received: {len(response.results)} results")
-                # [Z]
-                # Here we actually transcript the text in the event the response is recognized.
-                # processes phrase/sentence segments (response.results is multiple transcription
-                # segments)
-                # alternatives[0] = best interpretation of that segment. alternatives is a list of
-                # potential phrases
-                # the given audio segment could be. confidence reflects confidence for segment.
-                transcript_parts = []
-                for i, result in enumerate(response.results):
-                    if (
-                        result.alternatives
-                    ):  # result is a specific SEGMENT of the transcription. results[0] is the first
-                        # phrase of audio --> "Hello Newsjuice"
-                        transcript_text = result.alternatives[
-                            0
-                        ].transcript  # Result alternatives are different interpretations of segment
-                        confidence = (
-                            result.alternatives[0].confidence if hasattr(result.alternatives[0], "confidence") else None
-                        )
-                        print(f"[speech-to-text] Result {i}: '{transcript_text}' " f"(confidence: {confidence})")
-                        if transcript_text.strip():  # Only add non-empty transcripts
-                            transcript_parts.append(
-                                transcript_text
-                            )  # we only add the greatest confidence segment to our transcription
-
-                transcript = " ".join(transcript_parts)
-
-                if transcript.strip():
-                    print("[speech-to-text] Transcription successful at " f"{sample_rate}Hz: {transcript[:100]}...")
-                    return transcript.strip()
-                else:
-                    print(f"[speech-to-text] No transcript at {sample_rate}Hz, trying next...")
-                    continue  # Try next sample rate
+        # object for the Google Cloud Speech-to-Text. Tells the API the audio data to transcribe.
+        # (protobuf only takes bytes: this is the one copy of the recording, made after the WAV
+        # header is sliced off the view)
+        audio = speech.RecognitionAudio(content=bytes(audio_bytes))
 
-            except Exception as e:
-                print(f"[speech-to-text] Error at {sample_rate}Hz: {e}, trying next...")
-                continue  # Try next sample rate
+        if audio_format is None:
+            return await _probe_sample_rates(client, audio)
 
-        # If we get here, none of the sample rates worked
-        print("[speech-to-text] No transcript returned from any sample rate")
-        return None
+        print(
+            f"[speech-to-text] Recognizing {audio_format['encoding']} at {audio_format['sample_rate']}Hz, "
+            f"{audio_format.get('channels', 1)} channel(s)"
+        )
+        transcript, _ = await _recognize(client, audio, audio_format)
+        if not transcript:
+            print("[speech-to-text] No transcript returned")
+            return None
+        print(f"[speech-to-text] Transcription successful: {transcript[:100]}...")
+        return transcript
 
     except Exception as e:
         print(f"[speech-to-text-error] Google Speech-to-Text error: {e}")
         raise
+
+
+async def google_streaming_recognize(
+    audio_chunks: AsyncIterator[bytes], audio_format: Dict
+) -> AsyncIterator[Tuple[str, bool]]:
+    """
+    Stream audio to Speech-to-Text as it arrives.
+
+    Yields:
+        (transcript, is_final) for every result: interim guesses for the phrase being spoken,
+        then one final result per phrase
+    """
+    client = get_speech_async_client()
+    streaming_config = speech.StreamingRecognitionConfig(config=_recognition_config(audio_format), interim_results=True)
+
+    async def requests():
+        # the first request carries only the config, the rest only audio
+        yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
+        async for chunk in audio_chunks:
+            for start in range(0, len(chunk), STREAMING_REQUEST_MAX_BYTES):
+                yield speech.StreamingRecognizeRequest(audio_content=chunk[start : start + STREAMING_REQUEST_MAX_BYTES])
+
+    responses = await client.streaming_recognize(requests=requests())
+    async for response in responses:
+        for result in response.results:
+            if result.alternatives:
+                yield result.alternatives[0].transcript, result.is_final
+
+
+StreamingBackend = Callable[[AsyncIterator[bytes], Dict], AsyncIterator[Tuple[str, bool]]]
+
+
+class StreamingTranscriber:
+    """
+    Streaming recognition session for one question.
+
+    The websocket handler feeds frames as they arrive; a background task forwards them to the
+    backend and collects results. finish() closes the audio stream and waits only for the
+    recognizer to finalize the last phrase.
+    """
+
+    def __init__(self, audio_format: Dict, backend: Optional[StreamingBackend] = None):
+        """
+        Args:
+            audio_format: Capture format (see audio_format_from_message)
+            backend: Streaming recognizer (default google_streaming_recognize; tests pass a fake)
+        """
+        self.audio_format = audio_format
+        self._backend = backend or google_streaming_recognize
+        self._queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+        self._final_parts: List[str] = []
+        self._interim = ""
+        self._last_popped = ""
+        self._task: Optional[asyncio.Task] = None
+        self.error: Optional[Exception] = None
+        self.bytes_fed = 0
+
+    def start(self) -> "StreamingTranscriber":
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    async def _audio_chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def _run(self) -> None:
+        try:
+            async for transcript, is_final in self._backend(self._audio_chunks(), self.audio_format):
+                if is_final:
+                    if transcript.strip():
+                        self._final_parts.append(transcript.strip())
+                    self._interim = ""
+                else:
+                    self._interim = transcript.strip()
+        except Exception as e:
+            print(f"[speech-to-text-error] Streaming recognition failed: {e}")
+            self.error = e
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def feed(self, chunk: bytes) -> None:
+        """Queue one audio frame (never blocks; dropped once the session has failed or finished)."""
+        if self._task is None or self._task.done():
+            return
+        self.bytes_fed += len(chunk)
+        self._queue.put_nowait(bytes(chunk))
+
+    def transcript_so_far(self) -> str:
+        """Final phrases plus the current interim guess."""
+        return " ".join(self._final_parts + ([self._interim] if self._interim else []))
+
+    def pop_interim(self) -> Optional[str]:
+        """The running transcript if it changed since the last call, else None."""
+        current = self.transcript_so_far()
+        if current == self._last_popped:
+            return None
+        self._last_popped = current
+        return current
+
+    async def finish(self, timeout: float = STT_STREAMING_FINAL_TIMEOUT_SECONDS) -> Optional[str]:
+        """
+        End the audio stream and wait for the final results.
+
+        Returns:
+            The transcript ("" if nothing was said), or None if the session failed and the
+            caller should fall back to audio_to_text on the buffered audio
+        """
+        if self._task is None:
+            return None
+        self._queue.put_nowait(None)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.cancel()
+            partial = self.transcript_so_far()
+            print(f"[speech-to-text] Streaming final result timed out after {timeout}s, partial: {partial[:100]}")
+            return partial or None
+        if self.failed:
+            return None
+        return " ".join(self._final_parts)
+
+    def cancel(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+
+def start_streaming_transcriber(audio_format: Optional[Dict]) -> Optional[StreamingTranscriber]:
+    """Started StreamingTranscriber, or None when streaming is disabled or the capture format is unknown."""
+    if not (STT_STREAMING_ENABLED and GOOGLE_SPEECH_AVAILABLE and audio_format):
+        return None
+    print(f"[speech-to-text] Streaming recognition started at {audio_format['sample_rate']}Hz")
+    return StreamingTranscriber(audio_format).start()
@@ -0,0 +1,68 @@
+"""Unit tests for ann_snapshot.py (snapshot files in a temporary directory, no database)."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import ann_snapshot
+import retriever
+from ann_snapshot import ChunkSnapshot, write_snapshot
+
+NOW = datetime(2025, 12, 15, 12, 0, 0)
+
+
+def _rows():
+    return [
+        (1, "art-a", "budget cuts", "Harvard Gazette", NOW - timedelta(hours=1), [1.0, 0.0, 0.0]),
+        (2, "art-a", "more on the budget", "Harvard Gazette", NOW - timedelta(days=5), [0.9, 0.1, 0.0]),
+        (3, "art-b", "new dean named", "Crimson", NOW - timedelta(hours=3), [0.0, 1.0, 0.0]),
+        (4, "art-c", "café reopens", "Crimson", None, [0.7, 0.0, 0.7]),
+    ]
+
+
+@pytest.fixture(params=["float32", "float16"])
+def snapshot(tmp_path, request):
+    return ChunkSnapshot(write_snapshot(_rows(), str(tmp_path), version=3, dtype=request.param))
+
+
+def test_scores_match_cosine_distance(snapshot):
+    results = snapshot.search([2.0, 0.0, 0.0], limit=4)
+
+    assert [r[0] for r in results] == [1, 2, 4, 3]
+    expected = 1 - np.dot([0.9, 0.1, 0.0], [1.0, 0.0, 0.0]) / np.linalg.norm([0.9, 0.1, 0.0])
+    assert results[1][1:3] == ("more on the budget", "Harvard Gazette")
+    assert results[1][3] == pytest.approx(expected, abs=1e-3)
+    assert results[2][1] == "café reopens"
+
+
+def test_source_and_date_filters(snapshot):
+    assert [r[0] for r in snapshot.search([1.0, 0.0, 0.0], 10, sources=["Crimson"])] == [4, 3]
+    recent = snapshot.search([1.0, 0.0, 0.0], 10, since=NOW - timedelta(days=1))
+    assert [r[0] for r in recent] == [1, 3]  # chunk 4 has no date, like the SQL window
+    assert snapshot.search([1.0, 0.0, 0.0], 10, sources=["Unknown"]) == []
+
+
+def test_multi_rows_match_the_sql_row_format(snapshot):
+    rows = snapshot.multi_rows([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], limit=1)
+    assert [(r[0], r[1], r[2]) for r in rows] == [(1, 1, "art-a"), (2, 3, "art-b")]
+
+
+def test_existing_version_is_reused(tmp_path):
+    path = write_snapshot(_rows(), str(tmp_path), version=3)
+    assert write_snapshot([], str(tmp_path), version=3) == path
+    assert ChunkSnapshot(path).rows == 4
+
+
+@pytest.mark.asyncio
+async def test_retriever_uses_current_snapshot_only(monkeypatch, tmp_path):
+    snap = ChunkSnapshot(write_snapshot(_rows(), str(tmp_path), version=3))
+    monkeypatch.setattr(ann_snapshot, "_snapshot", snap)
+    monkeypatch.setattr(retriever, "_result_cache", retriever.TTLCache(max_size=8, ttl_seconds=60))
+    monkeypatch.setattr(retriever.corpus_version, "_version", 3)
+
+    result = await retriever.search_vectors_multi_async([[0.0, 1.0, 0.0]], limit=1)
+    assert [r[0] for r in result["per_query"][0]] == [3]
+
+    monkeypatch.setattr(retriever.corpus_version, "_version", 4)  # loader published a new corpus
+    assert ann_snapshot.get_snapshot() is None
@@ -0,0 +1,88 @@
+"""Unit tests for answer_cache.py and the cached /ws/chat path (no Google APIs or database needed)."""
+
+import pytest
+
+import main
+from answer_cache import SemanticAnswerCache
+
+
+def test_near_duplicate_question_hits():
+    cache = SemanticAnswerCache(max_size=4, threshold=0.95)
+    handle = cache.store([1.0, 0.0, 0.1], 3, "Harvard budget cuts?", "podcast")
+    cache.add_audio(handle, "voice-a", b"RIFF-a")
+
+    hit = cache.lookup([0.99, 0.0, 0.12], 3, voice="voice-a")
+    assert hit["podcast_text"] == "podcast"
+    assert hit["audio"] == b"RIFF-a"
+    assert cache.lookup([0.99, 0.0, 0.12], 3, voice="voice-b")["audio"] is None  # text only
+
+    assert cache.lookup([0.0, 1.0, 0.0], 3) is None  # unrelated question
+    assert cache.lookup([1.0, 0.0, 0.1], 4) is None  # new corpus version
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["audio_hits"] == 1
+
+
+def test_unknown_corpus_version_is_not_cached():
+    cache = SemanticAnswerCache(max_size=4)
+    assert cache.store([1.0, 0.0], None, "q", "podcast") is None
+    assert cache.lookup([1.0, 0.0], None) is None
+    assert len(cache) == 0
+
+
+def test_size_and_audio_budget_evict_least_recently_used():
+    cache = SemanticAnswerCache(max_size=2, audio_max_bytes=10)
+    first = cache.store([1.0, 0.0, 0.0], 1, "a", "A")
+    second = cache.store([0.0, 1.0, 0.0], 1, "b", "B")
+    cache.add_audio(first, "v", b"123456")
+    cache.lookup([1.0, 0.0, 0.0], 1)  # "a" is now the most recently used
+    cache.add_audio(second, "v", b"123456")  # over budget: audio of the other answer is dropped
+    assert cache.stats()["audio_bytes"] == 6
+    assert cache.lookup([0.0, 1.0, 0.0], 1, voice="v")["audio"] == b"123456"
+
+    cache.store([0.0, 0.0, 1.0], 1, "c", "C")  # evicts "a"
+    assert cache.lookup([1.0, 0.0, 0.0], 1) is None
+    assert cache.lookup([0.0, 1.0, 0.0], 1)["podcast_text"] == "B"
+    assert cache.stats()["evictions"] == 1
+    cache.add_audio(first, "v", b"late")  # "a" was evicted and its slot reused by "c"
+    assert cache.lookup([0.0, 0.0, 1.0], 1, voice="v")["audio"] is None
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_json(self, data):
+        self.messages.append(data)
+
+    async def send_bytes(self, data):
+        self.messages.append(data)
+
+
+@pytest.mark.asyncio
+async def test_cached_answer_skips_generation_and_tts(monkeypatch):
+    cache = SemanticAnswerCache(max_size=4)
+    monkeypatch.setattr(main, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(main, "current_version", lambda: 1)
+
+    async def fake_preferences(user_id):
+        return {"voice_preference": "voice-a"}
+
+    async def no_tts(*args, **kwargs):
+        raise AssertionError("TTS should not run on an audio hit")
+
+    async def fake_save_history(**kwargs):
+        return True
+
+    monkeypatch.setattr(main, "get_user_preferences_async", fake_preferences)
+    monkeypatch.setattr(main, "text_to_audio_stream", no_tts)
+    monkeypatch.setattr(main, "save_audio_history_async", fake_save_history)
+    handle = cache.store([1.0, 0.0], 1, "Harvard budget cuts?", "cached podcast")
+    cache.add_audio(handle, "voice-a", b"RIFF" * 5000)
+
+    websocket = FakeWebSocket()
+    assert await main._answer_from_cache(websocket, [1.0, 0.01], "what about harvard's budget cuts", "user-1")
+
+    assert {"status": "podcast_generated", "text": "cached podcast", "cached": True} in websocket.messages
+    assert b"".join(m for m in websocket.messages if isinstance(m, bytes)) == b"RIFF" * 5000
+    assert websocket.messages[-1] == {"status": "complete"}
+    assert await main._answer_from_cache(websocket, [0.0, 1.0], "something else", "user-1") is None
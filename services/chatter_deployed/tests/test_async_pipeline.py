@@ -0,0 +1,143 @@
+"""Concurrency tests for the async /ws/chat pipeline (no Google APIs or database needed)."""
+
+import asyncio
+import time
+
+import pytest
+
+import async_utils
+import main
+
+# Simulated latency of each external call (retrieval, Gemini, DB, TTS)
+CALL_LATENCY = 0.1
+SESSIONS = 10
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_json(self, data):
+        self.messages.append(data)
+
+    async def send_bytes(self, data):
+        self.messages.append(data)
+
+
+@pytest.fixture
+def slow_backends(monkeypatch):
+    """Replace every awaited dependency of _retrieve_and_generate_podcast with a sleep."""
+
+    async def fake_retrieve(queries, limit=10):
+        await asyncio.sleep(CALL_LATENCY)
+        per_query = [[(i, f"chunk for {q}", "test-source", 0.1)] for i, q in enumerate(queries)]
+        return per_query, [rows[0] for rows in per_query]
+
+    async def fake_gemini(question, chunks, model):
+        await asyncio.sleep(CALL_LATENCY)
+        return f"podcast about {question}", None
+
+    async def fake_preferences(user_id):
+        await asyncio.sleep(CALL_LATENCY)
+        return {"voice_preference": "en-US-Studio-O"}
+
+    async def fake_tts(text, websocket, voice_name=None):
+        await asyncio.sleep(CALL_LATENCY)
+        await websocket.send_bytes(b"RIFF")
+        return "success"
+
+    async def fake_save_history(**kwargs):
+        await asyncio.sleep(CALL_LATENCY)
+        return True
+
+    monkeypatch.setattr(main, "call_retriever_service_multi_async", fake_retrieve)
+    monkeypatch.setattr(main, "call_gemini_api_async", fake_gemini)
+    monkeypatch.setattr(main, "get_user_preferences_async", fake_preferences)
+    monkeypatch.setattr(main, "text_to_audio_stream", fake_tts)
+    monkeypatch.setattr(main, "save_audio_history_async", fake_save_history)
+
+
+async def _one_session(i):
+    websocket = FakeWebSocket()
+    ok = await main._retrieve_and_generate_podcast(
+        websocket,
+        {"enhanced_query_1": f"question {i}"},
+        original_query=f"question {i}",
+        user_id=f"user-{i}",
+        model=None,
+    )
+    return ok, websocket
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_do_not_serialize(slow_backends):
+    start = time.perf_counter()
+    await _one_session(0)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_one_session(i) for i in range(SESSIONS)))
+    concurrent = time.perf_counter() - start
+
+    assert all(ok for ok, _ in results)
+    assert all({"status": "complete"} in ws.messages for _, ws in results)
+    # If any step blocked the loop, N sessions would take ~N times one session
+    assert concurrent < single * 2
+
+
+@pytest.mark.asyncio
+async def test_run_blocking_keeps_event_loop_free():
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(async_utils.run_blocking(time.sleep, 0.2) for _ in range(4)))
+    elapsed = time.perf_counter() - start
+    task.cancel()
+
+    assert elapsed < 0.6  # ran in parallel on the executor
+    assert ticks >= 5  # the loop kept serving other tasks meanwhile
+
+
+@pytest.mark.asyncio
+async def test_streaming_mode_sends_status_messages_and_segments(slow_backends, monkeypatch):
+    import text_to_speech_client
+
+    async def fake_stream(question, chunks, model):
+        for piece in ["Harvard posted a deficit. ", "It is the first since 2020."]:
+            await asyncio.sleep(CALL_LATENCY)
+            yield piece
+
+    async def fake_synthesize(client, text, voice, audio_config):
+        return b"\x00\x00" * len(text)
+
+    monkeypatch.setattr(main, "stream_gemini_api_async", fake_stream)
+    monkeypatch.setattr(text_to_speech_client.texttospeech, "TextToSpeechAsyncClient", lambda: None)
+    monkeypatch.setattr(text_to_speech_client, "_synthesize_chunk_async", fake_synthesize)
+
+    websocket = FakeWebSocket()
+    ok = await main._retrieve_and_generate_podcast(
+        websocket,
+        {"enhanced_query_1": "budget"},
+        original_query="budget",
+        user_id="user-1",
+        model=None,
+        stream_audio=True,
+    )
+
+    assert ok
+    statuses = [m.get("status") for m in websocket.messages if isinstance(m, dict)]
+    assert statuses[:3] == ["retrieving", "generating", "converting_to_audio"]
+    assert statuses.count("audio_segment") == 2
+    assert statuses[-2:] == ["podcast_generated", "complete"]
+    first_audio = next(i for i, m in enumerate(websocket.messages) if isinstance(m, bytes))
+    generated = websocket.messages.index(
+        {"status": "podcast_generated", "text": "Harvard posted a deficit. It is the first since 2020."}
+    )
+    assert first_audio < generated
@@ -0,0 +1,55 @@
+"""Tests for the bounded websocket audio buffer (audio_ingest.py)."""
+
+import time
+
+import pytest
+
+from audio_ingest import AudioIngestBuffer
+
+FRAME = b"\x01\x02" * 2048  # one 4096-sample Int16 frame, as the frontend sends
+
+
+def test_stays_in_memory_and_views_without_copying():
+    buffer = AudioIngestBuffer(memory_bytes=len(FRAME) * 4)
+    for _ in range(3):
+        assert buffer.append(FRAME)
+    with buffer.view() as audio:
+        assert isinstance(audio, memoryview) and audio.readonly
+        assert audio.obj is buffer._memory  # a view of the buffer itself, not a copy
+        assert bytes(audio) == FRAME * 3
+    assert not buffer.spilled
+    assert buffer.append(FRAME)  # growing again works once the view is released
+
+
+def test_spills_to_disk_past_memory_threshold():
+    buffer = AudioIngestBuffer(memory_bytes=len(FRAME) * 2)
+    for _ in range(5):
+        buffer.append(FRAME)
+    assert buffer.spilled
+    assert len(buffer._memory) == 0
+    with buffer.view() as audio:
+        assert len(audio) == len(FRAME) * 5
+        assert audio[: len(FRAME)] == FRAME and audio[-len(FRAME) :] == FRAME
+    buffer.clear()
+    assert not buffer.spilled and len(buffer) == 0
+
+
+def test_duration_cap_from_format_drops_the_rest():
+    buffer = AudioIngestBuffer(max_seconds=1.0)
+    buffer.set_format({"encoding": "LINEAR16", "sample_rate": 8000, "channels": 1})  # 16000 bytes/s
+    accepted = sum(buffer.append(FRAME) for _ in range(5))
+    assert accepted == 16000 // len(FRAME)
+    assert buffer.truncated and len(buffer) <= 16000
+    buffer.clear()
+    assert not buffer.truncated
+
+
+@pytest.mark.parametrize("interval, expected", [(0, 10), (60, 1)])
+def test_acks_are_rate_limited(interval, expected):
+    buffer = AudioIngestBuffer(ack_interval=interval)
+    acks = 0
+    for _ in range(10):
+        buffer.append(FRAME)
+        acks += buffer.ack_due()
+        time.sleep(0.001)
+    assert acks == expected
@@ -0,0 +1,88 @@
+"""Tests for the overnight daily brief batch (batch_briefs.py); briefs are faked, jobs kept in memory."""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from batch_briefs import RateLimiter, needs_brief, run_batch
+
+BRIEF_SECONDS = 0.05
+
+
+def make_generate(fail_for=()):
+    running = {"now": 0, "max": 0}
+    generated = []
+
+    async def fake_brief(user_id, progress):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        try:
+            await asyncio.sleep(BRIEF_SECONDS)
+            if user_id in fail_for:
+                raise RuntimeError("Gemini quota exceeded")
+            generated.append(user_id)
+            return {"success": True}
+        finally:
+            running["now"] -= 1
+
+    return fake_brief, generated, running
+
+
+def test_needs_brief_follows_the_status_endpoint():
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    earlier = (now - timedelta(minutes=5)).replace(tzinfo=None).isoformat()  # a naive DB timestamp
+    assert needs_brief({"user_id": "new"}, today)
+    assert needs_brief({"last_daily_brief_generated": (now - timedelta(days=1)).isoformat()}, today)
+    assert not needs_brief({"last_daily_brief_generated": now.isoformat(), "preferences_updated": earlier}, today)
+    changed = (now + timedelta(minutes=1)).replace(tzinfo=None).isoformat()
+    assert needs_brief({"last_daily_brief_generated": now.isoformat(), "preferences_updated": changed}, today)
+
+
+@pytest.mark.asyncio
+async def test_batch_is_bounded_skips_current_users_and_reports(tmp_path):
+    generate, generated, running = make_generate(fail_for=("u3",))
+    users = [{"user_id": f"u{i}"} for i in range(6)]
+    users.append({"user_id": "done", "last_daily_brief_generated": datetime.now(timezone.utc).isoformat()})
+    checkpoint = tmp_path / "checkpoint.json"
+
+    report = await run_batch(
+        generate, users, concurrency=2, per_minute=0, checkpoint_path=str(checkpoint), persist=False
+    )
+    assert running["max"] == 2
+    assert sorted(generated) == ["u0", "u1", "u2", "u4", "u5"]
+    assert (report["generated"], report["failed"], report["skipped_current"]) == (5, 1, 1)
+    assert report["briefs_per_minute"] > 0 and report["p95_seconds"] >= report["p50_seconds"] >= BRIEF_SECONDS
+
+    saved = json.loads(checkpoint.read_text())
+    assert set(saved["done"]) == {"u0", "u1", "u2", "u4", "u5"}
+    assert "quota" in saved["failed"]["u3"] and saved["report"] == report
+
+
+@pytest.mark.asyncio
+async def test_restarted_run_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    users = [{"user_id": f"u{i}"} for i in range(4)]
+    generate, _, _ = make_generate(fail_for=("u2",))
+    await run_batch(generate, users, concurrency=2, per_minute=0, checkpoint_path=checkpoint, persist=False)
+
+    generate, generated, _ = make_generate()
+    report = await run_batch(generate, users, concurrency=2, per_minute=0, checkpoint_path=checkpoint, persist=False)
+    assert generated == [] and report["skipped_checkpoint"] == 4
+
+    report = await run_batch(
+        generate, users, concurrency=2, per_minute=0, checkpoint_path=checkpoint, retry_failed=True, persist=False
+    )
+    assert generated == ["u2"] and report["generated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_starts():
+    limiter = RateLimiter(per_minute=1200)  # one start every 50 ms
+    start = time.perf_counter()
+    for _ in range(4):
+        await limiter.acquire()
+    assert time.perf_counter() - start >= 0.14
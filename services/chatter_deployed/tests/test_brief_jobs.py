@@ -0,0 +1,81 @@
+"""Tests for the daily brief job engine (brief_jobs.py); briefs are faked, jobs kept in memory."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from brief_jobs import BriefJobManager, JobQueueFull
+
+BRIEF_SECONDS = 0.1
+
+
+def make_manager(workers=2, queue_max=10, fail_for=()):
+    started = []
+
+    async def fake_brief(user_id, progress):
+        started.append(user_id)
+        progress("generating")
+        await asyncio.sleep(BRIEF_SECONDS)
+        if user_id in fail_for:
+            raise HTTPException(status_code=404, detail="No articles found matching your preferences")
+        progress("uploading")
+        return {"success": True, "podcast_text": f"brief for {user_id}"}
+
+    return BriefJobManager(fake_brief, workers=workers, queue_max=queue_max, persist=False), started
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_at_once_and_job_completes():
+    manager, _ = make_manager()
+    job, created = await manager.submit("u1")
+    assert created and job["status"] == "queued"
+
+    done = await manager.wait_until_done(job["job_id"], timeout=2)
+    assert done["status"] == "succeeded" and done["stage"] == "complete"
+    assert done["result"]["podcast_text"] == "brief for u1"
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_repeated_clicks_attach_to_the_running_job():
+    manager, started = make_manager()
+    jobs = [await manager.submit("u1") for _ in range(3)]
+    assert len({job["job_id"] for job, _ in jobs}) == 1
+    assert [created for _, created in jobs] == [True, False, False]
+    await manager.wait_until_done(jobs[0][0]["job_id"], timeout=2)
+    assert started == ["u1"]
+
+    # once it finished, the next click starts a new brief
+    job, created = await manager.submit("u1")
+    assert created and job["job_id"] != jobs[0][0]["job_id"]
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_bounds_concurrency_and_queue():
+    manager, _ = make_manager(workers=2, queue_max=3)
+    jobs = [(await manager.submit(f"u{i}"))[0] for i in range(3)]
+    await asyncio.sleep(BRIEF_SECONDS / 2)
+    assert manager.stats()["running"] == 2  # the third waits for a worker
+    for i in range(3, 5):
+        await manager.submit(f"u{i}")
+    with pytest.raises(JobQueueFull):
+        await manager.submit("u5")
+    for job in jobs:
+        assert (await manager.wait_until_done(job["job_id"], timeout=2))["status"] == "succeeded"
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_failure_keeps_http_status_and_long_poll_wakes_on_change():
+    manager, _ = make_manager(fail_for=("u1",))
+    job, _ = await manager.submit("u1")
+    polled = await manager.wait(job["job_id"], timeout=2)
+    assert polled["status"] == "running"  # woke on the first change, not after the timeout
+
+    done = await manager.wait_until_done(job["job_id"], timeout=2)
+    assert done["status"] == "failed"
+    assert done["error_status"] == 404 and "No articles" in done["error"]
+    assert await manager.get("missing") is None
+    await manager.stop()
@@ -0,0 +1,57 @@
+"""Unit tests for context_packer.py (no database access)."""
+
+import pytest
+
+import context_packer
+from context_packer import pack_context
+
+
+def _chunk(chunk_id, score, text="x" * 396):
+    return (chunk_id, text, "Harvard Gazette", score)  # ~100 tokens each with the title line
+
+
+def test_identical_output_when_budget_not_binding():
+    chunks = [_chunk(1, 0.1), _chunk(2, 0.2), _chunk(3, 0.3)]
+    assert pack_context(chunks, token_budget=10_000) == chunks
+    assert pack_context(chunks, token_budget=0) == chunks
+
+
+def test_mmr_skips_near_duplicates_and_caps_articles():
+    chunks = [_chunk(1, 0.10), _chunk(2, 0.11), _chunk(3, 0.30), _chunk(4, 0.12), _chunk(5, 0.13)]
+    metadata = {
+        1: ("art-a", [1.0, 0.0, 0.0]),
+        2: ("art-b", [1.0, 0.01, 0.0]),  # near-duplicate of 1
+        3: ("art-c", [0.0, 1.0, 0.0]),  # less relevant but new
+        4: ("art-d", [0.0, 0.0, 1.0]),
+        5: ("art-d", [0.0, 0.1, 1.0]),
+    }
+    budget = 3 * context_packer._chunk_tokens(chunks[0])
+
+    packed = pack_context(chunks, budget, metadata=metadata, max_per_article=1, mmr_lambda=0.5)
+
+    assert [c[0] for c in packed] == [1, 3, 4]  # original order kept, 2 and 5 dropped
+
+
+def test_budget_respected_without_metadata():
+    chunks = [_chunk(i, 0.1 * i) for i in range(1, 6)]
+    budget = 2 * context_packer._chunk_tokens(chunks[0])
+    assert [c[0] for c in pack_context(chunks, budget)] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_metadata_only_loaded_when_budget_binds(monkeypatch):
+    import retriever
+
+    calls = []
+
+    async def fake_metadata(ids):
+        calls.append(ids)
+        return {}
+
+    monkeypatch.setattr(retriever, "chunk_metadata_async", fake_metadata)
+    chunks = [_chunk(1, 0.1), _chunk(2, 0.2)]
+
+    assert await context_packer.pack_context_for_prompt_async(chunks, token_budget=10_000) == chunks
+    assert calls == []
+    assert len(await context_packer.pack_context_for_prompt_async(chunks, token_budget=150)) == 1
+    assert calls == [[1, 2]]
@@ -0,0 +1,66 @@
+"""Tests for the corpus version listener (corpus_version.py); the LISTEN connection is faked."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import corpus_version
+
+
+class FakeCursor:
+    def __init__(self, version):
+        self.version = version
+
+    async def fetchone(self):
+        return (self.version,)
+
+
+class FakeListenConnection:
+    """Like psycopg's AsyncConnection, notifies() holds the (non-reentrant) connection lock while it yields."""
+
+    def __init__(self, versions, payloads):
+        self.lock = asyncio.Lock()
+        self.versions = list(versions)
+        self.payloads = list(payloads)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params=None):
+        async with self.lock:
+            if query == corpus_version.CORPUS_VERSION_SQL:
+                return FakeCursor(self.versions.pop(0))
+            return FakeCursor(None)
+
+    async def notifies(self, timeout=None):
+        async with self.lock:
+            while self.payloads:
+                yield SimpleNamespace(payload=self.payloads.pop(0))
+            await asyncio.Event().wait()  # no more notifications
+
+
+@pytest.mark.asyncio
+async def test_notify_without_a_version_rereads_instead_of_hanging(monkeypatch):
+    conn = FakeListenConnection(versions=[5, 8], payloads=["7", "not-a-version"])
+
+    async def fake_connect(*args, **kwargs):
+        return conn
+
+    monkeypatch.setattr(corpus_version.psycopg.AsyncConnection, "connect", fake_connect)
+    monkeypatch.setattr(corpus_version, "_callbacks", [])
+    monkeypatch.setattr(corpus_version, "_version", None)
+
+    task = asyncio.create_task(corpus_version._listen_forever())
+    try:
+        for _ in range(100):
+            if corpus_version.current_version() == 8:
+                break
+            await asyncio.sleep(0.01)
+        assert corpus_version.current_version() == 8  # 5 at startup, 7 from NOTIFY, 8 re-read
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,20 @@
+"""Unit tests for db_pool.py (no database needed)."""
+
+import db_pool
+
+
+class FakePool:
+    max_size = 10
+
+    def get_stats(self):
+        return {"pool_size": 4, "pool_available": 1, "requests_waiting": 2}
+
+
+def test_pool_stats_reports_saturation(monkeypatch):
+    monkeypatch.setattr(db_pool, "_pool", FakePool())
+    monkeypatch.setattr(db_pool, "_async_pool", None)
+    stats = db_pool.pool_stats()
+    assert stats["async"] is None
+    assert stats["sync"]["connections_in_use"] == 3
+    assert stats["sync"]["saturation"] == 0.3
+    assert stats["sync"]["requests_waiting"] == 2
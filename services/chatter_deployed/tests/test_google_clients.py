@@ -0,0 +1,57 @@
+"""Tests for the shared Google client registry (google_clients.py); the client classes are faked."""
+
+import asyncio
+
+import pytest
+
+import google_clients
+
+
+class FakeTransport:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAsyncClient:
+    built = 0
+
+    def __init__(self):
+        FakeAsyncClient.built += 1
+        self.transport = FakeTransport()
+
+
+@pytest.fixture
+def fake_tts(monkeypatch):
+    FakeAsyncClient.built = 0
+    monkeypatch.setattr(google_clients.texttospeech, "TextToSpeechAsyncClient", FakeAsyncClient)
+    return FakeAsyncClient
+
+
+@pytest.mark.asyncio
+async def test_async_client_built_once_and_reused(fake_tts):
+    first = google_clients.get_tts_async_client()
+    for _ in range(5):
+        assert google_clients.get_tts_async_client() is first
+    assert fake_tts.built == 1
+    assert google_clients.client_stats()["tts_async"]["uses"] == 6
+
+
+def test_async_client_rebuilt_for_a_new_event_loop(fake_tts):
+    async def get():
+        return google_clients.get_tts_async_client()
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+    assert first is not second
+    assert fake_tts.built == 2
+
+
+@pytest.mark.asyncio
+async def test_close_clients_closes_channels_and_resets(fake_tts):
+    client = google_clients.get_tts_async_client()
+    await google_clients.close_clients()
+    assert client.transport.closed
+    assert google_clients.get_tts_async_client() is not client
@@ -0,0 +1,337 @@
+"""Unit tests for retriever.py (no Vertex AI or database access)."""
+
+import pytest
+
+import retriever
+
+
+class FakeEmbedder:
+    model = "fake-model"
+    dim = 3
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 0.0, 1.0]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    embedder = FakeEmbedder()
+    monkeypatch.setattr(retriever, "_embedder", embedder)
+    monkeypatch.setattr(retriever, "_query_embedding_cache", retriever.TTLCache(max_size=8, ttl_seconds=60))
+    return embedder
+
+
+@pytest.mark.asyncio
+async def test_embed_query_cached_reuses_normalized_text(fake_embedder):
+    first = await retriever.embed_query_cached_async("Harvard  budget cuts")
+    second = await retriever.embed_query_cached_async("  harvard budget CUTS ")
+    assert first == second
+    assert len(fake_embedder.calls) == 1
+    stats = retriever.embedding_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_get_embedder_is_a_singleton(fake_embedder):
+    assert retriever.get_embedder() is fake_embedder
+    assert retriever.get_embedder() is retriever.get_embedder()
+
+
+class FakeBatchEmbedder(FakeEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    async def aembed_queries(self, texts):
+        self.batches.append(list(texts))
+        return [self.embed_query(t) for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_embed_queries_batches_only_cache_misses(monkeypatch):
+    embedder = FakeBatchEmbedder()
+    monkeypatch.setattr(retriever, "_embedder", embedder)
+    monkeypatch.setattr(retriever, "_query_embedding_cache", retriever.TTLCache(max_size=8, ttl_seconds=60))
+    await retriever.embed_query_cached_async("harvard budget")
+
+    vectors = await retriever.embed_queries_cached_async(["Harvard budget", "new dean", "NEW  dean"])
+
+    assert embedder.batches == [["new dean"]]  # one request, cached and duplicate queries skipped
+    assert vectors[1] == vectors[2]
+    assert vectors[0] == await retriever.embed_query_cached_async("harvard budget")
+
+
+def test_merge_results_keeps_best_score_per_chunk():
+    first = [(1, "a", "src", 0.30), (2, "b", "src", 0.10)]
+    second = [(1, "a", "src", 0.20), (3, "c", "src", 0.20)]
+
+    merged = retriever.merge_results_by_chunk_id([first, second])
+
+    assert merged == [(2, "b", "src", 0.10), (1, "a", "src", 0.20), (3, "c", "src", 0.20)]
+    assert retriever.merge_results_by_chunk_id([second, first]) == merged
+
+
+class FakeAsyncCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.connection = self
+
+    def pipeline(self):
+        return self  # only used as an async context manager
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params, prepare=None):
+        self.executed.append(params)
+
+    async def fetchall(self):
+        return self.rows
+
+
+class FakeAsyncConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def pipeline(self):
+        return self._cursor
+
+
+def fake_async_db(monkeypatch, rows):
+    cursor = FakeAsyncCursor(rows)
+
+    class FakeContext:
+        async def __aenter__(self):
+            return FakeAsyncConnection(cursor)
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(retriever, "async_connection", FakeContext)
+    return cursor
+
+
+@pytest.mark.asyncio
+async def test_search_vectors_multi_uses_one_statement(monkeypatch):
+    # (query_idx, id, article_id, chunk, source_type, score) as returned by the LATERAL query
+    rows = [
+        (1, 10, "art-a", "a1", "src", 0.1),
+        (1, 11, "art-a", "a2", "src", 0.2),
+        (1, 12, "art-b", "b1", "src", 0.3),
+        (2, 12, "art-b", "b1", "src", 0.15),
+        (2, 13, "art-c", "c1", "src", 0.25),
+    ]
+    cursor = fake_async_db(monkeypatch, rows)
+
+    result = await retriever.search_vectors_multi_async([[1.0, 0.0], [0.0, 1.0]], limit=3, max_per_article=1)
+
+    # ANN settings + the single multi-vector statement (pipelined: one round trip)
+    assert len(cursor.executed) == 2
+    assert cursor.executed[0] == (str(retriever.HNSW_EF_SEARCH), str(retriever.IVFFLAT_PROBES))
+    assert cursor.executed[1] == (["[1.0,0.0]", "[0.0,1.0]"], 3)
+    assert [r[0] for r in result["per_query"][0]] == [10, 11, 12]
+    assert [r[0] for r in result["per_query"][1]] == [12, 13]
+    # chunk 12 is ranked by both queries -> first under RRF; art-a capped to one chunk
+    assert [r[0] for r in result["fused"]] == [12, 10, 13]
+    assert result["fused"][0][3] == 0.15
+
+
+def test_reciprocal_rank_fusion_is_order_independent():
+    first = [(1, "a", "src", 0.1), (2, "b", "src", 0.2)]
+    second = [(3, "c", "src", 0.1), (2, "b", "src", 0.3)]
+
+    fused = retriever.reciprocal_rank_fusion([first, second])
+
+    assert [r[0] for r in fused] == [2, 1, 3]
+    assert fused == retriever.reciprocal_rank_fusion([second, first])
+
+
+def test_ann_settings_never_below_limit():
+    assert retriever._ann_settings(10, ef_search=40, probes=5) == ("40", "5")
+    assert retriever._ann_settings(100, ef_search=40) == ("100", str(retriever.IVFFLAT_PROBES))
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_lexical_leg_and_shrinks_name_queries(monkeypatch):
+    # (query_idx, leg, id, article_id, chunk, source_type, score, sort_key); leg 2 = full-text
+    rows = [(1, 1, i, f"art-{i}", f"chunk {i}", "src", 0.1 * i, 0.1 * i) for i in range(1, 9)]
+    rows += [(1, 2, 42, "art-42", "Amanda Claybaugh said", "src", 0.6, -0.9)]
+    cursor = fake_async_db(monkeypatch, rows)
+    query = "What did Amanda Claybaugh say?"
+
+    result = await retriever.search_vectors_multi_async([[1.0, 0.0]], limit=8, texts=[query])
+
+    assert cursor.executed[1] == (["[1.0,0.0]"], [query], 8, 8)
+    ids = [r[0] for r in result["per_query"][0]]
+    assert len(ids) == retriever.NAME_QUERY_LIMIT
+    assert ids[:2] == [1, 42]  # lexical rank 1 ties with vector rank 1, broken by distance
+
+
+def test_is_exact_name_query():
+    assert retriever.is_exact_name_query("What did Amanda Claybaugh say?")
+    assert retriever.is_exact_name_query('news about "garber" today')
+    assert not retriever.is_exact_name_query("What is happening with the budget?")
+    assert not retriever.is_exact_name_query("What Did the president say")
+
+
+def test_preference_windows_widen_then_drop_the_bound(monkeypatch):
+    monkeypatch.setattr(retriever, "MAX_DAYS_BACK", 14)
+    assert retriever._preference_windows(2) == [2, 4, 8, 14, None]
+    assert retriever._preference_windows(None) == [None]
+
+
+@pytest.mark.asyncio
+async def test_preferences_search_widens_until_limit(monkeypatch, fake_embedder):
+    monkeypatch.setattr(retriever, "MAX_DAYS_BACK", 8)
+    cursor = fake_async_db(monkeypatch, [])
+    answers = iter([[(1, "a", "src", 0.1)], [(1, "a", "src", 0.1), (2, "b", "src", 0.2)]])
+
+    async def fetchall():
+        return next(answers)
+
+    cursor.fetchall = fetchall
+
+    results = await retriever.search_articles_by_preferences_async(["politics"], ["src"], limit=2, days_back=2)
+
+    assert [r[0] for r in results] == [1, 2]
+    windows = [params for params in cursor.executed if isinstance(params, dict)]
+    assert len(windows) == 2  # 2 days was not enough, 4 days was
+    assert windows[1]["now"] - windows[1]["cutoff"] == retriever.timedelta(days=4)
+
+
+def test_choose_filter_strategy_by_selectivity(monkeypatch):
+    monkeypatch.setattr(retriever, "FILTER_EXACT_MAX_ROWS", 1000)
+    counts = {"Harvard Gazette": 50000, "Crimson": 40000, "Rare Blog": 300}
+
+    assert retriever.choose_filter_strategy(["Rare Blog"], counts, True) == ("exact", 300, 90300)
+    assert retriever.choose_filter_strategy(["Crimson"], counts, True)[0] == "iterative"
+    assert retriever.choose_filter_strategy(["Crimson"], counts, False)[0] == "overfetch"
+    assert retriever.choose_filter_strategy(["Unknown"], counts, False)[0] == "exact"
+
+
+def test_overfetch_widens_then_falls_back_to_exact():
+    steps = retriever._filtered_steps("vec", ["Crimson"], limit=10, strategy="overfetch", matching=5000, total=100000)
+
+    statements, local = next(steps)
+    assert not local
+    assert statements[-1][1]["fetch"] == 400  # limit * 2 * total / matching
+    statements, _ = steps.send([("row",)] * 3)  # too few rows survive the filter
+    assert statements[-1][1]["fetch"] == 1000  # 1600, capped at the largest ef_search pgvector accepts
+    statements, _ = steps.send([])
+    assert "fetch" not in statements[-1][1]  # HNSW cannot return more candidates: exact scan
+    with pytest.raises(StopIteration):
+        steps.send([("row",)] * 10)
+
+
+@pytest.mark.parametrize(
+    "limit, matching, total, fetches",
+    [(10, 25000, 200000, [160, 640, 1000]), (30, 25000, 500000, [1000])],
+)
+def test_overfetch_never_sets_ef_search_above_the_pgvector_cap(limit, matching, total, fetches):
+    steps = retriever._filtered_steps(
+        "vec", ["Crimson"], limit=limit, strategy="overfetch", matching=matching, total=total
+    )
+    statements, _ = next(steps)
+    seen = []
+    while "fetch" in statements[-1][1]:
+        settings_sql, settings = statements[0]
+        assert settings_sql == retriever.ANN_SETTINGS_SQL and int(settings[0]) <= retriever.HNSW_MAX_EF_SEARCH
+        seen.append(statements[-1][1]["fetch"])
+        statements, _ = steps.send([])
+    assert seen == fetches
+    assert statements == [(retriever._filtered_exact_sql(), statements[0][1])]
+    assert retriever._ann_settings(5000)[0] == str(retriever.HNSW_MAX_EF_SEARCH)
+
+
+def test_iterative_scan_stops_when_limit_reached():
+    steps = retriever._filtered_steps("vec", ["Crimson"], limit=2, strategy="iterative", matching=50000, total=90000)
+
+    statements, local = next(steps)
+    assert local  # iterative_scan is set transaction-locally
+    assert statements[0][0] == retriever.ITERATIVE_SCAN_SQL
+    with pytest.raises(StopIteration):
+        steps.send([("a",), ("b",)])
+
+
+def test_supports_iterative_scan():
+    assert retriever._supports_iterative_scan("0.8.0")
+    assert not retriever._supports_iterative_scan("0.7.4")
+    assert not retriever._supports_iterative_scan(None)
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    cache = retriever.TTLCache(max_size=8, ttl_seconds=60)
+    monkeypatch.setattr(retriever, "_result_cache", cache)
+    monkeypatch.setattr(retriever.corpus_version, "_version", 7)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_result_cache_only_queries_misses(monkeypatch, result_cache):
+    cursor = fake_async_db(monkeypatch, [(1, 10, "art-a", "a1", "src", 0.1)])
+    await retriever.search_vectors_multi_async([[1.0, 0.0]], limit=3)
+
+    cursor.rows = [(1, 20, "art-b", "b1", "src", 0.2)]
+    result = await retriever.search_vectors_multi_async([[1.0, 0.0], [0.0, 1.0]], limit=3)
+
+    assert cursor.executed[-1] == (["[0.0,1.0]"], 3)  # the cached vector was not sent again
+    assert [r[0] for r in result["per_query"][0]] == [10]
+    assert [r[0] for r in result["per_query"][1]] == [20]
+    assert result_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_result_cache_keyed_on_corpus_version(monkeypatch, result_cache):
+    cursor = fake_async_db(monkeypatch, [(1, 10, "art-a", "a1", "src", 0.1)])
+    await retriever.search_vectors_multi_async([[1.0, 0.0]], limit=3)
+    calls = len(cursor.executed)
+
+    monkeypatch.setattr(retriever.corpus_version, "_version", None)  # unknown version: never cached
+    await retriever.search_vectors_multi_async([[1.0, 0.0]], limit=3)
+    assert len(cursor.executed) == calls + 2
+
+    monkeypatch.setattr(retriever.corpus_version, "_callbacks", [lambda v: result_cache.clear()])
+    retriever.corpus_version._set_version(8)  # loader NOTIFY
+    assert len(result_cache) == 0
+
+
+@pytest.mark.parametrize("storage, order", [("halfvec", "::halfvec(768)"), ("binary", "binary_quantize")])
+def test_quantized_storage_reranks_candidates(monkeypatch, storage, order):
+    monkeypatch.setattr(retriever, "VECTOR_STORAGE", storage)
+    monkeypatch.setattr(retriever, "_quantized_available", True)
+    monkeypatch.setattr(retriever, "RERANK_FACTOR", 4)
+    rendered = retriever._multi_vector_sql().as_string(None)
+    assert order in rendered
+    assert "ORDER BY score, id" in rendered
+    assert retriever._multi_params([[1.0, 0.0]], None, 10)[1:] == (40, 10)
+
+    retriever._disable_quantized(RuntimeError("type halfvec does not exist"))
+    assert retriever._multi_params([[1.0, 0.0]], None, 10)[1:] == (10,)
+    assert order not in retriever._multi_vector_sql().as_string(None)
+
+
+def test_matryoshka_storage_searches_truncated_column_then_falls_back(monkeypatch):
+    monkeypatch.setattr(retriever, "VECTOR_STORAGE", "matryoshka")
+    monkeypatch.setattr(retriever, "_quantized_available", True)
+    rendered = retriever._multi_vector_sql().as_string(None)
+    assert '"embedding_256" <=> l2_normalize(subvector((q.embedding)::vector, 1, 256))::vector(256)' in rendered
+    assert "ORDER BY score, id" in rendered
+
+    error = retriever.errors.UndefinedColumn('column "embedding_256" does not exist')
+    assert retriever._degrade_search(error, ["query text"]) == (True, ["query text"])
+    assert retriever._vector_storage() == "full"
@@ -0,0 +1,100 @@
+"""Tests for daily briefs shared across users (shared_briefs.py); the tables are a dict, generation is faked."""
+
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+import shared_briefs
+from shared_briefs import brief_key, brief_spec, get_or_create_audio, get_or_create_transcript
+
+DAY = date(2026, 10, 17)
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    """shared_briefs / shared_brief_audio as dicts (INSERT ... ON CONFLICT DO NOTHING semantics)."""
+    rows = {}
+
+    async def fake_fetch(sql, params):
+        return rows.get((sql, params))
+
+    async def fake_insert(sql, params):
+        if sql == shared_briefs.INSERT_SHARED_BRIEF_SQL:
+            rows.setdefault((shared_briefs.GET_SHARED_BRIEF_SQL, (params[0],)), (params[5], params[6]))
+        else:
+            rows.setdefault((shared_briefs.GET_SHARED_AUDIO_SQL, params[:2]), (params[2],))
+        return True
+
+    monkeypatch.setattr(shared_briefs, "_fetch", fake_fetch)
+    monkeypatch.setattr(shared_briefs, "_insert", fake_insert)
+    return rows
+
+
+def test_key_ignores_order_and_duplicates_but_not_date_or_corpus():
+    key = brief_key(brief_spec(["Politics", "Science"], ["Harvard Gazette"], DAY, version=7))
+    assert key == brief_key(brief_spec([" Science", "Politics", "Politics"], ["Harvard Gazette"], DAY, version=7))
+    assert key != brief_key(brief_spec(["Politics", "Science"], ["Harvard Crimson"], DAY, version=7))
+    assert key != brief_key(brief_spec(["Politics", "Science"], ["Harvard Gazette"], date(2026, 10, 18), version=7))
+    assert key != brief_key(brief_spec(["Politics", "Science"], ["Harvard Gazette"], DAY, version=8))
+    assert brief_spec(["Politics"], ["Harvard Gazette"]) is None  # corpus version unknown: no sharing
+
+
+@pytest.mark.asyncio
+async def test_users_with_the_same_preferences_share_one_generation(tables):
+    builds = {"transcript": 0, "audio": []}
+
+    async def build_transcript():
+        builds["transcript"] += 1
+        await asyncio.sleep(0.05)
+        return {"podcast_text": "Good morning...", "source_chunks": '{"chunks": []}'}
+
+    async def user_brief(voice):
+        brief = await get_or_create_transcript(spec, build_transcript)
+
+        async def build_audio():
+            builds["audio"].append(voice)
+            await asyncio.sleep(0.05)
+            return f"https://audio/{voice}.wav"
+
+        return brief, await get_or_create_audio(brief["brief_key"], voice, build_audio)
+
+    spec = brief_spec(["Science", "Politics"], ["Harvard Gazette"], DAY, version=3)
+    voices = ["en-US-Studio-O"] * 4 + ["en-US-Studio-Q"] * 2
+    results = await asyncio.gather(*(user_brief(voice) for voice in voices))
+    results.append(await user_brief("en-US-Studio-O"))  # later visit: a stored hit
+
+    assert builds["transcript"] == 1
+    assert sorted(builds["audio"]) == ["en-US-Studio-O", "en-US-Studio-Q"]
+    assert {brief["brief_key"] for brief, _ in results} == {brief_key(spec)}
+    assert {url for _, url in results} == {"https://audio/en-US-Studio-O.wav", "https://audio/en-US-Studio-Q.wav"}
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_waiter_and_is_not_stored(tables):
+    async def no_articles():
+        await asyncio.sleep(0.02)
+        raise HTTPException(status_code=404, detail="No articles found matching your preferences")
+
+    spec = brief_spec(["Sports"], ["Harvard Crimson"], DAY, version=3)
+    results = await asyncio.gather(
+        *(get_or_create_transcript(spec, no_articles) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(r, HTTPException) and r.status_code == 404 for r in results)
+    assert tables == {} and shared_briefs._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_without_sharing_every_user_builds_their_own():
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return {"podcast_text": "text", "source_chunks": None}
+
+    brief = await get_or_create_transcript(None, build)
+    assert brief["brief_key"] is None
+    assert await get_or_create_audio(None, "en-US-Studio-O", lambda: asyncio.sleep(0, "url")) == "url"
+    await get_or_create_transcript(None, build)
+    assert len(calls) == 2
@@ -0,0 +1,110 @@
+"""Tests for single-pass transcription and format negotiation (speech_to_text_client.py); STT is faked."""
+
+import io
+import struct
+import wave
+
+import pytest
+
+import speech_to_text_client as stt
+
+
+class Alternative:
+    def __init__(self, transcript, confidence):
+        self.transcript, self.confidence = transcript, confidence
+
+
+class Result:
+    def __init__(self, transcript, confidence):
+        self.alternatives = [Alternative(transcript, confidence)]
+
+
+class Response:
+    def __init__(self, results):
+        self.results = results
+
+
+class FakeSpeechClient:
+    """Recognizes only at true_rate; other rates return a low-confidence guess (like the real API)."""
+
+    def __init__(self, true_rate=48000):
+        self.true_rate = true_rate
+        self.calls = []
+
+    async def recognize(self, config, audio):
+        self.calls.append((config.encoding.name, config.sample_rate_hertz, config.audio_channel_count, audio.content))
+        if config.sample_rate_hertz == self.true_rate:
+            return Response([Result("what happened at harvard today", 0.93)])
+        return Response([Result("want hop and", 0.31)])
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeSpeechClient()
+    monkeypatch.setattr(stt, "get_speech_async_client", lambda: client)
+    return client
+
+
+def wav_bytes(sample_rate, channels=1, frames=160):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x01\x00" * frames * channels)
+    return buffer.getvalue()
+
+
+def test_detect_audio_format_headers():
+    assert stt.detect_audio_format(b"\x00\x01" * 100) is None
+    wav = wav_bytes(22050, channels=2)
+    assert stt.detect_audio_format(wav) == {
+        "encoding": "LINEAR16",
+        "sample_rate": 22050,
+        "channels": 2,
+        "data_offset": 44,
+    }
+    streaminfo = (4096).to_bytes(2, "big") * 2 + b"\x00" * 6 + ((16000 << 4) | (0 << 1)).to_bytes(3, "big")
+    flac = b"fLaC" + b"\x00\x00\x00\x22" + streaminfo + b"\x00" * 16
+    assert stt.detect_audio_format(flac) == {"encoding": "FLAC", "sample_rate": 16000, "channels": 1}
+    opus_head = b"OpusHead" + bytes([1, 2]) + b"\x00\x00" + struct.pack("<I", 24000)
+    ogg = b"OggS" + b"\x00" * 24 + opus_head + b"\x00" * 8
+    assert stt.detect_audio_format(ogg) == {"encoding": "OGG_OPUS", "sample_rate": 24000, "channels": 2}
+
+
+def test_audio_format_from_message_validates():
+    assert stt.audio_format_from_message({"type": "complete"}) is None
+    assert stt.audio_format_from_message({"sample_rate": "44100"}) == {
+        "encoding": "LINEAR16",
+        "sample_rate": 44100,
+        "channels": 1,
+    }
+    with pytest.raises(ValueError):
+        stt.audio_format_from_message({"sample_rate": 96000})
+    with pytest.raises(ValueError):
+        stt.audio_format_from_message({"sample_rate": 16000, "encoding": "MP3"})
+
+
+@pytest.mark.asyncio
+async def test_announced_format_makes_one_call(fake_client):
+    text = await stt.audio_to_text(b"\x00\x01" * 800, {"encoding": "LINEAR16", "sample_rate": 48000, "channels": 1})
+    assert text == "what happened at harvard today"
+    assert [call[1] for call in fake_client.calls] == [48000]
+
+
+@pytest.mark.asyncio
+async def test_wav_header_detected_and_stripped(fake_client):
+    fake_client.true_rate = 16000
+    wav = wav_bytes(16000)
+    assert await stt.audio_to_text(wav) == "what happened at harvard today"
+    assert len(fake_client.calls) == 1
+    encoding, rate, channels, content = fake_client.calls[0]
+    assert (encoding, rate, channels) == ("LINEAR16", 16000, 1)
+    assert content == wav[44:]
+
+
+@pytest.mark.asyncio
+async def test_legacy_pcm_probes_rates_and_keeps_most_confident(fake_client):
+    fake_client.true_rate = 44100
+    assert await stt.audio_to_text(b"\x00\x01" * 800) == "what happened at harvard today"
+    assert sorted(call[1] for call in fake_client.calls) == sorted(stt.STT_LEGACY_SAMPLE_RATES)
@@ -0,0 +1,117 @@
+"""Tests for streaming recognition while the user talks (StreamingTranscriber and /ws/chat); STT is faked."""
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+import main
+import speech_to_text_client as stt
+from audio_ingest import AudioIngestBuffer
+
+FINALIZE_LATENCY = 0.05
+FORMAT = {"encoding": "LINEAR16", "sample_rate": 48000, "channels": 1}
+
+
+async def fake_streaming_backend(audio_chunks, audio_format):
+    """Local stand-in for streaming_recognize: each "frame" is a word, recognized as it arrives."""
+    words = []
+    async for chunk in audio_chunks:
+        words.append(chunk.decode().strip())
+        yield " ".join(words), False
+    await asyncio.sleep(FINALIZE_LATENCY)  # the recognizer finalizing the last phrase
+    yield " ".join(words), True
+
+
+async def failing_backend(audio_chunks, audio_format):
+    async for _ in audio_chunks:
+        raise RuntimeError("stream reset")
+    yield "", True
+
+
+@pytest.mark.asyncio
+async def test_interim_transcripts_and_fast_final():
+    transcriber = stt.StreamingTranscriber(FORMAT, backend=fake_streaming_backend).start()
+    interims = []
+    for word in ["what", "happened", "at", "harvard"]:
+        transcriber.feed(word.encode())
+        await asyncio.sleep(0.05)  # the user still talking
+        interims.append(transcriber.pop_interim())
+    assert interims == ["what", "what happened", "what happened at", "what happened at harvard"]
+    assert transcriber.pop_interim() is None
+
+    start = time.perf_counter()
+    assert await transcriber.finish() == "what happened at harvard"
+    assert time.perf_counter() - start < FINALIZE_LATENCY + 0.1
+
+
+@pytest.mark.asyncio
+async def test_failed_session_asks_for_fallback():
+    transcriber = stt.StreamingTranscriber(FORMAT, backend=failing_backend).start()
+    transcriber.feed(b"what")
+    await asyncio.sleep(0.01)
+    transcriber.feed(b"happened")  # dropped, the session is gone
+    assert transcriber.failed
+    assert await transcriber.finish() is None
+
+
+class ScriptedWebSocket:
+    """Plays a list of client messages into /ws/chat and records what the server sends."""
+
+    def __init__(self, messages, gap=0.02):
+        self.query_params = {}
+        self.incoming = list(messages)
+        self.gap = gap
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if not self.incoming:
+            raise WebSocketDisconnect()
+        await asyncio.sleep(self.gap)
+        return {"type": "websocket.receive", **self.incoming.pop(0)}
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+@pytest.mark.asyncio
+async def test_ws_chat_transcribes_while_streaming(monkeypatch):
+    async def no_batch_stt(*args, **kwargs):
+        raise AssertionError("the streamed transcript should be used")
+
+    async def no_enhancement(text, model):
+        return None, "skipped"
+
+    questions = []
+
+    async def fake_pipeline(websocket, enhanced_queries, original_query, *args, **kwargs):
+        questions.append(original_query)
+        return True
+
+    monkeypatch.setattr(
+        main, "start_streaming_transcriber", lambda fmt: stt.StreamingTranscriber(fmt, fake_streaming_backend).start()
+    )
+    monkeypatch.setattr(main, "audio_to_text", no_batch_stt)
+    monkeypatch.setattr(main, "AudioIngestBuffer", lambda: AudioIngestBuffer(ack_interval=0))
+    monkeypatch.setattr(main, "enhance_query_with_gemini_async", no_enhancement)
+    monkeypatch.setattr(main, "_retrieve_and_generate_podcast", fake_pipeline)
+
+    websocket = ScriptedWebSocket(
+        [{"text": json.dumps({"type": "audio_format", **FORMAT})}]
+        + [{"bytes": word.encode()} for word in ["is", "the", "library", "open"]]
+        + [{"text": json.dumps({"type": "complete", "answer_cache": False})}]
+    )
+    await main.websocket_chatter(websocket)
+
+    interims = [m["text"] for m in websocket.sent if isinstance(m, dict) and m.get("status") == "interim_transcript"]
+    assert interims and interims[-1].startswith("is the library")
+    assert {"status": "transcribed", "text": "is the library open"} in websocket.sent
+    assert questions == ["is the library open"]
@@ -0,0 +1,81 @@
+"""Tests for the sentence-by-sentence streaming synthesis in text_to_speech_client.py (no Google APIs)."""
+
+import asyncio
+
+import pytest
+
+import text_to_speech_client as tts
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_json(self, data):
+        self.messages.append(data)
+
+    async def send_bytes(self, data):
+        self.messages.append(data)
+
+
+@pytest.fixture
+def fake_synthesis(monkeypatch):
+    """Synthesis takes longer for longer text, so later short segments finish first."""
+    calls = []
+
+    async def synthesize(client, text, voice, audio_config):
+        calls.append(text)
+        await asyncio.sleep(0.001 * len(text))
+        return text.encode()
+
+    monkeypatch.setattr(tts.texttospeech, "TextToSpeechAsyncClient", lambda: None)
+    monkeypatch.setattr(tts, "_synthesize_chunk_async", synthesize)
+    monkeypatch.setattr(tts, "STREAM_SEGMENT_MIN_CHARS", 30)
+    return calls
+
+
+def test_pop_segments_sends_first_sentence_alone_then_groups(monkeypatch):
+    monkeypatch.setattr(tts, "STREAM_SEGMENT_MIN_CHARS", 30)
+    segments, rest = tts._pop_segments("Hi. Harvard posted a deficit. It is the first", first=True)
+    assert segments == ["Hi."]
+    assert rest == "Harvard posted a deficit. It is the first"
+
+    segments, rest = tts._pop_segments("Short one. Then a longer sentence follows here. Tail", first=False)
+    assert segments == ["Short one. Then a longer sentence follows here."]
+    assert rest == "Tail"
+
+
+@pytest.mark.asyncio
+async def test_first_audio_is_sent_before_generation_finishes(fake_synthesis):
+    websocket = FakeWebSocket()
+    audio_before_done = []
+
+    async def deltas():
+        for piece in [
+            "Harvard posted a deficit. ",
+            "It is the first since 2020 and ",
+            "it stems from grant cuts. ",
+            "Done.",
+        ]:
+            await asyncio.sleep(0.05)
+            audio_before_done.append(any(isinstance(m, bytes) for m in websocket.messages))
+            yield piece
+
+    text, wav = await tts.sentence_stream_to_audio(deltas(), websocket, voice_name="en-US-Studio-O")
+
+    assert any(audio_before_done)
+    assert text == "Harvard posted a deficit. It is the first since 2020 and it stems from grant cuts. Done."
+    segments = [m for m in websocket.messages if isinstance(m, dict)]
+    assert [s["index"] for s in segments] == list(range(len(segments)))
+    assert " ".join(s["text"] for s in segments) == text  # spoken in order, nothing dropped
+    assert wav.startswith(b"RIFF") and wav[44:] == b"".join(s["text"].encode() for s in segments)
+
+
+@pytest.mark.asyncio
+async def test_generation_error_is_reported(fake_synthesis):
+    async def deltas():
+        yield "First sentence is fine. "
+        raise RuntimeError("stream broke")
+
+    text, wav = await tts.sentence_stream_to_audio(deltas(), FakeWebSocket())
+    assert (text, wav) == (None, None)
@@ -0,0 +1,44 @@
+"""Unit tests for ttl_cache.TTLCache."""
+
+import pytest
+
+import ttl_cache
+from ttl_cache import TTLCache
+
+
+def test_get_set_and_counters():
+    cache = TTLCache(max_size=4, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_size=2, ttl_seconds=10)
+    cache.set("a", 1)
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        TTLCache(max_size=0)
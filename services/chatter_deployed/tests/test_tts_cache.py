@@ -0,0 +1,118 @@
+"""Tests for the content-addressed TTS audio cache (tts_cache.py); GCS is faked."""
+
+import pytest
+from google.api_core import exceptions as gcs_exceptions
+from google.cloud import texttospeech
+
+import text_to_speech_client as tts
+import tts_cache
+
+AUDIO_CONFIG = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.LINEAR16, sample_rate_hertz=24000)
+
+
+def voice(name):
+    return texttospeech.VoiceSelectionParams(language_code="en-US", name=name)
+
+
+class FakeBlob:
+    def __init__(self, store, name):
+        self.store, self.name = store, name
+
+    def download_as_bytes(self):
+        if self.name not in self.store:
+            raise gcs_exceptions.NotFound("missing")
+        return self.store[self.name]
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        if if_generation_match == 0 and self.name in self.store:
+            raise gcs_exceptions.PreconditionFailed("exists")
+        self.store[self.name] = data
+
+
+class FakeBucket:
+    def __init__(self):
+        self.store = {}
+
+    def blob(self, name):
+        return FakeBlob(self.store, name)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = tts_cache.TTSAudioCache(local_max_bytes=1000, bucket_name="test-bucket", prefix="tts-cache/")
+    cache._bucket = FakeBucket()
+    monkeypatch.setattr(tts_cache, "_tts_cache", cache)
+    monkeypatch.setattr(tts_cache, "TTS_CACHE_ENABLED", True)
+    return cache
+
+
+def test_key_covers_text_voice_and_audio_config():
+    key = tts_cache.audio_cache_key("Hello.", voice("en-US-Studio-O"), AUDIO_CONFIG)
+    assert key == tts_cache.audio_cache_key("Hello.", voice("en-US-Studio-O"), AUDIO_CONFIG)
+    assert key != tts_cache.audio_cache_key("Hello!", voice("en-US-Studio-O"), AUDIO_CONFIG)
+    assert key != tts_cache.audio_cache_key("Hello.", voice("en-US-Chirp3-HD-Aoede"), AUDIO_CONFIG)
+    faster = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding.LINEAR16, sample_rate_hertz=24000, speaking_rate=1.2
+    )
+    assert key != tts_cache.audio_cache_key("Hello.", voice("en-US-Studio-O"), faster)
+
+
+def test_local_tier_is_byte_bounded_and_gcs_refills_it(cache):
+    cache.put("a", b"x" * 600)
+    cache.put("b", b"y" * 600)  # over 1000 bytes: "a" leaves the local tier
+    assert cache.get_local("a") is None
+    assert cache.get("a") == b"x" * 600  # still in GCS, copied back locally
+    assert cache.get_local("a") == b"x" * 600
+    assert cache.get("missing") is None
+    cache.put("b", b"z" * 10)  # objects are write-once; the first upload wins
+    assert cache._bucket.store["tts-cache/b.pcm"] == b"y" * 600
+    stats = cache.stats()
+    assert (stats["local_hits"], stats["remote_hits"], stats["misses"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_repeated_text_costs_no_synthesis(cache, monkeypatch):
+    calls = []
+
+    async def synthesize(client, text, voice, audio_config):
+        calls.append(text)
+        return b"\x01\x00" * 10
+
+    monkeypatch.setattr(tts.texttospeech, "TextToSpeechAsyncClient", lambda: None)
+    monkeypatch.setattr(tts, "_synthesize_chunk_async", synthesize)
+    cache._bucket = None
+    cache.bucket_name = None  # local tier only, no background upload
+
+    first = await tts.text_to_audio_bytes_async("Harvard announced new measures.", voice_name="en-US-Studio-O")
+    second = await tts.text_to_audio_bytes_async("Harvard announced new measures.", voice_name="en-US-Studio-O")
+    assert first == second
+    assert len(calls) == 1
+    await tts.text_to_audio_bytes_async("Harvard announced new measures.", voice_name="en-US-Chirp3-HD-Aoede")
+    assert len(calls) == 2  # another voice is another key
+
+
+@pytest.mark.asyncio
+async def test_stream_path_uses_the_cache(cache, monkeypatch):
+    calls = []
+
+    async def synthesize(client, text, voice, audio_config):
+        calls.append(text)
+        return b"\x01\x00" * 10
+
+    class FakeWebSocket:
+        def __init__(self):
+            self.sent = []
+
+        async def send_bytes(self, data):
+            self.sent.append(data)
+
+    monkeypatch.setattr(tts.texttospeech, "TextToSpeechAsyncClient", lambda: None)
+    monkeypatch.setattr(tts, "_synthesize_chunk_async", synthesize)
+    cache._bucket = None
+    cache.bucket_name = None  # local tier only, no background upload
+
+    for _ in range(2):
+        websocket = FakeWebSocket()
+        assert await tts.text_to_audio_stream("Not covered.", websocket) == "success"
+    assert len(calls) == 1
+    assert b"".join(websocket.sent)[44:] == b"\x01\x00" * 10
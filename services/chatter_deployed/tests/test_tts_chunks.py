@@ -0,0 +1,69 @@
+"""Tests for concurrent chunk synthesis in text_to_speech_client.py (no Google APIs)."""
+
+import asyncio
+import time
+
+import pytest
+
+import text_to_speech_client as tts
+
+CHUNK_LATENCY = 0.1
+SENTENCE = "Harvard announced another round of budget measures this week. "
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    """Each chunk takes CHUNK_LATENCY (the last one longest); the first attempt at chunk 2 fails."""
+    attempts = {}
+
+    def pcm_for(text):
+        return f"<{len(text)}>".encode()
+
+    async def synthesize_async(client, text, voice, audio_config):
+        attempts[text] = attempts.get(text, 0) + 1
+        await asyncio.sleep(CHUNK_LATENCY * (2 if text == chunks[-1] else 1))
+        return None if text == chunks[1] and attempts[text] == 1 else pcm_for(text)
+
+    text = SENTENCE * 200
+    chunks = tts._split_text_into_chunks(text, max_bytes=4000, first_max_bytes=tts.TTS_FIRST_CHUNK_MAX_BYTES)
+    monkeypatch.setattr(tts.texttospeech, "TextToSpeechAsyncClient", lambda: None)
+    monkeypatch.setattr(tts, "_synthesize_chunk_async", synthesize_async)
+    monkeypatch.setattr(tts, "TTS_RETRY_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(tts, "TTS_CONCURRENCY", len(chunks))
+    expected = tts._pcm_to_wav(tts._join_with_pauses([pcm_for(c) for c in chunks]))
+    return text, chunks, attempts, expected
+
+
+def test_first_chunk_is_small_and_nothing_is_lost():
+    text = SENTENCE * 200
+    chunks = tts._split_text_into_chunks(text, max_bytes=4000, first_max_bytes=600)
+    assert len(chunks[0].encode()) <= 600
+    assert all(len(c.encode()) <= 4000 for c in chunks)
+    assert " ".join(chunks) == text.strip()
+    # Short texts are still synthesized in one request
+    assert tts._split_text_into_chunks(SENTENCE * 3, max_bytes=4000, first_max_bytes=600) == [SENTENCE * 3]
+
+
+@pytest.mark.asyncio
+async def test_text_to_audio_bytes_async_runs_chunks_concurrently_in_order(fake_clients):
+    text, chunks, attempts, expected = fake_clients
+    assert len(chunks) >= 4
+
+    start = time.perf_counter()
+    wav = await tts.text_to_audio_bytes_async(text)
+    elapsed = time.perf_counter() - start
+
+    assert wav == expected  # order kept, 0.8s pauses between chunks
+    assert attempts[chunks[1]] == 2  # retried once
+    assert elapsed < CHUNK_LATENCY * 3.5  # slowest chunk + one retry, not the sum
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_fails_the_conversion(fake_clients, monkeypatch):
+    text, _, _, _ = fake_clients
+
+    async def always_fails(client, text, voice, audio_config):
+        return None
+
+    monkeypatch.setattr(tts, "_synthesize_chunk_async", always_fails)
+    assert await tts.text_to_audio_bytes_async(text) is None
@@ -3,13 +3,23 @@
 Converts text to audio using Google Cloud Text-to-Speech API and streams audio chunks in real-time.
 
 
+Every synthesis request first looks up the content-addressed audio cache in tts_cache.py
+(text + voice + audio config -> PCM; local LRU, then GCS).
+
 FUNCTIONS CONTAINED:
 
 async def text_to_audio_stream(text: str, websocket) -> Optional[str]:
     Stream audio chunks to WebSocket
 
-def text_to_audio_bytes(text: str) -> Optional[bytes]:
-    Convert text to audio bytes (non-streaming version for daily brief)
+async def text_to_audio_bytes_async(text: str, voice_name=None) -> Optional[bytes]:
+    Convert text to WAV bytes (non-streaming version for the daily brief)
+
+async def synthesize_chunks_in_order_async(client, chunks, voice, audio_config) -> AsyncIterator[Optional[bytes]]:
+    Concurrent chunk synthesis yielding PCM in text order (first chunk as soon as it is ready)
+
+async def sentence_stream_to_audio(text_chunks, websocket, voice_name=None) -> Tuple[Optional[str], Optional[bytes]]:
+    Synthesize streamed LLM text sentence by sentence while it is still generating and send
+    each sentence as its own WAV, preceded by an {"status": "audio_segment"} message
 
 def _pcm_to_wav(pcm_data: bytes, sample_rate: int = 24000, channels: int = 1, sample_width: int =
 2) -> bytes:
@@ -17,11 +27,63 @@ def _pcm_to_wav(pcm_data: bytes, sample_rate: int = 24000, channels: int = 1, sa
 
 """
 
+import asyncio
+import os
 import struct
 import re
-from typing import Optional, List
+import time
+from typing import AsyncIterator, List, Optional, Tuple
 from google.cloud import texttospeech
 
+import tts_cache
+from google_clients import get_tts_async_client
+
+# Long texts (daily briefs) are split into chunks under the 5000-byte request limit and the
+# chunks are synthesized concurrently (at most TTS_CONCURRENCY at a time), then reassembled
+# in order with CHUNK_PAUSE_SECONDS of silence in between. The first chunk is kept short
+# (TTS_FIRST_CHUNK_MAX_BYTES) so it is ready first. A failed chunk is retried
+# TTS_CHUNK_RETRIES times before the whole conversion fails.
+TTS_CHUNK_MAX_BYTES = 4000
+TTS_FIRST_CHUNK_MAX_BYTES = int(os.environ.get("TTS_FIRST_CHUNK_MAX_BYTES", "600"))
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "4"))
+TTS_CHUNK_RETRIES = int(os.environ.get("TTS_CHUNK_RETRIES", "2"))
+TTS_RETRY_BACKOFF_SECONDS = 0.5
+CHUNK_PAUSE_SECONDS = 0.8
+
+# Streaming mode (sentence_stream_to_audio): the first segment is sent as soon as its first
+# sentence is complete; later sentences are grouped up to STREAM_SEGMENT_MIN_CHARS so the
+# number of TTS requests stays small. At most STREAM_TTS_CONCURRENCY segments are
+# synthesized at the same time.
+STREAM_SEGMENT_MIN_CHARS = int(os.environ.get("STREAM_SEGMENT_MIN_CHARS", "200"))
+STREAM_SEGMENT_MAX_CHARS = 1500  # cut at a space if no sentence ends before this (5000-byte API limit)
+STREAM_TTS_CONCURRENCY = int(os.environ.get("STREAM_TTS_CONCURRENCY", "3"))
+AUDIO_FRAME_BYTES = 8192
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+DEFAULT_VOICE = "en-US-Chirp3-HD-Aoede"
+
+
+def _voice_and_config(
+    voice_name: Optional[str] = None,
+) -> Tuple[texttospeech.VoiceSelectionParams, texttospeech.AudioConfig]:
+    """
+    Voice and audio settings for every synthesis request.
+
+    Args:
+        voice_name: Optional voice name (e.g., "en-US-Studio-O"); DEFAULT_VOICE if not provided
+
+    Returns:
+        (voice, audio_config): LINEAR16 (PCM) at 24kHz, normal speed and pitch
+    """
+    # Studio / Chirp voices don't require the ssml_gender parameter
+    voice = texttospeech.VoiceSelectionParams(language_code="en-US", name=voice_name or DEFAULT_VOICE)
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+        sample_rate_hertz=24000,
+        speaking_rate=1.0,
+        pitch=0.0,
+    )
+    return voice, audio_config
+
 
 # text_to_audio_stream converts text to audio using Google Cloud TTS and streams audio chunks to WebSocket
 async def text_to_audio_stream(text: str, websocket, voice_name: Optional[str] = None) -> Optional[str]:
@@ -31,7 +93,7 @@ async def text_to_audio_stream(text: str, websocket, voice_name: Optional[str] =
     Args:
         text: The podcast text to convert to audio (narrated EXACTLY as written)
         websocket: WebSocket connection to stream audio chunks to frontend
-        voice_name: Optional voice name (e.g., "en-US-Studio-O"). Defaults to "en-US-Studio-O" if not provided.
+        voice_name: Optional voice name (e.g., "en-US-Studio-O"). Defaults to DEFAULT_VOICE if not provided.
 
     Returns:
         Success message or None if failed
@@ -39,46 +101,25 @@ async def text_to_audio_stream(text: str, websocket, voice_name: Optional[str] =
     try:
         print(f"[cloud-tts] Starting text-to-audio conversion, text length: {len(text)} chars")
 
-        # Initialize Google Cloud Text-to-Speech client
+        # Shared Google Cloud Text-to-Speech client (asyncio transport, so synthesis
+        # does not block the event loop serving the other websockets); repeated text is
+        # served from the content-addressed audio cache (tts_cache.py) instead
         # Uses ADC (Application Default Credentials) - no API key needed
-        client = texttospeech.TextToSpeechClient()
-
-        # Configure the synthesis request
-        synthesis_input = texttospeech.SynthesisInput(text=text)
+        client = get_tts_async_client()
 
-        # Voice configuration - using a natural-sounding English voice
-        # Default to en-US-Chirp3-HD-Aoede if no voice preference is provided
-        default_voice = "en-US-Chirp3-HD-Aoede"
-        selected_voice = voice_name if voice_name else default_voice
-        print(f"[cloud-tts] Using voice: {selected_voice}")
-        
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="en-US",
-            name=selected_voice  # High-quality Studio voice (natural podcaster sound)
-            # Note: Studio voices don't require ssml_gender parameter
-        )
-
-        # Audio configuration - LINEAR16 (PCM) format at 24kHz
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
-            sample_rate_hertz=24000,
-            speaking_rate=1.0,  # Normal speaking speed
-            pitch=0.0  # Normal pitch
-        )
+        # Voice configuration - using a natural-sounding English voice (DEFAULT_VOICE if none)
+        voice, audio_config = _voice_and_config(voice_name)
+        print(f"[cloud-tts] Using voice: {voice.name}")
 
         print("[cloud-tts] Sending text to Google Cloud Text-to-Speech API...")
 
-        # Perform the text-to-speech request
-        response = client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
-        )
-
-        print(f"[cloud-tts] Received audio data: {len(response.audio_content)} bytes")
+        # Perform the text-to-speech request (served from the audio cache for repeated text)
+        pcm_data = await _synthesize_cached_async(client, text, voice, audio_config)
+        if not pcm_data:
+            return None
 
         # The response contains raw PCM audio data
-        pcm_data = response.audio_content
+        print(f"[cloud-tts] Received audio data: {len(pcm_data)} bytes")
 
         # Convert PCM to WAV format
         print("[cloud-tts] Converting PCM to WAV format...")
@@ -148,13 +189,15 @@ def _pcm_to_wav(
     return wav_header + pcm_data
 
 
-def _split_text_into_chunks(text: str, max_bytes: int = 4000) -> List[str]:
+def _split_text_into_chunks(text: str, max_bytes: int = 4000, first_max_bytes: Optional[int] = None) -> List[str]:
     """
     Split text into chunks at sentence boundaries, ensuring each chunk is under max_bytes.
     
     Args:
         text: The text to split
         max_bytes: Maximum bytes per chunk (default 4000 to stay under 5000 limit)
+        first_max_bytes: Smaller limit for the first chunk when the text has to be split
+            (a single longer sentence still becomes the first chunk on its own)
     
     Returns:
         List of text chunks
@@ -178,7 +221,8 @@ def _split_text_into_chunks(text: str, max_bytes: int = 4000) -> List[str]:
         
         # Check if adding this sentence would exceed the limit
         test_chunk = current_chunk + sentence
-        if len(test_chunk.encode('utf-8')) > max_bytes and current_chunk:
+        limit = first_max_bytes if first_max_bytes and not chunks else max_bytes
+        if len(test_chunk.encode('utf-8')) > limit and current_chunk:
             # Save current chunk and start new one
             chunks.append(current_chunk.strip())
             current_chunk = sentence
@@ -211,122 +255,256 @@ def _generate_silence(duration_seconds: float = 0.5, sample_rate: int = 24000) -
     return silence
 
 
-def _synthesize_chunk(client: texttospeech.TextToSpeechClient, text: str, voice: texttospeech.VoiceSelectionParams, audio_config: texttospeech.AudioConfig) -> Optional[bytes]:
+def _join_with_pauses(pcm_chunks: List[bytes]) -> bytes:
+    """Concatenate PCM chunks in order with CHUNK_PAUSE_SECONDS of silence between them."""
+    silence = _generate_silence(duration_seconds=CHUNK_PAUSE_SECONDS, sample_rate=24000)
+    return silence.join(pcm_chunks)
+
+
+async def _synthesize_chunk_async(
+    client: texttospeech.TextToSpeechAsyncClient,
+    text: str,
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+) -> Optional[bytes]:
     """
     Synthesize a single chunk of text to PCM audio bytes.
-    
-    Args:
-        client: TTS client
-        text: Text chunk to synthesize
-        voice: Voice configuration
-        audio_config: Audio configuration
-    
+
     Returns:
         PCM audio bytes or None if failed
     """
     try:
         synthesis_input = texttospeech.SynthesisInput(text=text)
-        response = client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
-        )
+        response = await client.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
         return response.audio_content
     except Exception as e:
         print(f"[cloud-tts-error] Failed to synthesize chunk: {e}")
         return None
 
 
-def text_to_audio_bytes(text: str, voice_name: Optional[str] = None) -> Optional[bytes]:
+async def _synthesize_chunk_with_retry_async(
+    client: texttospeech.TextToSpeechAsyncClient,
+    text: str,
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+) -> Optional[bytes]:
+    """_synthesize_chunk_async, retried TTS_CHUNK_RETRIES times with exponential backoff."""
+    for attempt in range(TTS_CHUNK_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(TTS_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            print(f"[cloud-tts] Retrying chunk ({attempt}/{TTS_CHUNK_RETRIES})...")
+        pcm = await _synthesize_chunk_async(client, text, voice, audio_config)
+        if pcm:
+            return pcm
+    return None
+
+
+async def _synthesize_cached_async(
+    client: texttospeech.TextToSpeechAsyncClient,
+    text: str,
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+) -> Optional[bytes]:
+    """_synthesize_chunk_with_retry_async behind the content-addressed audio cache (tts_cache.py).
+
+    The GCS write of a new entry happens in the background.
     """
-    Convert text to audio bytes (non-streaming version for daily brief).
-    Handles long text by splitting into chunks and concatenating the audio.
-    
+    if not tts_cache.TTS_CACHE_ENABLED:
+        return await _synthesize_chunk_with_retry_async(client, text, voice, audio_config)
+    cache = tts_cache.get_tts_cache()
+    key = tts_cache.audio_cache_key(text, voice, audio_config)
+    pcm = await tts_cache.get_async(cache, key)
+    if pcm is None:
+        pcm = await _synthesize_chunk_with_retry_async(client, text, voice, audio_config)
+        if pcm:
+            tts_cache.put_background(cache, key, pcm)
+    return pcm
+
+
+async def synthesize_chunks_in_order_async(
+    client: texttospeech.TextToSpeechAsyncClient,
+    chunks: List[str],
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+) -> AsyncIterator[Optional[bytes]]:
+    """
+    Synthesize all chunks concurrently (at most TTS_CONCURRENCY at once) and yield their PCM
+    in text order, each as soon as it and all chunks before it are done.
+
+    Yields None for a chunk that failed after retries; the remaining work is cancelled when
+    the consumer stops iterating.
+    """
+    limiter = asyncio.Semaphore(max(TTS_CONCURRENCY, 1))
+
+    async def synthesize(chunk: str) -> Optional[bytes]:
+        async with limiter:
+            return await _synthesize_cached_async(client, chunk, voice, audio_config)
+
+    # Tasks are created in order, so the semaphore hands out slots to the earliest chunks first
+    tasks = [asyncio.create_task(synthesize(chunk)) for chunk in chunks]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def text_to_audio_bytes_async(text: str, voice_name: Optional[str] = None) -> Optional[bytes]:
+    """
+    Convert text to audio bytes (non-streaming version for the daily brief).
+    Long text is split into chunks that are synthesized concurrently
+    (synthesize_chunks_in_order_async) and joined in order with CHUNK_PAUSE_SECONDS pauses.
+
     Args:
         text: The podcast text to convert to audio
-        voice_name: Optional voice name (e.g., "en-US-Studio-O"). Defaults to "en-US-Studio-O" if not provided.
-    
+        voice_name: Optional voice name. Defaults to DEFAULT_VOICE if not provided.
+
     Returns:
         WAV audio file as bytes, or None if conversion fails
     """
     try:
-        text_bytes = len(text.encode('utf-8'))
-        print(f"[cloud-tts] Starting text-to-audio conversion, text length: {len(text)} chars ({text_bytes} bytes)")
-        
-        # Initialize Google Cloud Text-to-Speech client
-        # Uses ADC (Application Default Credentials) - no API key needed
-        client = texttospeech.TextToSpeechClient()
-        
-        # Voice configuration - using a natural-sounding English voice
-        # Default to en-US-Chirp3-HD-Aoede if no voice preference is provided
-        default_voice = "en-US-Chirp3-HD-Aoede"
-        selected_voice = voice_name if voice_name else default_voice
-        print(f"[cloud-tts] Using voice: {selected_voice}")
-        
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="en-US",
-            name=selected_voice  # High-quality Studio voice (natural podcaster sound)
-            # Note: Studio voices don't require ssml_gender parameter
-        )
-        
-        # Audio configuration - LINEAR16 (PCM) format at 24kHz
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
-            sample_rate_hertz=24000,
-            speaking_rate=1.0,  # Normal speaking speed
-            pitch=0.0  # Normal pitch
+        print(f"[cloud-tts] Starting text-to-audio conversion, text length: {len(text)} chars")
+        client = get_tts_async_client()
+        voice, audio_config = _voice_and_config(voice_name)
+        print(f"[cloud-tts] Using voice: {voice.name}")
+
+        chunks = _split_text_into_chunks(
+            text, max_bytes=TTS_CHUNK_MAX_BYTES, first_max_bytes=TTS_FIRST_CHUNK_MAX_BYTES
         )
-        
-        # Check if text needs to be chunked (5000 byte limit, use 4000 to be safe)
-        chunks = _split_text_into_chunks(text, max_bytes=4000)
-        
-        if len(chunks) == 1:
-            # Single chunk - use simple path
-            print("[cloud-tts] Sending text to Google Cloud Text-to-Speech API...")
-            synthesis_input = texttospeech.SynthesisInput(text=text)
-            response = client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config
-            )
-            pcm_data = response.audio_content
-            print(f"[cloud-tts] Received audio data: {len(pcm_data)} bytes")
-        else:
-            # Multiple chunks - synthesize each and concatenate with pauses
-            print(f"[cloud-tts] Synthesizing {len(chunks)} chunks...")
-            pcm_chunks = []
-            pause_duration = 0.8  # Pause duration in seconds between chunks
-            
-            for i, chunk in enumerate(chunks, 1):
-                print(f"[cloud-tts] Synthesizing chunk {i}/{len(chunks)} ({len(chunk.encode('utf-8'))} bytes)...")
-                chunk_pcm = _synthesize_chunk(client, chunk, voice, audio_config)
-                
+        start = time.perf_counter()
+        pcm_chunks = []
+        ordered = synthesize_chunks_in_order_async(client, chunks, voice, audio_config)
+        try:
+            async for chunk_pcm in ordered:
                 if not chunk_pcm:
-                    print(f"[cloud-tts-error] Failed to synthesize chunk {i}")
+                    print(f"[cloud-tts-error] Failed to synthesize chunk {len(pcm_chunks) + 1}")
                     return None
-                
                 pcm_chunks.append(chunk_pcm)
-                print(f"[cloud-tts] Chunk {i} synthesized: {len(chunk_pcm)} bytes")
-                
-                # Add pause after each chunk (except the last one)
-                if i < len(chunks):
-                    silence = _generate_silence(duration_seconds=pause_duration, sample_rate=24000)
-                    pcm_chunks.append(silence)
-                    print(f"[cloud-tts] Added {pause_duration}s pause after chunk {i}")
-            
-            # Concatenate all PCM chunks (including pauses)
-            pcm_data = b''.join(pcm_chunks)
-            print(f"[cloud-tts] Concatenated {len(chunks)} chunks with pauses: {len(pcm_data)} total bytes")
-        
-        # Convert PCM to WAV format
-        print("[cloud-tts] Converting PCM to WAV format...")
+        finally:
+            await ordered.aclose()
+        print(f"[cloud-tts] Synthesized {len(chunks)} chunks in {time.perf_counter() - start:.2f}s")
+
+        pcm_data = _join_with_pauses(pcm_chunks)
         wav_data = _pcm_to_wav(pcm_data, sample_rate=24000)
-        
         print(f"[cloud-tts] Converted to WAV: {len(pcm_data)} bytes PCM -> {len(wav_data)} bytes WAV")
         return wav_data
-        
+
     except Exception as e:
         print(f"[cloud-tts-error] Failed to convert text to audio: {e}")
         import traceback
+
         traceback.print_exc()
         return None
+
+
+def _pop_segments(buffer: str, first: bool) -> Tuple[List[str], str]:
+    """
+    Cut the complete sentences off a growing text buffer.
+
+    Args:
+        buffer: Text generated so far that has not been synthesized yet
+        first: True while nothing has been sent (the first segment is a single sentence)
+
+    Returns:
+        (segments ready for TTS, remaining text)
+    """
+    segments = []
+    start = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        candidate = buffer[start : match.end()].strip()
+        if (first and not segments) or len(candidate) >= STREAM_SEGMENT_MIN_CHARS:
+            segments.append(candidate)
+            start = match.end()
+    rest = buffer[start:]
+    if len(rest) > STREAM_SEGMENT_MAX_CHARS:
+        cut = rest.rfind(" ", 0, STREAM_SEGMENT_MAX_CHARS)
+        cut = cut if cut > 0 else STREAM_SEGMENT_MAX_CHARS
+        segments.append(rest[:cut].strip())
+        rest = rest[cut:]
+    return segments, rest
+
+
+async def sentence_stream_to_audio(
+    text_chunks: AsyncIterator[str], websocket, voice_name: Optional[str] = None
+) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    Turn streamed LLM text into audio while it is still being generated.
+
+    Text is cut at sentence boundaries; each segment is synthesized as soon as it is complete
+    (up to STREAM_TTS_CONCURRENCY at once) and sent in order as a self-contained WAV,
+    preceded by {"status": "audio_segment", "index": i, "text": segment}. Time to first
+    audio is one sentence of generation plus one short synthesis instead of the whole answer.
+
+    Args:
+        text_chunks: Async iterator of text deltas (e.g. helpers.stream_gemini_api_async)
+        websocket: WebSocket connection to stream audio segments to
+        voice_name: Optional voice name. Defaults to DEFAULT_VOICE if not provided.
+
+    Returns:
+        (full text, WAV of the whole answer). The text is None if generation failed, the
+        WAV is None if generation or synthesis failed (segments already sent stay sent).
+    """
+    client = get_tts_async_client()
+    voice, audio_config = _voice_and_config(voice_name)
+    print(f"[cloud-tts] Streaming synthesis with voice: {voice.name}")
+    limiter = asyncio.Semaphore(max(STREAM_TTS_CONCURRENCY, 1))
+    # (segment text, synthesis task) in speaking order; None marks the end of the text
+    pending: "asyncio.Queue[Optional[Tuple[str, asyncio.Task]]]" = asyncio.Queue()
+    parts: List[str] = []
+
+    async def synthesize(segment: str) -> Optional[bytes]:
+        async with limiter:
+            return await _synthesize_cached_async(client, segment, voice, audio_config)
+
+    def schedule(segment: str) -> None:
+        if segment:
+            pending.put_nowait((segment, asyncio.create_task(synthesize(segment))))
+
+    async def produce() -> None:
+        buffer = ""
+        first = True
+        try:
+            async for delta in text_chunks:
+                parts.append(delta)
+                buffer += delta
+                segments, buffer = _pop_segments(buffer, first)
+                for segment in segments:
+                    schedule(segment)
+                    first = False
+            schedule(buffer.strip())
+        finally:
+            pending.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    pcm_segments: List[bytes] = []
+    try:
+        index = 0
+        while (item := await pending.get()) is not None:
+            segment, task = item
+            pcm = await task
+            if not pcm:
+                print(f"[cloud-tts-error] Failed to synthesize segment {index}")
+                return "".join(parts), None
+            wav = _pcm_to_wav(pcm, sample_rate=24000)
+            await websocket.send_json({"status": "audio_segment", "index": index, "text": segment})
+            for i in range(0, len(wav), AUDIO_FRAME_BYTES):
+                await websocket.send_bytes(wav[i : i + AUDIO_FRAME_BYTES])
+            pcm_segments.append(pcm)
+            index += 1
+        await producer  # re-raises a generation error
+    except Exception as e:
+        print(f"[cloud-tts-error] Streaming synthesis failed: {e}")
+        return None, None
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                item[1].cancel()
+
+    text = "".join(parts).strip()
+    if not pcm_segments:
+        return text or None, None
+    print(f"[cloud-tts] Streamed {len(pcm_segments)} audio segments")
+    return text, _pcm_to_wav(b"".join(pcm_segments), sample_rate=24000)
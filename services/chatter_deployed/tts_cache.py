@@ -0,0 +1,228 @@
+"""
+Content-addressed cache of synthesized speech (used by text_to_speech_client.py)
+
+Every TTS request is one chunk or sentence of text with a voice and an audio config, and the
+PCM it returns is fully determined by those. The cache key is the SHA-256 of all three, so
+the same sentence in two briefs, a repeated answer, or a transcript re-synthesized after a
+voice change back to a voice used before costs a storage read instead of a TTS round trip.
+
+Two tiers:
+1. Local: byte-bounded LRU per worker (TTS_CACHE_LOCAL_MAX_BYTES)
+2. GCS: one object per key under gs://AUDIO_BUCKET/TTS_CACHE_GCS_PREFIX, shared by all pods
+   and kept across restarts. Objects are written once (if_generation_match=0); add a bucket
+   lifecycle rule on the prefix to expire them.
+
+A GCS hit is copied into the local tier. Cache errors are logged and treated as misses, so
+TTS keeps working without the bucket.
+
+CLASSES CONTAINED:
+
+class TTSAudioCache:
+    Local LRU + optional GCS tier, get/put by key, with hit counters per tier
+
+FUNCTIONS CONTAINED:
+
+audio_cache_key(text, voice, audio_config) -> str
+    SHA-256 content address of one synthesis request
+
+get_tts_cache() -> TTSAudioCache
+    Process-wide cache instance
+
+async get_async(cache, key) / put_background(cache, key, pcm)
+    cache.get / cache.put from the event loop (GCS calls on the blocking executor; the
+    write does not delay the caller)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from google.api_core import exceptions as gcs_exceptions
+
+from async_utils import run_blocking
+from google_clients import get_storage_client
+
+TTS_CACHE_ENABLED = os.environ.get("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_CACHE_LOCAL_MAX_BYTES = int(os.environ.get("TTS_CACHE_LOCAL_MAX_BYTES", str(128 * 1024 * 1024)))
+TTS_CACHE_GCS_ENABLED = os.environ.get("TTS_CACHE_GCS_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_CACHE_GCS_PREFIX = os.environ.get("TTS_CACHE_GCS_PREFIX", "tts-cache/")
+AUDIO_BUCKET = os.environ.get("AUDIO_BUCKET", "newsjuice-123456-audio-bucket")
+# Bump to invalidate every cached entry (e.g. after a TTS model upgrade changes the voices)
+TTS_CACHE_KEY_VERSION = 1
+
+_pending_writes: Set[asyncio.Future] = set()
+
+
+def audio_cache_key(text: str, voice, audio_config) -> str:
+    """Content address of a synthesis request: SHA-256 over text, voice and audio config."""
+    payload = json.dumps(
+        {
+            "v": TTS_CACHE_KEY_VERSION,
+            "text": text,
+            "voice": type(voice).to_dict(voice),
+            "audio_config": type(audio_config).to_dict(audio_config),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """Two-tier (local LRU, GCS) cache of PCM audio keyed by audio_cache_key."""
+
+    def __init__(self, local_max_bytes: int = 128 * 1024 * 1024, bucket_name: Optional[str] = None, prefix: str = ""):
+        """
+        Args:
+            local_max_bytes: Total PCM bytes kept in memory (least recently used dropped first)
+            bucket_name: GCS bucket for the shared tier (None = local tier only)
+            prefix: Object name prefix inside the bucket
+        """
+        self.local_max_bytes = local_max_bytes
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self._local: "OrderedDict[str, bytes]" = OrderedDict()
+        self._local_bytes = 0
+        self._lock = threading.Lock()
+        self._bucket = None
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    self._bucket = get_storage_client().bucket(self.bucket_name)
+        return self._bucket
+
+    def _blob(self, key: str):
+        return self._get_bucket().blob(f"{self.prefix}{key}.pcm")
+
+    def _put_local(self, key: str, pcm: bytes) -> None:
+        if len(pcm) > self.local_max_bytes:
+            return
+        with self._lock:
+            previous = self._local.pop(key, None)
+            if previous is not None:
+                self._local_bytes -= len(previous)
+            self._local[key] = pcm
+            self._local_bytes += len(pcm)
+            while self._local_bytes > self.local_max_bytes:
+                _, dropped = self._local.popitem(last=False)
+                self._local_bytes -= len(dropped)
+
+    def get_local(self, key: str) -> Optional[bytes]:
+        """Local tier only (never blocks on the network)."""
+        with self._lock:
+            pcm = self._local.get(key)
+            if pcm is not None:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+            return pcm
+
+    def get_remote(self, key: str) -> Optional[bytes]:
+        """GCS tier (blocking); a hit is copied into the local tier."""
+        if not self.bucket_name:
+            self.misses += 1
+            return None
+        try:
+            pcm = self._blob(key).download_as_bytes()
+        except gcs_exceptions.NotFound:
+            self.misses += 1
+            return None
+        except Exception as e:
+            print(f"[tts-cache-error] GCS read failed for {key[:12]}: {e}")
+            self.errors += 1
+            self.misses += 1
+            return None
+        self.remote_hits += 1
+        self._put_local(key, pcm)
+        return pcm
+
+    def get(self, key: str) -> Optional[bytes]:
+        """PCM for key from the local tier, then GCS; None on a miss."""
+        pcm = self.get_local(key)
+        return pcm if pcm is not None else self.get_remote(key)
+
+    def put_local(self, key: str, pcm: bytes) -> None:
+        self._put_local(key, pcm)
+
+    def put_remote(self, key: str, pcm: bytes) -> None:
+        """Write the GCS object unless it already exists (blocking)."""
+        if not self.bucket_name:
+            return
+        try:
+            self._blob(key).upload_from_string(pcm, content_type="application/octet-stream", if_generation_match=0)
+        except gcs_exceptions.PreconditionFailed:
+            pass  # another pod stored the same content first
+        except Exception as e:
+            print(f"[tts-cache-error] GCS write failed for {key[:12]}: {e}")
+            self.errors += 1
+
+    def put(self, key: str, pcm: bytes) -> None:
+        """Store PCM in both tiers."""
+        if not pcm:
+            return
+        self._put_local(key, pcm)
+        self.put_remote(key, pcm)
+
+    def clear(self) -> None:
+        """Drop the local tier. Counters and GCS objects are kept."""
+        with self._lock:
+            self._local.clear()
+            self._local_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return tier sizes and hit counters as a plain dict (for /metrics and logs)."""
+        with self._lock:
+            lookups = self.local_hits + self.remote_hits + self.misses
+            return {
+                "enabled": TTS_CACHE_ENABLED,
+                "gcs_bucket": self.bucket_name,
+                "local_entries": len(self._local),
+                "local_bytes": self._local_bytes,
+                "local_max_bytes": self.local_max_bytes,
+                "local_hits": self.local_hits,
+                "remote_hits": self.remote_hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round((self.local_hits + self.remote_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+async def get_async(cache: TTSAudioCache, key: str) -> Optional[bytes]:
+    """cache.get without blocking the event loop (GCS read on the executor, local hits inline)."""
+    pcm = cache.get_local(key)
+    if pcm is not None:
+        return pcm
+    if not cache.bucket_name:
+        return cache.get_remote(key)  # counts the miss, no I/O
+    return await run_blocking(cache.get_remote, key)
+
+
+def put_background(cache: TTSAudioCache, key: str, pcm: bytes) -> None:
+    """cache.put from the event loop: local tier now, GCS write as a background task."""
+    if not pcm:
+        return
+    cache.put_local(key, pcm)
+    if cache.bucket_name:
+        task = asyncio.ensure_future(run_blocking(cache.put_remote, key, pcm))
+        _pending_writes.add(task)  # keep a reference until the upload is done
+        task.add_done_callback(_pending_writes.discard)
+
+
+_tts_cache = TTSAudioCache(
+    local_max_bytes=TTS_CACHE_LOCAL_MAX_BYTES,
+    bucket_name=AUDIO_BUCKET if TTS_CACHE_GCS_ENABLED else None,
+    prefix=TTS_CACHE_GCS_PREFIX,
+)
+
+
+def get_tts_cache() -> TTSAudioCache:
+    """Process-wide TTS audio cache (local tier per uvicorn worker, GCS tier shared)."""
+    return _tts_cache
@@ -1,97 +1,160 @@
-"Database functions for user mgmt"
+"Database functions for user mgmt (connections come from the shared pool in db_pool.py)"
 
-import os
-import psycopg
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Any
 import json
 from datetime import datetime
 
-DB_URL = os.environ.get("DATABASE_URL")
-if not DB_URL:
-    raise RuntimeError("DATABASE_URL environment variable not set")
+import psycopg
+
+from db_pool import async_connection, PREPARE_HOT_QUERIES
+
+# The functions are async (*_async) so a slow query never blocks the FastAPI event loop.
+
+CREATE_USER_SQL = "INSERT INTO users (user_id, email) VALUES (%s, %s) " "ON CONFLICT (user_id) DO NOTHING"
+GET_PREFERENCES_SQL = "SELECT preference_key, preference_value FROM user_preferences " "WHERE user_id = %s"
+GET_PREFERENCE_VALUE_SQL = "SELECT preference_value FROM user_preferences WHERE user_id = %s AND preference_key = %s"
+UPDATE_PREFERENCE_VALUE_SQL = (
+    "UPDATE user_preferences SET preference_value = %s " "WHERE user_id = %s AND preference_key = %s"
+)
+UPSERT_PREFERENCE_SQL = (
+    "INSERT INTO user_preferences (user_id, preference_key, "
+    "preference_value, updated_at) VALUES (%s, %s, %s, NOW()) "
+    "ON CONFLICT (user_id, preference_key) DO UPDATE SET "
+    "preference_value = EXCLUDED.preference_value, updated_at = NOW()"
+)
+SAVE_AUDIO_HISTORY_SQL = """INSERT INTO audio_history (user_id, question_text, podcast_text, audio_url, source_chunks)
+                       VALUES (%s, %s, %s, %s, %s)"""
+# Daily briefs shared by users with the same preferences (shared_briefs.py, migration 009) keep
+# their text and chunks in shared_briefs; the history row only references them by brief_key
+SAVE_SHARED_AUDIO_HISTORY_SQL = """INSERT INTO audio_history (user_id, question_text, podcast_text, audio_url,
+                       source_chunks, brief_key)
+                       VALUES (%s, %s, %s, %s, %s, %s)"""
+GET_AUDIO_HISTORY_SQL = """SELECT h.id, h.question_text, COALESCE(h.podcast_text, b.podcast_text), h.audio_url,
+                       COALESCE(h.source_chunks, b.source_chunks), h.created_at, h.brief_key
+                       FROM audio_history h
+                       LEFT JOIN shared_briefs b ON b.brief_key = h.brief_key
+                       WHERE h.user_id = %s
+                       ORDER BY h.created_at DESC
+                       LIMIT %s"""
+# Before migration 009
+LEGACY_GET_AUDIO_HISTORY_SQL = """SELECT id, question_text, podcast_text, audio_url, source_chunks, created_at, NULL
+                       FROM audio_history
+                       WHERE user_id = %s
+                       ORDER BY created_at DESC
+                       LIMIT %s"""
+# Get max updated_at for topics or sources (the preference keys that affect daily brief)
+GET_PREFERENCES_LAST_UPDATED_SQL = """SELECT MAX(updated_at)
+                       FROM user_preferences
+                       WHERE user_id = %s
+                       AND preference_key IN ('topics', 'sources')"""
+GET_VOICE_PREFERENCE_LAST_UPDATED_SQL = """SELECT updated_at
+                       FROM user_preferences
+                       WHERE user_id = %s
+                       AND preference_key = 'voice_preference'"""
+# Users with topics and sources set (what a daily brief needs), optionally only those who used
+# the app in the last N days; used by the overnight batch in batch_briefs.py
+GET_DAILY_BRIEF_USERS_SQL = """SELECT t.user_id, g.preference_value, GREATEST(t.updated_at, s.updated_at)
+                       FROM user_preferences t
+                       JOIN user_preferences s ON s.user_id = t.user_id AND s.preference_key = 'sources'
+                       LEFT JOIN user_preferences g
+                           ON g.user_id = t.user_id AND g.preference_key = 'last_daily_brief_generated'
+                       WHERE t.preference_key = 'topics'
+                       AND COALESCE(t.preference_value, '[]') NOT IN ('', '[]')
+                       AND COALESCE(s.preference_value, '[]') NOT IN ('', '[]')
+                       AND (%s <= 0 OR EXISTS (
+                           SELECT 1 FROM audio_history h
+                           WHERE h.user_id = t.user_id AND h.created_at > NOW() - make_interval(days => %s)))
+                       ORDER BY t.user_id"""
+
+
+def _preference_value_str(value: Any) -> str:
+    # Convert lists/dicts to JSON strings
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    return str(value)
 
 
-def create_user(user_id: str, email: str) -> bool:
-    "create new user in database"
+def _history_row_to_dict(row) -> Dict:
+    return {
+        "id": row[0],
+        "question_text": row[1],
+        "podcast_text": row[2],
+        "audio_url": row[3],
+        "source_chunks": row[4],  # NEW: Include source chunks (JSONB/string)
+        "created_at": row[5].isoformat() if row[5] else None,
+        "brief_key": row[6],
+    }
+
+
+_history_sql = GET_AUDIO_HISTORY_SQL
+
+
+def _use_legacy_history_sql(e: Exception) -> None:
+    global _history_sql
+    print(f"[db-warning] shared_briefs not migrated (migration 009), reading history without it: {e}")
+    _history_sql = LEGACY_GET_AUDIO_HISTORY_SQL
+
+
+def _timestamp_or_none(result) -> Optional[str]:
+    if result and result[0]:
+        return result[0].isoformat()
+    return None
+
+
+def _brief_user_row_to_dict(row) -> Dict:
+    return {
+        "user_id": row[0],
+        "last_daily_brief_generated": row[1],
+        "preferences_updated": row[2].isoformat() if row[2] else None,
+    }
+
+
+async def create_user_async(user_id: str, email: str) -> bool:
+    "create new user in database (async)"
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    ("INSERT INTO users (user_id, email) VALUES (%s, %s) " "ON CONFLICT (user_id) DO NOTHING"),
-                    (user_id, email),
-                )
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(CREATE_USER_SQL, (user_id, email))
                 print(f"[db] User created: {user_id}")
                 return True
     except Exception as e:
         print(f"[db-error] Failed to create user: {e}")
         return False
 
-#user_db.py function, get_user_preferences. This literally grabs the user_prefernece
-#values from the user_preferences table in our CloudSQL db. 
-def get_user_preferences(user_id: str) -> Dict[str, str]:
-    "Get all preferences for a user."
+
+#user_db.py function, get_user_preferences_async. This literally grabs the user_prefernece
+#values from the user_preferences table in our CloudSQL db.
+async def get_user_preferences_async(user_id: str) -> Dict[str, str]:
+    "Get all preferences for a user (async)."
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    ("SELECT preference_key, preference_value FROM user_preferences " "WHERE user_id = %s"),
-                    (user_id,),
-                )
-                preferences = {}
-                for row in cur.fetchall():
-                    key, value = row
-                    preferences[key] = value
-                return preferences
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(GET_PREFERENCES_SQL, (user_id,), prepare=PREPARE_HOT_QUERIES)
+                return {key: value for key, value in await cur.fetchall()}
     except Exception as e:
         print(f"[db-error] Failed to get preferences: {e}")
         return {}
 
+
 #save user preferences which inserts the user preferred topics + sources into the user_preferences table
 
-def save_user_preferences(user_id: str, preferences: Dict[str, str]) -> bool:
-    """Save user preferences (upsert).
-    
+async def save_user_preferences_async(user_id: str, preferences: Dict[str, str]) -> bool:
+    """Save user preferences (upsert, async).
+
     Only updates updated_at timestamp if the value actually changed.
     This prevents false positives when only voice preference changes.
     """
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
-            with conn.cursor() as cur:
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
                 for key, value in preferences.items():
-                    # Convert lists/dicts to JSON strings
-                    if isinstance(value, (list, dict)):
-                        value = json.dumps(value)
-                    
-                    value_str = str(value)
-                    
-                    # Check if value actually changed
-                    cur.execute(
-                        "SELECT preference_value FROM user_preferences WHERE user_id = %s AND preference_key = %s",
-                        (user_id, key)
-                    )
-                    existing = cur.fetchone()
-                    
-                    # Only update timestamp if value changed
+                    value_str = _preference_value_str(value)
+                    await cur.execute(GET_PREFERENCE_VALUE_SQL, (user_id, key), prepare=PREPARE_HOT_QUERIES)
+                    existing = await cur.fetchone()
                     if existing and existing[0] == value_str:
-                        # Value unchanged, don't update timestamp - use UPDATE without changing updated_at
-                        cur.execute(
-                            (
-                                "UPDATE user_preferences SET preference_value = %s "
-                                "WHERE user_id = %s AND preference_key = %s"
-                            ),
-                            (value_str, user_id, key),
-                        )
+                        await cur.execute(UPDATE_PREFERENCE_VALUE_SQL, (value_str, user_id, key))
                     else:
-                        # Value changed or new preference, update timestamp
-                        cur.execute(
-                            (
-                                "INSERT INTO user_preferences (user_id, preference_key, "
-                                "preference_value, updated_at) VALUES (%s, %s, %s, NOW()) "
-                                "ON CONFLICT (user_id, preference_key) DO UPDATE SET "
-                                "preference_value = EXCLUDED.preference_value, updated_at = NOW()"
-                            ),
-                            (user_id, key, value_str),
-                        )
+                        await cur.execute(UPSERT_PREFERENCE_SQL, (user_id, key, value_str))
                 print(f"[db] Preferences saved for user: {user_id}")
                 return True
     except Exception as e:
@@ -99,22 +162,31 @@ def save_user_preferences(user_id: str, preferences: Dict[str, str]) -> bool:
         return False
 
 
-def save_audio_history(
+async def save_audio_history_async(
     user_id: str,
     question_text: str,
     podcast_text: str,
     audio_url: Optional[str] = None,
     source_chunks: Optional[str] = None,  # NEW: JSON string of chunks used for daily brief
+    brief_key: Optional[str] = None,
 ) -> bool:
-    """Save audio history entry."""
+    """Save audio history entry (async).
+
+    With brief_key the entry references a shared daily brief (shared_briefs.py), whose text
+    and chunks are read from shared_briefs; pass podcast_text/source_chunks as None then.
+    """
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """INSERT INTO audio_history (user_id, question_text, podcast_text, audio_url, source_chunks)
-                       VALUES (%s, %s, %s, %s, %s)""",
-                    (user_id, question_text, podcast_text, audio_url, source_chunks),
-                )
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                if brief_key:
+                    await cur.execute(
+                        SAVE_SHARED_AUDIO_HISTORY_SQL,
+                        (user_id, question_text, podcast_text, audio_url, source_chunks, brief_key),
+                    )
+                else:
+                    await cur.execute(
+                        SAVE_AUDIO_HISTORY_SQL, (user_id, question_text, podcast_text, audio_url, source_chunks)
+                    )
                 print(f"[db] Audio history saved for user: {user_id}")
                 return True
     except Exception as e:
@@ -122,83 +194,70 @@ def save_audio_history(
         return False
 
 
-def get_audio_history(user_id: str, limit: int = 10) -> List[Dict]:
-    """Get audio history for a user."""
+async def get_audio_history_async(user_id: str, limit: int = 10) -> List[Dict]:
+    """Get audio history for a user (shared daily briefs resolved to their text and chunks)."""
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """SELECT id, question_text, podcast_text, audio_url, source_chunks, created_at
-                       FROM audio_history
-                       WHERE user_id = %s
-                       ORDER BY created_at DESC
-                       LIMIT %s""",
-                    (user_id, limit),
-                )
-                history = []
-                for row in cur.fetchall():
-                    history.append(
-                        {
-                            "id": row[0],
-                            "question_text": row[1],
-                            "podcast_text": row[2],
-                            "audio_url": row[3],
-                            "source_chunks": row[4],  # NEW: Include source chunks (JSONB/string)
-                            "created_at": row[5].isoformat() if row[5] else None,
-                        }
-                    )
-                return history
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(_history_sql, (user_id, limit), prepare=PREPARE_HOT_QUERIES)
+                return [_history_row_to_dict(row) for row in await cur.fetchall()]
+    except (psycopg.errors.UndefinedTable, psycopg.errors.UndefinedColumn) as e:
+        if _history_sql == LEGACY_GET_AUDIO_HISTORY_SQL:
+            print(f"[db-error] Failed to get audio history: {e}")
+            return []
+        _use_legacy_history_sql(e)
+        return await get_audio_history_async(user_id, limit)
     except Exception as e:
         print(f"[db-error] Failed to get audio history: {e}")
         return []
 
 
-def get_preferences_last_updated(user_id: str) -> Optional[str]:
+async def get_preferences_last_updated_async(user_id: str) -> Optional[str]:
     """Get the most recent updated_at timestamp for topics or sources preferences.
-    
+
     Returns:
         ISO format timestamp string, or None if no preferences exist
     """
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
-            with conn.cursor() as cur:
-                # Get max updated_at for topics or sources (the preference keys that affect daily brief)
-                cur.execute(
-                    """SELECT MAX(updated_at) 
-                       FROM user_preferences 
-                       WHERE user_id = %s 
-                       AND preference_key IN ('topics', 'sources')""",
-                    (user_id,),
-                )
-                result = cur.fetchone()
-                if result and result[0]:
-                    return result[0].isoformat()
-                return None
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(GET_PREFERENCES_LAST_UPDATED_SQL, (user_id,), prepare=PREPARE_HOT_QUERIES)
+                return _timestamp_or_none(await cur.fetchone())
     except Exception as e:
         print(f"[db-error] Failed to get preferences last updated: {e}")
         return None
 
 
-def get_voice_preference_last_updated(user_id: str) -> Optional[str]:
+async def get_voice_preference_last_updated_async(user_id: str) -> Optional[str]:
     """Get the updated_at timestamp for voice_preference.
-    
+
     Returns:
         ISO format timestamp string, or None if voice preference doesn't exist
     """
     try:
-        with psycopg.connect(DB_URL, autocommit=True) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """SELECT updated_at 
-                       FROM user_preferences 
-                       WHERE user_id = %s 
-                       AND preference_key = 'voice_preference'""",
-                    (user_id,),
-                )
-                result = cur.fetchone()
-                if result and result[0]:
-                    return result[0].isoformat()
-                return None
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(GET_VOICE_PREFERENCE_LAST_UPDATED_SQL, (user_id,), prepare=PREPARE_HOT_QUERIES)
+                return _timestamp_or_none(await cur.fetchone())
     except Exception as e:
         print(f"[db-error] Failed to get voice preference last updated: {e}")
         return None
+
+
+async def get_daily_brief_users_async(active_days: int = 0) -> List[Dict]:
+    """Users a daily brief can be generated for (topics and sources set).
+
+    Args:
+        active_days: Only users with audio history in the last N days (0 = everyone)
+
+    Returns:
+        [{"user_id", "last_daily_brief_generated", "preferences_updated"}], ordered by user_id
+    """
+    try:
+        async with async_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(GET_DAILY_BRIEF_USERS_SQL, (active_days, active_days))
+                return [_brief_user_row_to_dict(row) for row in await cur.fetchall()]
+    except Exception as e:
+        print(f"[db-error] Failed to list daily brief users: {e}")
+        return []
@@ -368,7 +368,29 @@ function Podcast() {
         return
       }
 
-      const data = await response.json()
+      // The backend queues a job and returns its id; long-poll the job until it finishes
+      let job = await response.json()
+      console.log('[daily-brief] Job queued:', job.job_id, job.created ? '(new)' : '(already running)')
+      while (job.status === 'queued' || job.status === 'running') {
+        const jobResponse = await fetch(`${getApiUrl()}/api/daily-brief/jobs/${job.job_id}?wait=20`, {
+          headers: getAuthHeaders()
+        })
+        if (!jobResponse.ok) {
+          console.error('[daily-brief] Job status failed:', jobResponse.status)
+          setIsGeneratingBrief(false)
+          return
+        }
+        job = await jobResponse.json()
+        console.log('[daily-brief] Job status:', job.status, job.stage)
+      }
+
+      if (job.status !== 'succeeded') {
+        console.error('[daily-brief] Generation failed:', job.error_status, job.error)
+        setIsGeneratingBrief(false)
+        return
+      }
+
+      const data = job.result
       console.log('[daily-brief] Generated:', data)
       console.log('[daily-brief] Has audio_url?', !!data.audio_url)
       console.log('[daily-brief] Has podcast_text?', !!data.podcast_text)
@@ -897,9 +919,19 @@ function Podcast() {
       mediaStreamRef.current = stream
 
       const AudioContext = window.AudioContext || window.webkitAudioContext
-      const audioContext = new AudioContext()
+      // Capture at 48 kHz (the browser resamples the mic), so the announced rate never
+      // exceeds the backend's MAX_SAMPLE_RATE (speech_to_text_client.py) on 96 kHz devices
+      const audioContext = new AudioContext({ sampleRate: 48000 })
       audioContextRef.current = audioContext
 
+      // Tell the backend the capture format so it transcribes with a single STT call
+      wsRef.current.send(JSON.stringify({
+        type: "audio_format",
+        encoding: "LINEAR16",
+        sample_rate: audioContext.sampleRate,
+        channels: 1
+      }))
+
       const source = audioContext.createMediaStreamSource(stream)
 
       const bufferSize = 4096
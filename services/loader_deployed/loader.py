@@ -20,6 +20,10 @@ import os
 # Table configuration from environment variables
 ARTICLES_TABLE_NAME = os.environ.get("ARTICLES_TABLE_NAME", "articles")
 VECTOR_TABLE_NAME = os.environ.get("VECTOR_TABLE_NAME", "chunks_vector")
+# Bumped after every load that inserted chunks; the chatter LISTENs on the channel and drops
+# cached retrieval results for older versions
+CORPUS_VERSION_TABLE_NAME = os.environ.get("CORPUS_VERSION_TABLE_NAME", "corpus_version")
+CORPUS_UPDATED_CHANNEL = "corpus_updated"
 
 
 import pandas as pd
@@ -29,7 +33,7 @@ from datetime import datetime, timezone
 from urllib.parse import urlparse
 from dateutil import parser as dateparser
 from typing import List
-import json, sys, pathlib
+import json, math, sys, pathlib
 
 # Vertex AI
 from google import genai
@@ -56,6 +60,9 @@ import time
 EMBEDDING_MODEL = "text-embedding-004"
 # GENERATIVE_MODEL = "gemini-2.0-flash-001"
 EMBEDDING_DIM = 768  # 256
+# Two-stage retrieval: the chatter generates candidates on the first 256 dimensions
+# (renormalized) and re-ranks by the full vector (chatter migration 007)
+SMALL_EMBEDDING_DIM = 256
 
 # Parameter for chunking
 CHUNK_SIZE_CHAR = 350
@@ -109,7 +116,38 @@ class VertexEmbeddings:
         return self._embed_one(text)
 
 
+def truncate_embedding(vector, dim=SMALL_EMBEDDING_DIM):
+    """First `dim` dimensions of an embedding, renormalized to unit length."""
+    head = [float(x) for x in vector[:dim]]
+    norm = math.sqrt(sum(x * x for x in head))
+    return [x / norm for x in head] if norm else head
+
+
 # Chunking function
+def bump_corpus_version(cur):
+    """Increment the corpus version and NOTIFY the chatter (one autocommitted statement)."""
+    bump_sql = sql.SQL(
+        """
+        WITH bumped AS (
+            INSERT INTO {table} (id, version, updated_at)
+            VALUES (1, 1, NOW())
+            ON CONFLICT (id) DO UPDATE
+            SET version = {table}.version + 1, updated_at = NOW()
+            RETURNING version
+        )
+        SELECT version, pg_notify(%s, version::text) FROM bumped;
+    """
+    ).format(table=sql.Identifier(CORPUS_VERSION_TABLE_NAME))
+    try:
+        cur.execute(bump_sql, (CORPUS_UPDATED_CHANNEL,))
+        version = cur.fetchone()[0]
+    except psycopg.errors.UndefinedTable:
+        logger.warning(f"{CORPUS_VERSION_TABLE_NAME} missing (run chatter migration 005); version not bumped")
+        return None
+    logger.info(f"Corpus version bumped to {version}")
+    return version
+
+
 def chunk_embed_load(method="char-split"):
     # ============== CHANGE 3: LOG FUNCTION START ==============
     logger.info(f"=== Starting chunk_embed_load - Method: {method} ===")
@@ -298,9 +336,9 @@ def chunk_embed_load(method="char-split"):
                 INSERT INTO {} (
                     author, title, summary, content,
                     source_link, source_type, fetched_at, published_at,
-                    chunk, chunk_index, embedding, article_id
+                    chunk, chunk_index, embedding, embedding_256, article_id
                 )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
             ).format(sql.Identifier(VECTOR_TABLE_NAME))
 
@@ -318,6 +356,7 @@ def chunk_embed_load(method="char-split"):
                     r["chunk"],
                     int(r["chunk_index"]),
                     r["embedding"],
+                    truncate_embedding(r["embedding"]),
                     r["article_id"],
                 ),
             )
@@ -357,6 +396,11 @@ def chunk_embed_load(method="char-split"):
 
         processed_count += 1
 
+    # ============== Corpus version: tell the chatter its cached results are stale ==============
+    if processed_count:
+        bump_corpus_version(cur)
+    # ===========================================================================================
+
     cur.close()
     conn.close()
 
@@ -5,6 +5,7 @@ loader service
 Modular version with separated concerns
 """
 
+import math
 import os
 import pandas as pd
 import psycopg
@@ -35,9 +36,16 @@ VECTOR_TABLE_NAME = os.environ.get("VECTOR_TABLE_NAME", "chunks_vector_test")
 DB_URL = os.environ["DATABASE_URL"]
 EMBEDDING_MODEL = "text-embedding-004"
 EMBEDDING_DIM = 768
+# Two-stage retrieval: the chatter generates candidates on the first 256 dimensions
+# (renormalized) and re-ranks by the full vector (chatter migration 007)
+SMALL_EMBEDDING_DIM = 256
 CHUNK_SIZE_CHAR = 350
 CHUNK_OVERLAP_CHAR = 20
 CHUNK_SIZE_RECURSIVE = 350
+# Bumped after every load that inserted chunks; the chatter LISTENs on the channel and drops
+# cached retrieval results for older versions
+CORPUS_VERSION_TABLE_NAME = os.environ.get("CORPUS_VERSION_TABLE_NAME", "corpus_version")
+CORPUS_UPDATED_CHANNEL = "corpus_updated"
 
 
 # ============= DATA CLASSES =============
@@ -127,6 +135,13 @@ class VertexEmbeddings:
         return self._embed_one(text)
 
 
+def truncate_embedding(vector: List[float], dim: int = SMALL_EMBEDDING_DIM) -> List[float]:
+    """First `dim` dimensions of an embedding, renormalized to unit length"""
+    head = [float(x) for x in vector[:dim]]
+    norm = math.sqrt(sum(x * x for x in head))
+    return [x / norm for x in head] if norm else head
+
+
 # ============= DATABASE OPERATIONS =============
 class DatabaseManager:
     """Handles all database operations"""
@@ -178,9 +193,9 @@ class DatabaseManager:
             INSERT INTO {} (
                 author, title, summary, content,
                 source_link, source_type, fetched_at, published_at,
-                chunk, chunk_index, embedding, article_id
+                chunk, chunk_index, embedding, embedding_256, article_id
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         ).format(sql.Identifier(VECTOR_TABLE_NAME))
 
@@ -200,6 +215,7 @@ class DatabaseManager:
                     row["chunk"],
                     int(row["chunk_index"]),
                     row["embedding"],
+                    truncate_embedding(row["embedding"]),
                     row["article_id"],
                 ),
             )
@@ -220,6 +236,30 @@ class DatabaseManager:
         self.cur.execute(update_sql, (article_id,))
         logger.info(f"Updated vflag=1 for article_id={article_id}")
 
+    def bump_corpus_version(self) -> Optional[int]:
+        """Increment the corpus version and NOTIFY listeners (one statement, autocommitted)"""
+        bump_sql = sql.SQL(
+            """
+            WITH bumped AS (
+                INSERT INTO {table} (id, version, updated_at)
+                VALUES (1, 1, NOW())
+                ON CONFLICT (id) DO UPDATE
+                SET version = {table}.version + 1, updated_at = NOW()
+                RETURNING version
+            )
+            SELECT version, pg_notify(%s, version::text) FROM bumped;
+        """
+        ).format(table=sql.Identifier(CORPUS_VERSION_TABLE_NAME))
+
+        try:
+            self.cur.execute(bump_sql, (CORPUS_UPDATED_CHANNEL,))
+            version = self.cur.fetchone()[0]
+        except psycopg.errors.UndefinedTable:
+            logger.warning(f"{CORPUS_VERSION_TABLE_NAME} missing (run chatter migration 005); version not bumped")
+            return None
+        logger.info(f"Corpus version bumped to {version}")
+        return version
+
 
 # ============= CHUNKING STRATEGIES =============
 class ChunkingStrategy:
@@ -403,6 +443,10 @@ def chunk_embed_load(method: str = "char-split") -> Dict[str, Any]:
 
             processed_count += 1
 
+        # New chunks are visible now: tell the chatter its cached results are stale
+        if processed_count:
+            db.bump_corpus_version()
+
     logger.info(
         f"=== COMPLETED: Processed {processed_count} articles, Total found: \
             {len(articles)} ==="
@@ -34,6 +34,7 @@ CREATE TABLE IF NOT EXISTS chunks_vector_test (
     chunk TEXT,
     chunk_index INTEGER,
     embedding vector(768),  -- pgvector type
+    embedding_256 vector(256),  -- first 256 dims of embedding, renormalized
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (article_id) REFERENCES articles_test(article_id) ON DELETE CASCADE
 );
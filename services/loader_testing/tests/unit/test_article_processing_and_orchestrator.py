@@ -92,6 +92,7 @@ def test_chunk_embed_load_orchestrates(monkeypatch):
             self.db_url = db_url
             self.inserted = []
             self.marked = []
+            self.bumped = 0
             # Build two fake articles
             self._articles = [
                 loader_mod.Article(
@@ -138,6 +139,10 @@ def test_chunk_embed_load_orchestrates(monkeypatch):
         def mark_article_processed(self, article_id):
             self.marked.append(article_id)
 
+        def bump_corpus_version(self):
+            self.bumped += 1
+            return self.bumped
+
     # Patch the heavy classes inside loader
     monkeypatch.setattr(loader_mod, "VertexEmbeddings", FakeEmbedder)
     monkeypatch.setattr(loader_mod, "ArticleProcessor", FakeProcessor)
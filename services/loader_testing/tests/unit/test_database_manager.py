@@ -103,3 +103,48 @@ def test_database_manager_fetch_insert_and_mark(monkeypatch):
         executed_sqls = fake_cursor.executed
         assert any("UPDATE" in str(sql) for sql, _ in executed_sqls)
         assert any("INSERT" in str(sql) for sql, _ in executed_sqls)
+
+
+def test_bump_corpus_version_notifies_chatter(monkeypatch):
+    from api import loader as loader_mod
+
+    class FakeCursor:
+        def __init__(self):
+            self.executed = []
+
+        def execute(self, sql, params=None):
+            self.executed.append((sql, params))
+
+        def fetchone(self):
+            return (7,)
+
+        def close(self):
+            pass
+
+    class FakeConn:
+        def __init__(self):
+            self.cursor_obj = FakeCursor()
+
+        def cursor(self):
+            return self.cursor_obj
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(loader_mod.psycopg, "connect", lambda dsn, autocommit=True: FakeConn())
+    monkeypatch.setattr(loader_mod, "register_vector", lambda conn: None)
+
+    with loader_mod.DatabaseManager("postgresql://fake") as db:
+        assert db.bump_corpus_version() == 7
+        sql, params = db.cur.executed[-1]
+        assert "pg_notify" in str(sql)
+        assert params == (loader_mod.CORPUS_UPDATED_CHANNEL,)
+
+
+def test_truncate_embedding_keeps_prefix_at_unit_length():
+    from api import loader as loader_mod
+
+    small = loader_mod.truncate_embedding([3.0, 4.0, 100.0], dim=2)
+    assert small == pytest.approx([0.6, 0.8])
+    assert loader_mod.truncate_embedding([0.0] * 4, dim=2) == [0.0, 0.0]
+    assert len(loader_mod.truncate_embedding([0.1] * 768)) == loader_mod.SMALL_EMBEDDING_DIM